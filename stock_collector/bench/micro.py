@@ -0,0 +1,572 @@
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import json
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import numpy as np
+
+from stock_collector.bench.mock_sina import synthetic_bar, synthetic_symbols
+from stock_collector.config.settings import get_path
+from stock_collector.ops.backup import file_hash
+from stock_collector.pipeline import adjustment, validator
+from stock_collector.pipeline.daily import build_daily_bar
+from stock_collector.scraper.parsers import parse_kline_json
+from stock_collector.storage import raw_archive
+from stock_collector.storage.columnar import BarColumns
+from stock_collector.storage.csv_writer import write_summary_csv, write_symbol_csv
+from stock_collector.storage.schema import CollectStatus, DailyBar
+from stock_collector.storage.sqlite_store import init_db, insert_adj_events, upsert_collect_status, upsert_daily_bar
+
+# 数据规模：单日（一天 × 全部股票）与历史（多年 × 全部股票）
+SCALES = ("day", "history")
+# 每年交易日数（按工作日近似）
+SESSIONS_PER_YEAR = 252
+# 合成 ST 股票的抽样间隔（约占全市场 5%，覆盖 ST 涨跌幅限制路径）
+ST_EVERY = 20
+# 历史数据按块生成与校验的交易日数
+HISTORY_CHUNK_DAYS = 20
+# 默认基线文件名（位于 bench_dir）
+BASELINE_NAME = "micro_baseline.json"
+
+
+# 基准运行上下文（数据集按需生成并缓存）
+@dataclass
+class BenchContext:
+    # 基准交易日
+    trade_date: str
+    # 股票数量
+    symbols: int
+    # 历史年数
+    years: int
+    # 每个用例的重复次数
+    repeat: int
+    # 历史 CSV 写出抽样的股票数
+    csv_sample: int
+    # 临时目录
+    workdir: Path
+    # 使用该交易日的原始响应归档作为解析用例的输入（为空时使用合成响应）
+    archive_date: str | None = None
+    # 已生成的数据集
+    cache: dict[str, Any] = field(default_factory=dict)
+
+    # 股票代码
+    @property
+    def symbol_list(self) -> list[str]:
+        if "symbols" not in self.cache:
+            self.cache["symbols"] = synthetic_symbols(self.symbols)
+        return self.cache["symbols"]
+
+    # 单日原始数据（结构同 sina_api 返回）
+    @property
+    def raws(self) -> list[dict]:
+        if "raws" not in self.cache:
+            self.cache["raws"] = [_raw_bar(symbol, self.trade_date) for symbol in self.symbol_list]
+        return self.cache["raws"]
+
+    # 接口原始响应 (股票代码, 交易日, 响应文本)
+    @property
+    def payloads(self) -> list[tuple[str, str, str]]:
+        if "payloads" not in self.cache:
+            if self.archive_date:
+                self.cache["payloads"] = [
+                    (record["symbol"], self.archive_date, record["body"])
+                    for record in raw_archive.iter_records(self.archive_date)
+                    if record["kind"] == "api" and record.get("status") == 200
+                ]
+            else:
+                self.cache["payloads"] = [
+                    (symbol, self.trade_date, json.dumps([synthetic_bar(symbol, self.trade_date)]))
+                    for symbol in self.symbol_list
+                ]
+        return self.cache["payloads"]
+
+    # 单日 DailyBar
+    @property
+    def bars(self) -> list[DailyBar]:
+        if "bars" not in self.cache:
+            self.cache["bars"] = [build_daily_bar(raw) for raw in self.raws]
+        return self.cache["bars"]
+
+    # 单日采集状态
+    @property
+    def statuses(self) -> list[CollectStatus]:
+        if "statuses" not in self.cache:
+            self.cache["statuses"] = [
+                CollectStatus(trade_date=self.trade_date, symbol=symbol, status="success", retry_count=0, last_error="")
+                for symbol in self.symbol_list
+            ]
+        return self.cache["statuses"]
+
+    # 历史交易日（不含基准日，升序）
+    @property
+    def history_days(self) -> list[str]:
+        if "history_days" not in self.cache:
+            self.cache["history_days"] = _weekdays_before(self.trade_date, self.years * SESSIONS_PER_YEAR)
+        return self.cache["history_days"]
+
+    # 仅含表结构的空库
+    @property
+    def empty_db(self) -> Path:
+        if "empty_db" not in self.cache:
+            path = self.workdir / "empty.db"
+            init_db(str(path))
+            self.cache["empty_db"] = path
+        return self.cache["empty_db"]
+
+    # 含历史数据与基准日数据的库（同一随机游走生成，首次访问时批量写入）
+    @property
+    def history_db(self) -> Path:
+        if "history_db" not in self.cache:
+            path = self.workdir / "history.db"
+            init_db(str(path))
+            days = [*self.history_days, self.trade_date]
+            with sqlite3.connect(path) as conn:
+                for columns in _history_chunks(self.symbol_list, days, HISTORY_CHUNK_DAYS):
+                    _bulk_insert(conn, columns)
+            self.cache["history_db"] = path
+        return self.cache["history_db"]
+
+
+# 生成单只股票的原始日线（字段与 sina_api 解析结果一致）
+def _raw_bar(symbol: str, day: str) -> dict:
+    bar = synthetic_bar(symbol, day)
+    open_p, close = float(bar["open"]), float(bar["close"])
+    return {
+        "symbol": symbol,
+        "trade_date": day,
+        "open": open_p,
+        "high": float(bar["high"]),
+        "low": float(bar["low"]),
+        "close": close,
+        "volume": int(bar["volume"]),
+        "amount": float(bar["amount"]),
+        "pre_close": float(bar["preclose"]),
+        "change": close - open_p,
+        "change_pct": (close - open_p) / open_p * 100,
+        "source": "sina_api",
+    }
+
+
+# 指定日期之前的 count 个工作日（升序）
+def _weekdays_before(end: str, count: int) -> list[str]:
+    day = date.fromisoformat(end)
+    result = []
+    while len(result) < count:
+        day -= timedelta(days=1)
+        if day.weekday() < 5:
+            result.append(day.isoformat())
+    return list(reversed(result))
+
+
+# 按块生成历史日线（随机游走，确定性），每块为若干交易日的列式数据
+def _history_chunks(symbols: list[str], days: list[str], chunk_days: int) -> Iterator[BarColumns]:
+    rng = np.random.default_rng(20240101)
+    count = len(symbols)
+    symbol_array = np.array(symbols, dtype=str)
+    close = rng.uniform(5, 100, count)
+    for start in range(0, len(days), chunk_days):
+        block = days[start : start + chunk_days]
+        columns: dict[str, list[np.ndarray]] = {key: [] for key in ("open", "high", "low", "close", "volume")}
+        for _ in block:
+            pre_close = close
+            close = np.round(pre_close * np.exp(rng.normal(0, 0.02, count)), 2)
+            open_p = np.round(pre_close * (1 + rng.uniform(-0.02, 0.02, count)), 2)
+            columns["open"].append(open_p)
+            columns["close"].append(close)
+            columns["high"].append(np.round(np.maximum(open_p, close) * (1 + rng.uniform(0, 0.02, count)), 2))
+            columns["low"].append(np.round(np.minimum(open_p, close) * (1 - rng.uniform(0, 0.02, count)), 2))
+            columns["volume"].append(rng.integers(1_000, 500_000, count) * 100)
+        volume = np.concatenate(columns["volume"])
+        close_all = np.concatenate(columns["close"])
+        yield BarColumns(
+            symbol=np.tile(symbol_array, len(block)),
+            trade_date=np.repeat(np.array(block, dtype=str), count),
+            open=np.concatenate(columns["open"]),
+            high=np.concatenate(columns["high"]),
+            low=np.concatenate(columns["low"]),
+            close=close_all,
+            volume=volume,
+            amount=volume * close_all,
+        )
+
+
+# 批量写入用的插入语句（历史库初始化，非被测路径）
+_INSERT_BAR_SQL = """
+    INSERT OR REPLACE INTO daily_bar (
+        symbol, trade_date, open, high, low, close,
+        change, change_pct, volume, amplitude_pct, turnover_pct,
+        amount, price_type, source, updated_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+# DailyBar 转为插入参数
+def _bar_row(bar: DailyBar) -> tuple:
+    return (
+        bar.symbol, bar.trade_date, bar.open, bar.high, bar.low, bar.close,
+        bar.change, bar.change_pct, bar.volume, bar.amplitude_pct, bar.turnover_pct,
+        bar.amount, bar.price_type, bar.source, bar.updated_at,
+    )
+
+
+# 列式数据批量写入 daily_bar
+def _bulk_insert(conn: sqlite3.Connection, columns: BarColumns) -> None:
+    rows = zip(
+        columns.symbol.tolist(), columns.trade_date.tolist(),
+        columns.open.tolist(), columns.high.tolist(), columns.low.tolist(), columns.close.tolist(),
+        (columns.close - columns.open).tolist(), ((columns.close - columns.open) / columns.open * 100).tolist(),
+        columns.volume.tolist(), ((columns.high - columns.low) / columns.open * 100).tolist(), [0.0] * len(columns),
+        columns.amount.tolist(), ["raw"] * len(columns), ["bench"] * len(columns), ["2024-01-01T00:00:00"] * len(columns),
+    )
+    conn.executemany(_INSERT_BAR_SQL, rows)
+
+
+# 注册的基准用例：(规模, 名称) -> (计量单位, 用例函数)；用例函数返回 (处理量, 各次耗时)
+CASES: dict[tuple[str, str], tuple[str, Callable[[BenchContext], tuple[int, list[float]]]]] = {}
+
+
+# 注册基准用例（新增批量实现时在此登记对应用例，便于与逐条实现对比）
+def case(name: str, scale: str, unit: str = "row") -> Callable:
+    def register(func: Callable[[BenchContext], tuple[int, list[float]]]) -> Callable:
+        CASES[(scale, name)] = (unit, func)
+        return func
+
+    return register
+
+
+# 重复执行并计时；reset 在每次计时后执行（不计入耗时）
+def _repeat(repeat: int, func: Callable[[], Any], reset: Callable[[], Any] | None = None) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+        if reset is not None:
+            reset()
+    return timings
+
+
+# 在事务内逐条写入，计时后回滚以保持数据库状态不变
+def _time_upserts(ctx: BenchContext, db_path: Path, write: Callable[[sqlite3.Connection], None]) -> list[float]:
+    conn = sqlite3.connect(db_path)
+    try:
+        return _repeat(ctx.repeat, lambda: write(conn), conn.rollback)
+    finally:
+        conn.close()
+
+
+@case("parse_kline_json", "day")
+def _bench_parse_kline_json(ctx: BenchContext) -> tuple[int, list[float]]:
+    payloads = ctx.payloads
+
+    # 缺失响应同样计入（解析成本一致）
+    def parse() -> None:
+        for symbol, trade_date, body in payloads:
+            try:
+                parse_kline_json(body, symbol, trade_date)
+            except RuntimeError:
+                continue
+
+    return len(payloads), _repeat(ctx.repeat, parse)
+
+
+@case("build_daily_bar", "day")
+def _bench_build_daily_bar(ctx: BenchContext) -> tuple[int, list[float]]:
+    raws = ctx.raws
+    return len(raws), _repeat(ctx.repeat, lambda: [build_daily_bar(raw) for raw in raws])
+
+
+@case("validate_bar", "day")
+def _bench_validate_bar(ctx: BenchContext) -> tuple[int, list[float]]:
+    bars = ctx.bars
+    return len(bars), _repeat(ctx.repeat, lambda: [validator.validate_bar(bar) for bar in bars])
+
+
+@case("validate_bars", "day")
+def _bench_validate_bars(ctx: BenchContext) -> tuple[int, list[float]]:
+    bars = ctx.bars
+    return len(bars), _repeat(ctx.repeat, lambda: validator.validate_bars(BarColumns.from_bars(bars)))
+
+
+@case("upsert_daily_bar", "day")
+def _bench_upsert_daily_bar(ctx: BenchContext) -> tuple[int, list[float]]:
+    bars = ctx.bars
+
+    def write(conn: sqlite3.Connection) -> None:
+        for bar in bars:
+            upsert_daily_bar(conn, bar)
+
+    return len(bars), _time_upserts(ctx, ctx.empty_db, write)
+
+
+@case("upsert_collect_status", "day")
+def _bench_upsert_collect_status(ctx: BenchContext) -> tuple[int, list[float]]:
+    statuses = ctx.statuses
+
+    def write(conn: sqlite3.Connection) -> None:
+        for status in statuses:
+            upsert_collect_status(conn, status)
+
+    return len(statuses), _time_upserts(ctx, ctx.empty_db, write)
+
+
+@case("write_symbol_csv", "day")
+def _bench_write_symbol_csv(ctx: BenchContext) -> tuple[int, list[float]]:
+    rows = [[asdict(bar)] for bar in ctx.bars]
+    base_dir = ctx.workdir / "csv_day"
+
+    def write() -> None:
+        for bar_rows in rows:
+            write_symbol_csv(base_dir=base_dir, trade_date=ctx.trade_date, symbol=bar_rows[0]["symbol"], rows=bar_rows)
+
+    return len(rows), _repeat(ctx.repeat, write, lambda: shutil.rmtree(base_dir, ignore_errors=True))
+
+
+@case("write_summary_csv", "day")
+def _bench_write_summary_csv(ctx: BenchContext) -> tuple[int, list[float]]:
+    summary_rows = [
+        {"symbol": status.symbol, "trade_date": status.trade_date, "status": status.status, "retry_count": status.retry_count}
+        for status in ctx.statuses
+    ]
+    base_dir = ctx.workdir / "csv_summary"
+    (base_dir / ctx.trade_date).mkdir(parents=True, exist_ok=True)
+    return len(summary_rows), _repeat(ctx.repeat, lambda: write_summary_csv(base_dir, ctx.trade_date, summary_rows))
+
+
+@case("file_hash", "day", unit="byte")
+def _bench_file_hash_day(ctx: BenchContext) -> tuple[int, list[float]]:
+    path = ctx.workdir / "day.db"
+    shutil.copyfile(ctx.empty_db, path)
+    with sqlite3.connect(path) as conn:
+        conn.executemany(_INSERT_BAR_SQL, [_bar_row(bar) for bar in ctx.bars])
+    size = path.stat().st_size
+    return size, _repeat(ctx.repeat, lambda: file_hash(path))
+
+
+@case("upsert_daily_bar", "history")
+def _bench_upsert_daily_bar_history(ctx: BenchContext) -> tuple[int, list[float]]:
+    # 在已有多年数据的库中写入新一天（索引更深，页缓存命中率更低）
+    next_day = (date.fromisoformat(ctx.trade_date) + timedelta(days=1)).isoformat()
+    bars = [build_daily_bar({**raw, "trade_date": next_day}) for raw in ctx.raws]
+
+    def write(conn: sqlite3.Connection) -> None:
+        for bar in bars:
+            upsert_daily_bar(conn, bar)
+
+    return len(bars), _time_upserts(ctx, ctx.history_db, write)
+
+
+@case("validate_bars", "history")
+def _bench_validate_bars_history(ctx: BenchContext) -> tuple[int, list[float]]:
+    chunks = list(_history_chunks(ctx.symbol_list, ctx.history_days, HISTORY_CHUNK_DAYS))
+    rows = sum(len(columns) for columns in chunks)
+    return rows, _repeat(ctx.repeat, lambda: [validator.validate_bars(columns) for columns in chunks])
+
+
+@case("validate_day", "history")
+def _bench_validate_day_history(ctx: BenchContext) -> tuple[int, list[float]]:
+    db_path = ctx.history_db
+    st_symbols = set(ctx.symbol_list[::ST_EVERY])
+    conn = sqlite3.connect(db_path)
+    try:
+        return ctx.symbols, _repeat(ctx.repeat, lambda: validator.validate_day(conn, ctx.trade_date, st_symbols))
+    finally:
+        conn.close()
+
+
+@case("write_symbol_csv", "history")
+def _bench_write_symbol_csv_history(ctx: BenchContext) -> tuple[int, list[float]]:
+    # 抽样股票写出全部历史行
+    sample = ctx.symbol_list[: ctx.csv_sample]
+    with sqlite3.connect(ctx.history_db) as conn:
+        conn.row_factory = sqlite3.Row
+        rows = {
+            symbol: [dict(row) for row in conn.execute("SELECT * FROM daily_bar WHERE symbol = ? ORDER BY trade_date", (symbol,))]
+            for symbol in sample
+        }
+    base_dir = ctx.workdir / "csv_history"
+
+    def write() -> None:
+        for symbol, symbol_rows in rows.items():
+            write_symbol_csv(base_dir=base_dir, trade_date=ctx.trade_date, symbol=symbol, rows=symbol_rows)
+
+    items = sum(len(symbol_rows) for symbol_rows in rows.values())
+    return items, _repeat(ctx.repeat, write, lambda: shutil.rmtree(base_dir, ignore_errors=True))
+
+
+# 抽样股票读取全部历史（adjust 为复权方式），复权用例先为抽样股票写入每年一次的除权事件
+def _time_reads(ctx: BenchContext, adjust: str | None) -> tuple[int, list[float]]:
+    sample = ctx.symbol_list[: ctx.csv_sample]
+    conn = sqlite3.connect(ctx.history_db)
+    try:
+        if adjust is not None:
+            ex_dates = ctx.history_days[::SESSIONS_PER_YEAR][1:]
+            insert_adj_events(conn, [(symbol, ex_date, 1.1, "bench") for symbol in sample for ex_date in ex_dates])
+            conn.commit()
+        items = sum(len(adjustment.read_bars(conn, symbol, adjust=adjust)) for symbol in sample)
+        return items, _repeat(ctx.repeat, lambda: [adjustment.read_bars(conn, symbol, adjust=adjust) for symbol in sample])
+    finally:
+        conn.close()
+
+
+@case("read_bars", "history")
+def _bench_read_bars_history(ctx: BenchContext) -> tuple[int, list[float]]:
+    return _time_reads(ctx, None)
+
+
+@case("read_bars_qfq", "history")
+def _bench_read_bars_qfq_history(ctx: BenchContext) -> tuple[int, list[float]]:
+    return _time_reads(ctx, "qfq")
+
+
+@case("file_hash", "history", unit="byte")
+def _bench_file_hash_history(ctx: BenchContext) -> tuple[int, list[float]]:
+    path = ctx.history_db
+    return path.stat().st_size, _repeat(ctx.repeat, lambda: file_hash(path))
+
+
+# 汇总单个用例结果（items 为处理量，单位见 unit）
+def _result(name: str, scale: str, unit: str, items: int, timings: list[float]) -> dict[str, Any]:
+    median = statistics.median(timings)
+    return {
+        "name": name,
+        "scale": scale,
+        "items": items,
+        "unit": unit,
+        "repeat": len(timings),
+        "median_seconds": round(median, 6),
+        "min_seconds": round(min(timings), 6),
+        "per_item_us": round(median / items * 1_000_000, 4) if items else 0.0,
+        "items_per_second": round(items / median, 1) if median else 0.0,
+    }
+
+
+# 执行选中的用例
+def run_cases(ctx: BenchContext, scales: list[str], patterns: list[str]) -> list[dict[str, Any]]:
+    results = []
+    for (scale, name), (unit, func) in CASES.items():
+        if scale not in scales or not any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+            continue
+        started = time.perf_counter()
+        items, timings = func(ctx)
+        result = _result(name, scale, unit, items, timings)
+        results.append(result)
+        print(
+            f"[micro] {scale:<8} {name:<24} {result['median_seconds']:>10.4f}s "
+            f"{result['per_item_us']:>10.4f}us/{unit}  (含准备 {time.perf_counter() - started:.1f}s)",
+            file=sys.stderr,
+        )
+    return results
+
+
+# 与基线对比（按 规模/名称 匹配，ratio 为当前中位耗时 / 基线中位耗时）
+def compare(results: list[dict[str, Any]], baseline: dict[str, Any], max_regression: float) -> list[dict[str, Any]]:
+    previous = {(item["scale"], item["name"]): item for item in baseline.get("cases", [])}
+    rows = []
+    for item in results:
+        base = previous.get((item["scale"], item["name"]))
+        if base is None or not base.get("per_item_us"):
+            continue
+        ratio = item["per_item_us"] / base["per_item_us"]
+        rows.append({
+            "name": item["name"],
+            "scale": item["scale"],
+            "baseline_per_item_us": base["per_item_us"],
+            "per_item_us": item["per_item_us"],
+            "ratio": round(ratio, 3),
+            "regressed": ratio > 1 + max_regression,
+        })
+    return rows
+
+
+# 解析命令行参数
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="存储、校验与导出热点路径微基准")
+    parser.add_argument("--scale", choices=[*SCALES, "all"], default="day", help="数据规模（history 需先生成多年数据，较慢）")
+    parser.add_argument("--cases", nargs="*", default=["*"], help="用例名称（支持通配符）")
+    parser.add_argument("--symbols", type=int, default=5000, help="股票数量")
+    parser.add_argument("--years", type=int, default=10, help="历史规模的年数")
+    parser.add_argument("--repeat", type=int, default=5, help="每个用例的重复次数")
+    parser.add_argument("--csv-sample", type=int, default=50, help="历史规模下写出 CSV 的抽样股票数")
+    parser.add_argument("--date", default="2024-06-28", help="基准交易日 YYYY-MM-DD")
+    parser.add_argument("--archive-date", metavar="YYYY-MM-DD", help="解析用例改用该日的原始响应归档")
+    parser.add_argument("--output", help="结果 JSON 输出路径")
+    parser.add_argument("--baseline", help=f"基线 JSON 路径（默认 bench_dir/{BASELINE_NAME}，存在时自动对比）")
+    parser.add_argument("--save-baseline", action="store_true", help="将本次结果保存为基线")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.2,
+        metavar="RATIO",
+        help="单条耗时较基线增加超过该比例视为退化，存在退化时返回非零退出码",
+    )
+    parser.add_argument("--keep", action="store_true", help="保留临时数据目录")
+    return parser.parse_args()
+
+
+# 主入口逻辑
+def main() -> int:
+    args = parse_args()
+    scales = list(SCALES) if args.scale == "all" else [args.scale]
+    workdir = Path(tempfile.mkdtemp(prefix="stock_collector_micro_"))
+    ctx = BenchContext(
+        trade_date=args.date,
+        symbols=args.symbols,
+        years=args.years,
+        repeat=args.repeat,
+        csv_sample=args.csv_sample,
+        workdir=workdir,
+        archive_date=args.archive_date,
+    )
+    try:
+        results = run_cases(ctx, scales, args.cases)
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    payload: dict[str, Any] = {
+        "python": sys.version.split()[0],
+        "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "params": {"symbols": args.symbols, "years": args.years, "repeat": args.repeat, "csv_sample": args.csv_sample},
+        "cases": results,
+    }
+    baseline_path = Path(args.baseline) if args.baseline else get_path("bench_dir") / BASELINE_NAME
+    regressed = []
+    if baseline_path.exists() and not args.save_baseline:
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+        if baseline.get("params") != payload["params"]:
+            print(f"[micro] 基线参数不同，对比仅供参考: {baseline.get('params')}", file=sys.stderr)
+        payload["baseline"] = str(baseline_path)
+        payload["comparison"] = compare(results, baseline, args.max_regression)
+        regressed = [f"{item['scale']}/{item['name']}" for item in payload["comparison"] if item["regressed"]]
+
+    text = json.dumps(payload, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(text, encoding="utf-8")
+        print(f"[micro] 已保存基线: {baseline_path}", file=sys.stderr)
+    print(text)
+
+    # 退化超出阈值时报错，便于存储与导出改动附带数据
+    if regressed:
+        print(f"[micro] 耗时较基线退化超过 {args.max_regression:.0%}: {regressed}", file=sys.stderr)
+        return 1
+    return 0
+
+
+# 作为模块执行时的入口
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,366 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import sys
+import threading
+import time
+import zlib
+from dataclasses import dataclass, fields
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from stock_collector.pipeline.trading_calendar import session_index, sessions_between
+
+# 模拟的接口路径（与 app.yaml 中真实 URL 的路径部分一致）
+KLINE_PATH = "/cn/api/json_v2.php/CN_MarketData.getKLineData"
+KLINE_ALT_PATH = "/quotes_service/api/json_v2.php/CN_MarketData.getKLineData"
+JSONP_PREFIX = "/cn/api/jsonp_v2.php/"
+STOCK_LIST_PATH = "/stock/api/openapi.php/Stock_V2_getStockList"
+QUOTE_PAGE_PREFIX = "/realstock/company/"
+STATS_PATH = "/_stats"
+# 单次请求最多返回的 K 线条数
+MAX_DATALEN = 1024
+
+
+# 模拟服务配置
+@dataclass
+class MockConfig:
+    # 最新交易日（K 线接口返回截至该日的数据）
+    trade_date: str
+    # 响应耗时中位数（毫秒，对数正态分布）
+    latency_ms: float = 20.0
+    # 对数正态分布的 sigma（越大长尾越重）
+    latency_sigma: float = 0.5
+    # 返回 503 的请求比例
+    error_rate: float = 0.0
+    # 挂起不响应的请求比例（触发客户端读超时）
+    timeout_rate: float = 0.0
+    # 挂起时长（秒）
+    timeout_seconds: float = 30.0
+    # 接口无数据的股票比例（按代码确定）
+    missing_rate: float = 0.0
+    # 停牌股票比例（按代码确定，接口返回上一交易日数据，页面显示停牌）
+    suspended_rate: float = 0.0
+    # 每秒请求上限，超出返回 429（0 为不限流）
+    max_rps: float = 0.0
+    # 股票列表接口返回的股票数
+    universe_size: int = 5000
+    # 随机数种子
+    seed: int = 0
+
+
+# 生成确定性的合成股票代码（沪深交替）
+def synthetic_symbols(count: int) -> list[str]:
+    symbols = []
+    for i in range(count):
+        if i % 2 == 0:
+            symbols.append(f"sh{600000 + i // 2:06d}")
+        else:
+            symbols.append(f"sz{i // 2 + 1:06d}")
+    return symbols
+
+
+# 按代码生成 [0, 1) 的确定性比例
+def _fraction(symbol: str, salt: str) -> float:
+    return zlib.crc32(f"{salt}:{symbol}".encode()) / 2**32
+
+
+# 前 count 只未停牌的合成股票（交易日股票池只含可交易股票，与真实股票池快照口径一致）
+def tradeable_symbols(count: int, suspended_rate: float) -> list[str]:
+    if suspended_rate >= 1:
+        return []
+    total = count
+    while True:
+        symbols = [symbol for symbol in synthetic_symbols(total) if _fraction(symbol, "suspended") >= suspended_rate]
+        if len(symbols) >= count:
+            return symbols[:count]
+        total = int(total / (1 - suspended_rate)) + 16
+
+
+# 截至指定日期的最近 count 个交易日（升序；end 本身视为交易日，此前按上交所交易日历，昨收与真实相邻交易日一致）
+def _sessions(end: str, count: int) -> list[str]:
+    if count <= 1:
+        return [end]
+    # 交易日约占自然日的 2/3，按两倍自然日回溯足以覆盖
+    start = (date.fromisoformat(end) - timedelta(days=count * 2 + 30)).isoformat()
+    earlier = [day for day in sessions_between(start, end) if day < end]
+    return [*earlier[-(count - 1):], end]
+
+
+# 指定日期之前的最近一个交易日
+def _previous_session(day: str) -> str:
+    return _sessions(day, 2)[0]
+
+
+# 收盘价走势参数：按交易日序号的两段周期波动（振幅为对数收益）与逐日扰动。
+# 相邻交易日的对数涨跌不超过 Σ 振幅 × 2π / 周期 + 2 × 扰动 ≈ 6.8%，叠加开盘与日内高低点的偏移后
+# 仍在主板 10% 涨跌停区间内（合成股票均为主板代码），不会触发涨跌停校验
+PRICE_WAVES = ((0.15, 60), (0.10, 250))
+PRICE_NOISE = 0.025
+
+
+# 某日收盘价（按代码与交易日序号确定，逐日涨跌受限，相邻交易日之间构成连续价格）
+def _close(symbol: str, day: str) -> float:
+    base = 5 + zlib.crc32(symbol.encode()) % 9500 / 100
+    index = session_index(day)
+    log_move = sum(
+        amplitude * math.sin(2 * math.pi * (index / period + _fraction(symbol, f"wave{period}")))
+        for amplitude, period in PRICE_WAVES
+    )
+    rng = random.Random(zlib.crc32(f"{symbol}|{day}".encode()))
+    log_move += rng.uniform(-PRICE_NOISE, PRICE_NOISE)
+    return round(base * math.exp(log_move), 2)
+
+
+# 生成单日 K 线（昨收取上一交易日收盘价）
+def synthetic_bar(symbol: str, day: str) -> dict[str, str]:
+    pre_close = _close(symbol, _previous_session(day))
+    close = _close(symbol, day)
+    rng = random.Random(zlib.crc32(f"bar|{symbol}|{day}".encode()))
+    open_p = round(pre_close * (1 + rng.uniform(-0.03, 0.03)), 2)
+    high = round(max(open_p, close) * (1 + rng.uniform(0, 0.02)), 2)
+    low = round(min(open_p, close) * (1 - rng.uniform(0, 0.02)), 2)
+    volume = rng.randint(1_000, 500_000) * 100
+    return {
+        "day": day,
+        "open": f"{open_p:.2f}",
+        "high": f"{high:.2f}",
+        "low": f"{low:.2f}",
+        "close": f"{close:.2f}",
+        "volume": str(volume),
+        "amount": f"{volume * (open_p + close) / 2:.2f}",
+        "preclose": f"{pre_close:.2f}",
+    }
+
+
+# 令牌桶限流
+class _TokenBucket:
+    # 初始化
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    # 尝试获取一个令牌
+    def acquire(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+# 模拟服务（线程模型，每个连接一个线程，支持 keep-alive）
+class MockSinaServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    # 初始化
+    def __init__(self, address: tuple[str, int], config: MockConfig) -> None:
+        super().__init__(address, _Handler)
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.bucket = _TokenBucket(config.max_rps) if config.max_rps > 0 else None
+        self.stats_lock = threading.Lock()
+        self.stats: dict[str, int] = {"requests": 0, "ok": 0, "errors": 0, "timeouts": 0, "throttled": 0, "not_found": 0}
+
+    # 服务根地址
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # 累加统计
+    def count(self, key: str) -> None:
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    # 判断股票是否停牌
+    def is_suspended(self, symbol: str) -> bool:
+        return _fraction(symbol, "suspended") < self.config.suspended_rate
+
+    # 判断股票接口是否无数据
+    def is_missing(self, symbol: str) -> bool:
+        return _fraction(symbol, "missing") < self.config.missing_rate
+
+    # 查询 K 线（停牌股票截至上一交易日）
+    def kline(self, symbol: str, datalen: int) -> list[dict[str, str]]:
+        if self.is_missing(symbol):
+            return []
+        end = self.config.trade_date
+        if self.is_suspended(symbol):
+            end = _previous_session(end)
+        return [synthetic_bar(symbol, day) for day in _sessions(end, max(1, min(datalen, MAX_DATALEN)))]
+
+
+# 请求处理
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: MockSinaServer
+
+    # 关闭访问日志
+    def log_message(self, format: str, *args: Any) -> None:
+        return
+
+    # 写出响应
+    def _send(self, status: int, body: str, content_type: str = "application/json") -> None:
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    # 注入耗时、超时、限流与错误；返回 False 表示已响应错误
+    def _inject(self) -> bool:
+        server = self.server
+        config = server.config
+        if server.bucket is not None and not server.bucket.acquire():
+            server.count("throttled")
+            self._send(429, '{"error":"too many requests"}')
+            return False
+        roll = server.rng.random()
+        if roll < config.timeout_rate:
+            server.count("timeouts")
+            time.sleep(config.timeout_seconds)
+            self.close_connection = True
+            return False
+        delay_ms = config.latency_ms * math.exp(config.latency_sigma * server.rng.gauss(0, 1))
+        time.sleep(delay_ms / 1000)
+        if roll < config.timeout_rate + config.error_rate:
+            server.count("errors")
+            self._send(503, '{"error":"service unavailable"}')
+            return False
+        return True
+
+    # 处理 GET 请求
+    def do_GET(self) -> None:
+        server = self.server
+        parts = urlsplit(self.path)
+        path = unquote(parts.path)
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        if path == STATS_PATH:
+            with server.stats_lock:
+                self._send(200, json.dumps(server.stats))
+            return
+        server.count("requests")
+        if not self._inject():
+            return
+
+        if path in (KLINE_PATH, KLINE_ALT_PATH):
+            bars = server.kline(query.get("symbol", ""), int(query.get("datalen", 1)))
+            body, content_type = json.dumps(bars), "application/json"
+        elif path.startswith(JSONP_PREFIX) and path.endswith("CN_MarketData.getKLineData"):
+            # 路径形如 /cn/api/jsonp_v2.php/var _kline=/CN_MarketData.getKLineData
+            callback = path[len(JSONP_PREFIX):].split("/", 1)[0].rstrip("=") or "var _kline"
+            bars = server.kline(query.get("symbol", ""), int(query.get("datalen", 1)))
+            body, content_type = f"/*<script>location.href='//sina.com';</script>*/\n{callback}=({json.dumps(bars)});", "application/javascript"
+        elif path == STOCK_LIST_PATH:
+            body, content_type = self._stock_list(query), "application/json"
+        elif path.startswith(QUOTE_PAGE_PREFIX):
+            body, content_type = self._quote_page(path[len(QUOTE_PAGE_PREFIX):].split("/", 1)[0]), "text/html"
+        else:
+            server.count("not_found")
+            self._send(404, '{"error":"not found"}')
+            return
+        server.count("ok")
+        self._send(200, body, content_type)
+
+    # 股票列表（分页）
+    def _stock_list(self, query: dict[str, str]) -> str:
+        size = int(query.get("size", 100))
+        page = int(query.get("page", 1))
+        symbols = synthetic_symbols(self.server.config.universe_size)
+        items = [{"symbol": symbol, "code": symbol[2:], "name": f"模拟{symbol[2:]}"} for symbol in symbols[(page - 1) * size : page * size]]
+        return json.dumps({"result": {"status": {"code": 0}, "data": {"data": items, "total": len(symbols)}}}, ensure_ascii=False)
+
+    # 最小行情页面（包含 SinaQuotePage 解析所需的元素）
+    def _quote_page(self, symbol: str) -> str:
+        server = self.server
+        if server.is_suspended(symbol):
+            return f"<html><body><h1>{symbol}</h1><div id=\"closed\">停牌</div></body></html>"
+        bar = synthetic_bar(symbol, server.config.trade_date)
+        close, open_p = float(bar["close"]), float(bar["open"])
+        pre_close = float(bar["preclose"])
+        high, low = float(bar["high"]), float(bar["low"])
+        change = close - pre_close
+        rows = [
+            ("开", f"{open_p:.2f}", "高", f"{high:.2f}"),
+            ("低", f"{low:.2f}", "成交量", f"{int(bar['volume']) / 100:.0f}手"),
+            ("振幅", f"{(high - low) / pre_close * 100:.2f}%", "换手率", f"{_fraction(symbol, 'turnover') * 5:.2f}%"),
+        ]
+        table = "".join(f"<tr><th>{a}：</th><td>{b}</td><th>{c}：</th><td>{d}</td></tr>" for a, b, c, d in rows)
+        return (
+            f"<html><body><h1>{symbol}</h1>"
+            f"<div id=\"price\">{close:.2f}</div><div id=\"change\">{change:.2f}</div>"
+            f"<div id=\"changeP\">{change / pre_close * 100:.2f}%</div>"
+            f"<div id=\"hqDetails\"><table><tbody>{table}</tbody></table></div>"
+            "</body></html>"
+        )
+
+
+# 启动模拟服务（后台线程），返回服务对象
+def serve(config: MockConfig, host: str = "127.0.0.1", port: int = 0) -> MockSinaServer:
+    server = MockSinaServer((host, port), config)
+    threading.Thread(target=server.serve_forever, name="mock-sina", daemon=True).start()
+    return server
+
+
+# 为 MockConfig 的可选字段添加命令行参数
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    for field in fields(MockConfig):
+        if field.name == "trade_date":
+            continue
+        parser.add_argument(f"--{field.name.replace('_', '-')}", type=type(field.default), default=field.default)
+
+
+# 由命令行参数构建配置
+def config_from_args(args: argparse.Namespace, trade_date: str) -> MockConfig:
+    values = {field.name: getattr(args, field.name) for field in fields(MockConfig) if field.name != "trade_date"}
+    return MockConfig(trade_date=trade_date, **values)
+
+
+# 将配置转换为命令行参数（供基准在子进程中启动服务）
+def config_argv(config: MockConfig) -> list[str]:
+    argv = []
+    for field in fields(MockConfig):
+        argv += [f"--{field.name.replace('_', '-')}", str(getattr(config, field.name))]
+    return argv
+
+
+# 解析命令行参数
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="本地新浪行情模拟服务")
+    parser.add_argument("--trade-date", default=date.today().isoformat(), help="最新交易日 YYYY-MM-DD")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口（0 为随机端口）")
+    add_arguments(parser)
+    return parser.parse_args()
+
+
+# 主入口逻辑：启动后第一行输出服务地址
+def main() -> int:
+    args = parse_args()
+    server = MockSinaServer((args.host, args.port), config_from_args(args, args.trade_date))
+    print(f"READY {server.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+# 作为模块执行时的入口
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any
+
+# 项目根目录与入口脚本
+ROOT_DIR = Path(__file__).resolve().parents[2]
+MAIN_PATH = ROOT_DIR / "stock_collector" / "main.py"
+
+# 只导入命令处理函数而不执行，衡量各 CLI 模式的启动成本
+LOAD_SNIPPET = (
+    "import sys; sys.path.insert(0, {root!r}); "
+    "from stock_collector.main import load_command; load_command({mode!r})"
+)
+# 需要关注的重型依赖
+HEAVY_MODULES = ("pandas", "numpy", "playwright", "requests", "pytz", "exchange_calendars", "tushare")
+# 维护类命令（应在 1 秒内启动）
+MAINTENANCE_MODES = ("help", "refresh-universe")
+
+
+# 在子进程中运行 Python，返回耗时与 stderr
+def _run_python(args: list[str]) -> tuple[float, str]:
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, *args], cwd=ROOT_DIR, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"启动失败: {args}\n{proc.stderr[-2000:]}")
+    return elapsed, proc.stderr
+
+
+# 解析 -X importtime 输出为 (模块, 自身耗时 us, 累计耗时 us)
+def _parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|", 2)
+        entries.append((name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+# 按顶层包汇总导入耗时
+def _breakdown(entries: list[tuple[str, int, int]], top: int) -> dict[str, float]:
+    by_package: dict[str, int] = defaultdict(int)
+    for name, self_us, _ in entries:
+        by_package[name.split(".", 1)[0]] += self_us
+    ranked = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {package: round(us / 1000, 2) for package, us in ranked}
+
+
+# 测量单个 CLI 模式的启动成本
+def measure_mode(mode: str, repeat: int, top: int) -> dict[str, Any]:
+    if mode == "help":
+        args = [str(MAIN_PATH), "--help"]
+    else:
+        args = ["-c", LOAD_SNIPPET.format(root=str(ROOT_DIR), mode=mode)]
+    walls = [_run_python(args)[0] for _ in range(repeat)]
+    _, stderr = _run_python(["-X", "importtime", *args])
+    entries = _parse_importtime(stderr)
+    loaded = {name.split(".", 1)[0] for name, _, _ in entries}
+    return {
+        "mode": mode,
+        "wall_seconds_median": round(statistics.median(walls), 4),
+        "wall_seconds_min": round(min(walls), 4),
+        "import_ms_total": round(sum(self_us for _, self_us, _ in entries) / 1000, 2),
+        "heavy_modules": sorted(loaded.intersection(HEAVY_MODULES)),
+        "import_ms_by_package": _breakdown(entries, top),
+    }
+
+
+# 解析命令行参数
+def parse_args() -> argparse.Namespace:
+    from stock_collector.main import COMMANDS
+
+    parser = argparse.ArgumentParser(description="CLI 冷启动基准")
+    parser.add_argument("--modes", nargs="*", default=["help", *COMMANDS], help="需要测量的模式")
+    parser.add_argument("--repeat", type=int, default=5, help="每个模式的重复次数")
+    parser.add_argument("--top", type=int, default=12, help="导入耗时明细展示的包数量")
+    parser.add_argument("--output", help="结果 JSON 输出路径")
+    parser.add_argument(
+        "--fail-over",
+        type=float,
+        metavar="SECONDS",
+        help="维护类命令启动中位耗时超过该值时返回非零退出码",
+    )
+    return parser.parse_args()
+
+
+# 主入口逻辑
+def main() -> int:
+    args = parse_args()
+    results = [measure_mode(mode, args.repeat, args.top) for mode in args.modes]
+    payload = {
+        "python": sys.version.split()[0],
+        "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "modes": results,
+    }
+    text = json.dumps(payload, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    print(text)
+
+    # 维护类命令超出预算时报错，便于在 CI 中发现回归
+    if args.fail_over is not None:
+        slow = [
+            item["mode"]
+            for item in results
+            if item["mode"] in MAINTENANCE_MODES and item["wall_seconds_median"] > args.fail_over
+        ]
+        if slow:
+            print(f"[bench] 启动耗时超出预算 {args.fail_over}s: {slow}", file=sys.stderr)
+            return 1
+    return 0
+
+
+# 作为模块执行时的入口
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from stock_collector.bench.mock_sina import (
+    JSONP_PREFIX,
+    KLINE_ALT_PATH,
+    KLINE_PATH,
+    QUOTE_PAGE_PREFIX,
+    STOCK_LIST_PATH,
+    add_arguments,
+    config_argv,
+    config_from_args,
+    synthetic_symbols,
+    tradeable_symbols,
+)
+from stock_collector.config.settings import APP_CONFIG_ENV, load_app_config
+
+# 项目根目录（调度、爬虫等配置按相对路径读取）
+ROOT_DIR = Path(__file__).resolve().parents[2]
+
+
+# 默认基准日期：截至今天的最近一个上交所交易日（按交易日流程运行，含“交易日必须全部成功”的约束）
+def _default_date() -> str:
+    from stock_collector.pipeline.trading_calendar import is_calendar_trading_day, previous_session
+
+    today = date.today().isoformat()
+    return today if is_calendar_trading_day(today) else previous_session(today)
+
+
+# 在子进程中启动模拟服务（避免与采集进程争用 GIL 与内存统计），返回进程与服务地址
+def _start_server(argv: list[str]) -> tuple[subprocess.Popen, str]:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "stock_collector.bench.mock_sina", "--port", "0", *argv],
+        cwd=ROOT_DIR,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    # 服务启动后第一行输出地址，进程异常退出时读到空行
+    line = proc.stdout.readline() if proc.stdout else ""
+    if not line.startswith("READY "):
+        proc.kill()
+        raise RuntimeError(f"模拟服务启动失败: {line!r}")
+    return proc, line.split(" ", 1)[1].strip()
+
+
+# 写出指向模拟服务与临时目录的应用配置
+def _write_app_config(workdir: Path, base_url: str) -> Path:
+    config = load_app_config()
+    paths = {key: str(workdir / Path(value).name) for key, value in config["paths"].items()}
+    # 交易日历缓存沿用项目内文件
+    paths["calendar_cache"] = str(ROOT_DIR / config["paths"]["calendar_cache"])
+    paths["data_dir"] = str(workdir)
+    urls = {
+        "sina_stock_list": f"{base_url}{STOCK_LIST_PATH}?size=6000&page=1",
+        "sina_quote_page": f"{base_url}{QUOTE_PAGE_PREFIX}{{symbol}}/nc.shtml",
+        "sina_kline_api": f"{base_url}{KLINE_PATH}",
+        "sina_kline_api_alt": f"{base_url}{KLINE_ALT_PATH}",
+        "sina_kline_jsonp": f"{base_url}{JSONP_PREFIX}var%20_kline=",
+    }
+    path = workdir / "app.yaml"
+    path.write_text(yaml.safe_dump({"paths": paths, "urls": urls}, allow_unicode=True), encoding="utf-8")
+    return path
+
+
+# 当前进程的峰值 RSS（MB）
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# 数据库及 WAL 文件总大小（MB）
+def _db_size_mb(db_path: Path) -> float:
+    total = sum(path.stat().st_size for path in db_path.parent.glob(f"{db_path.name}*") if path.is_file())
+    return round(total / 1024 / 1024, 2)
+
+
+# 单只股票端到端耗时分位数（取自 fetch_timing 表，毫秒）
+def _symbol_latency(db_path: Path, trade_date: str) -> dict[str, float]:
+    import numpy as np
+
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT latency_ms FROM fetch_timing WHERE trade_date = ?", (trade_date,)).fetchall()
+    if not rows:
+        return {}
+    values = np.array([row[0] for row in rows], dtype=np.float64)
+    p50, p99 = np.percentile(values, [50, 99])
+    return {"p50_ms": round(float(p50), 2), "p99_ms": round(float(p99), 2), "max_ms": round(float(values.max()), 2)}
+
+
+# 执行一次完整采集（单分片模式：独立数据库与汇总文件，不发送通知与备份）
+def run_benchmark(args: argparse.Namespace) -> dict[str, Any]:
+    trade_date = args.date or _default_date()
+    mock_config = config_from_args(args, trade_date)
+    workdir = Path(tempfile.mkdtemp(prefix="stock_collector_bench_"))
+    proc, base_url = _start_server(config_argv(mock_config))
+    try:
+        os.environ[APP_CONFIG_ENV] = str(_write_app_config(workdir, base_url))
+        load_app_config.cache_clear()
+
+        from stock_collector.ops import tracing
+        from stock_collector.pipeline.run_after_close import run_collection
+        from stock_collector.pipeline.shard import Shard
+        from stock_collector.pipeline.trading_calendar import is_calendar_trading_day
+
+        shard = Shard(0, 1)
+        # 交易日股票池不含停牌股（与真实快照一致），非交易日保留以覆盖停牌处理路径
+        if is_calendar_trading_day(trade_date):
+            symbols = tradeable_symbols(args.symbols, mock_config.suspended_rate)
+        else:
+            symbols = synthetic_symbols(args.symbols)
+        tracing.start_run(trade_date, "bench")
+        error = None
+        started = time.perf_counter()
+        try:
+            exit_code = run_collection(trade_date, symbols, shard=shard)
+        except Exception as exc:
+            exit_code, error = None, repr(exc)
+        elapsed = time.perf_counter() - started
+
+        summary_path = shard.summary_path(trade_date)
+        summary = json.loads(summary_path.read_text(encoding="utf-8")) if summary_path.exists() else {}
+        db_path = shard.db_path(trade_date)
+        api = (summary.get("metrics") or {}).get("api", {}).get("latency", {})
+        return {
+            "trade_date": trade_date,
+            "symbols": len(symbols),
+            "exit_code": exit_code,
+            "error": error,
+            "wall_seconds": round(elapsed, 3),
+            "symbols_per_second": round(len(symbols) / elapsed, 1) if elapsed else 0.0,
+            "success": summary.get("success"),
+            "failed": summary.get("failed"),
+            "missing": summary.get("missing"),
+            "skipped": summary.get("skipped"),
+            "api_p50_ms": api.get("p50_ms"),
+            "api_p99_ms": api.get("p99_ms"),
+            "symbol_latency": _symbol_latency(db_path, trade_date) if db_path.exists() else {},
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+            "db_size_mb": _db_size_mb(db_path) if db_path.exists() else 0.0,
+            "stages": summary.get("stages", {}),
+            "retry": summary.get("retry", {}),
+            "hedge": summary.get("hedge", {}),
+            "server": _server_stats(base_url),
+            "mock": {key: value for key, value in vars(mock_config).items() if key != "trade_date"},
+            "workdir": str(workdir) if args.keep else None,
+        }
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+        os.environ.pop(APP_CONFIG_ENV, None)
+        load_app_config.cache_clear()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+# 读取模拟服务端统计
+def _server_stats(base_url: str) -> dict[str, int]:
+    import requests
+
+    try:
+        return requests.get(f"{base_url}/_stats", timeout=5).json()
+    except Exception:
+        return {}
+
+
+# 解析命令行参数
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="端到端采集吞吐基准（本地模拟新浪服务）")
+    parser.add_argument("--symbols", type=int, default=5000, help="合成股票数量")
+    parser.add_argument("--date", help="采集日期 YYYY-MM-DD（默认最近的交易日；交易日需全部成功否则报 FATAL）")
+    parser.add_argument("--output", help="结果 JSON 输出路径")
+    parser.add_argument("--keep", action="store_true", help="保留临时数据目录")
+    parser.add_argument(
+        "--fail-under",
+        type=float,
+        metavar="SYMBOLS_PER_SEC",
+        help="吞吐低于该值时返回非零退出码",
+    )
+    add_arguments(parser)
+    return parser.parse_args()
+
+
+# 主入口逻辑
+def main() -> int:
+    args = parse_args()
+    os.chdir(ROOT_DIR)
+    result = run_benchmark(args)
+    payload = {
+        "python": sys.version.split()[0],
+        "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "result": result,
+    }
+    text = json.dumps(payload, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    print(text)
+
+    if result["error"] is not None:
+        return 1
+    # 吞吐低于阈值时报错，便于在 CI 中发现回归
+    if args.fail_under is not None and result["symbols_per_second"] < args.fail_under:
+        print(f"[bench] 吞吐低于 {args.fail_under} symbols/s: {result['symbols_per_second']}", file=sys.stderr)
+        return 1
+    return 0
+
+
+# 作为模块执行时的入口
+if __name__ == "__main__":
+    sys.exit(main())
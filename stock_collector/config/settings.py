@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import os
 from functools import lru_cache
 from pathlib import Path
 from typing import Any
@@ -9,18 +10,26 @@ import yaml
 
 # 默认应用配置文件路径
 DEFAULT_APP_CONFIG_PATH = Path(__file__).with_name("app.yaml")
+# 指定替代应用配置的环境变量（基准测试等场景指向本地模拟服务与临时目录）
+APP_CONFIG_ENV = "STOCK_COLLECTOR_APP_CONFIG"
 
 
 # 加载应用配置（带缓存）
 @lru_cache
 def load_app_config(config_path: str | None = None) -> dict[str, Any]:
     # 解析配置文件路径
-    path = Path(config_path) if config_path else DEFAULT_APP_CONFIG_PATH
+    path = Path(config_path or os.environ.get(APP_CONFIG_ENV) or DEFAULT_APP_CONFIG_PATH)
     # 读取 YAML 配置
     with path.open("r", encoding="utf-8") as file_handle:
         return yaml.safe_load(file_handle) or {}
 
 
+# 加载 YAML 文件（调度、爬虫等按相对路径读取的配置）
+def load_yaml(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as file_handle:
+        return yaml.safe_load(file_handle)
+
+
 # 从配置中获取路径
 def get_path(key: str) -> Path:
     # 读取配置
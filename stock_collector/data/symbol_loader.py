@@ -1,6 +1,3 @@
-import pandas as pd
-
-
 # 加载可交易 A 股股票代码列表
 def load_tradeable_a_share_symbols(trade_date: str) -> list[str]:
     # 延迟导入 tushare 以避免无关环境问题
@@ -28,3 +25,40 @@ def load_tradeable_a_share_symbols(trade_date: str) -> list[str]:
 
     # 返回股票代码列表
     return symbols
+
+
+# 加载流通股本与总股本（单位换算为股），按 tushare 代码返回
+def load_share_capital(trade_date: str) -> dict[str, tuple[float, float]]:
+    # 延迟导入 tushare 以避免无关环境问题
+    import tushare as ts
+
+    # 获取交易日基础数据中的股本字段（万股）
+    pro = ts.pro_api()
+    df = pro.daily_basic(
+        trade_date=trade_date.replace("-", ""),
+        fields="ts_code,float_share,total_share",
+    )
+    df = df.dropna(subset=["float_share", "total_share"])
+    if df.empty:
+        raise RuntimeError(f"SHARE_CAPITAL_EMPTY: no daily_basic rows on {trade_date}")
+
+    # 返回股票代码到 (流通股本, 总股本) 的映射
+    return {
+        str(ts_code): (float(float_share) * 10000, float(total_share) * 10000)
+        for ts_code, float_share, total_share in df.itertuples(index=False)
+    }
+
+
+# 加载上市股票简称，按 tushare 代码返回
+def load_stock_names() -> dict[str, str]:
+    # 延迟导入 tushare 以避免无关环境问题
+    import tushare as ts
+
+    # 获取当前上市股票的基础信息
+    pro = ts.pro_api()
+    df = pro.stock_basic(list_status="L", fields="ts_code,name")
+    if df.empty:
+        raise RuntimeError("STOCK_NAMES_EMPTY: stock_basic returned no rows")
+
+    # 返回股票代码到简称的映射
+    return {str(ts_code): str(name) for ts_code, name in df.itertuples(index=False)}
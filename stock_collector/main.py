@@ -1,6 +1,8 @@
 import argparse
+import importlib
 import sys
 from pathlib import Path
+from typing import Callable
 
 # 计算项目根目录路径，确保本地模块可导入
 ROOT_DIR = Path(__file__).resolve().parents[1]
@@ -8,8 +10,26 @@ if str(ROOT_DIR) not in sys.path:
     # 将根目录插入到模块搜索路径
     sys.path.insert(0, str(ROOT_DIR))
 
-from stock_collector.meta.universe import refresh_universe_cache
-from stock_collector.pipeline.run_after_close import run
+# 各命令对应的处理函数（模块路径, 函数名），执行时才导入，避免短命令加载采集依赖
+COMMANDS = {
+    "refresh-universe": ("stock_collector.meta.universe", "refresh_universe_cache"),
+    "merge-shards": ("stock_collector.pipeline.run_after_close", "merge_shards"),
+    "run": ("stock_collector.pipeline.run_after_close", "run"),
+    "replay": ("stock_collector.pipeline.replay", "replay"),
+    "catch-up": ("stock_collector.pipeline.catch_up", "catch_up"),
+    "repair": ("stock_collector.pipeline.repair", "repair"),
+    "scan-gaps": ("stock_collector.pipeline.gap_scan", "run_scan"),
+    "audit": ("stock_collector.pipeline.bar_audit", "run_audit"),
+    "rebuild-adjustment": ("stock_collector.pipeline.adjustment", "rebuild_factors"),
+    "rebuild-periods": ("stock_collector.pipeline.period_bars", "rebuild_periods"),
+    "rebuild-features": ("stock_collector.pipeline.features", "rebuild_features"),
+}
+
+
+# 按需导入命令处理函数
+def load_command(name: str) -> Callable:
+    module_name, func_name = COMMANDS[name]
+    return getattr(importlib.import_module(module_name), func_name)
 
 
 # 解析命令行参数
@@ -19,7 +39,44 @@ def parse_args() -> argparse.Namespace:
     # 增加执行采集的参数
     parser.add_argument("--run", action="store_true", help="执行当日采集")
     # 增加刷新股票池的参数
-    parser.add_argument("--refresh-universe", action="store_true", help="刷新股票池缓存")
+    parser.add_argument("--refresh-universe", action="store_true", help="重新拉取交易日股票池快照（tushare daily_basic，默认当天）")
+    # 增加分片采集的参数
+    parser.add_argument("--shard", metavar="i/N", help="仅采集第 i 个分片（0 <= i < N），写入独立数据库")
+    # 增加合并分片的参数
+    parser.add_argument("--merge-shards", type=int, metavar="N", help="合并 N 个分片的数据库与汇总")
+    # 增加续跑的参数
+    parser.add_argument("--resume", action="store_true", help="从运行日志续跑中断的采集（可配合 --shard / --date）")
+    # 增加多日补采的参数
+    parser.add_argument("--catch-up", action="store_true", help="单进程补采 --since 至今需要（再次）采集的交易日")
+    # 增加定向补采的参数
+    parser.add_argument("--repair", action="store_true", help="补采 --since 至今状态为缺失/失败的股票（每只股票一次多日请求）")
+    # 增加历史缺口扫描的参数
+    parser.add_argument(
+        "--scan-gaps",
+        action="store_true",
+        help="按股票池上市期与交易日历扫描 daily_bar 历史缺口并写出报告（配合 --repair 按报告补采）",
+    )
+    # 增加数据质量审计的参数
+    parser.add_argument("--audit", action="store_true", help="分块审计全部历史日线的数据质量，结果写入 bar_audit 表")
+    # 增加重建复权事件的参数
+    parser.add_argument("--rebuild-adjustment", action="store_true", help="由全部历史日线重建除权除息事件（复权因子）")
+    # 增加重建周线 / 月线的参数
+    parser.add_argument("--rebuild-periods", action="store_true", help="由全部历史日线重建周线与月线物化表")
+    # 增加重建技术特征的参数
+    parser.add_argument("--rebuild-features", action="store_true", help="由全部历史日线重建技术特征与滚动状态")
+    parser.add_argument("--since", metavar="YYYY-MM-DD", help="补采起始日期（默认回溯 30 天；缺口扫描默认首个股票池快照）")
+    # 增加离线重放的参数
+    parser.add_argument("--replay", metavar="YYYY-MM-DD", help="从原始响应归档重建指定交易日的日线与 CSV，汇总写入 summary/replay（不联网）")
+    # 增加性能分析的参数
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="cpu",
+        choices=["cpu", "alloc"],
+        help="在分析器下执行采集（cpu 或 alloc），报告写入调试包目录",
+    )
+    # 增加目标日期的参数
+    parser.add_argument("--date", metavar="YYYY-MM-DD", help="目标交易日（默认市场时区当天）")
     # 返回解析后的参数
     return parser.parse_args()
 
@@ -31,10 +88,48 @@ def main() -> int:
     # 根据参数选择执行逻辑
     if args.refresh_universe:
         # 刷新股票池缓存
-        refresh_universe_cache()
+        load_command("refresh-universe")(trade_date=args.date)
         return 0
+    # 合并分片结果
+    if args.merge_shards:
+        return load_command("merge-shards")(args.merge_shards, target_date=args.date)
+    # 多日补采
+    if args.catch_up:
+        return load_command("catch-up")(since=args.since)
+    # 扫描历史缺口（可直接补采）
+    if args.scan_gaps:
+        return load_command("scan-gaps")(since=args.since, repair=args.repair)
+    # 全量数据质量审计
+    if args.audit:
+        return load_command("audit")()
+    # 重建复权因子
+    if args.rebuild_adjustment:
+        return load_command("rebuild-adjustment")()
+    # 重建周线 / 月线
+    if args.rebuild_periods:
+        return load_command("rebuild-periods")()
+    # 重建技术特征
+    if args.rebuild_features:
+        return load_command("rebuild-features")()
+    # 定向补采缺失/失败的股票
+    if args.repair:
+        return load_command("repair")(since=args.since)
+    # 从归档离线重建
+    if args.replay:
+        return load_command("replay")(args.replay)
     # 执行采集流程
-    return run()
+    shard = None
+    if args.shard:
+        from stock_collector.pipeline.shard import parse_shard
+
+        shard = parse_shard(args.shard)
+    run_command = load_command("run")
+    if args.profile:
+        from stock_collector.ops.profiling import run_profiled
+
+        label = f"{args.date}.{shard.tag}" if args.date and shard else args.date
+        return run_profiled(args.profile, lambda: run_command(shard=shard, target_date=args.date, resume=args.resume), label=label)
+    return run_command(shard=shard, target_date=args.date, resume=args.resume)
 
 
 # 作为脚本执行时的入口
@@ -0,0 +1,28 @@
+import logging
+import sqlite3
+from datetime import date
+
+from stock_collector.meta.universe import to_sina_symbol
+from stock_collector.storage.sqlite_store import fetch_float_shares, share_capital_as_of, upsert_share_capital
+
+# 股本缓存超过该天数后重新拉取（股本变动频率远低于日线）
+MAX_AGE_DAYS = 7
+
+
+# 读取各股票流通股本（股），缓存缺失或过期时先从 tushare 刷新（refresh 为假时只读缓存），刷新失败沿用已有缓存
+def load_float_shares(conn: sqlite3.Connection, trade_date: str, refresh: bool = True) -> dict[str, float]:
+    as_of = share_capital_as_of(conn)
+    if not refresh:
+        return fetch_float_shares(conn)
+    if as_of is None or (date.fromisoformat(trade_date) - date.fromisoformat(as_of)).days >= MAX_AGE_DAYS:
+        try:
+            # 延迟导入远程数据源
+            from stock_collector.data.symbol_loader import load_share_capital
+
+            capital = load_share_capital(trade_date)
+            rows = [(to_sina_symbol(code), float_shares, total_shares) for code, (float_shares, total_shares) in capital.items()]
+            upsert_share_capital(conn, rows, trade_date)
+            conn.commit()
+        except Exception as exc:
+            logging.getLogger(__name__).warning("share capital refresh failed, using cache as of %s: %r", as_of, exc)
+    return fetch_float_shares(conn)
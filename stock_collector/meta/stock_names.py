@@ -0,0 +1,22 @@
+import logging
+import sqlite3
+
+from stock_collector.meta.universe import to_sina_symbol
+from stock_collector.storage.sqlite_store import fetch_st_symbols, replace_stock_names, stock_names_as_of
+
+
+# 读取 ST 股票集合：简称早于交易日时先从 tushare 刷新（ST 摘帽/戴帽可能发生在任一交易日，refresh 为假时只读缓存），
+# 刷新失败沿用已有缓存
+def load_st_symbols(conn: sqlite3.Connection, trade_date: str, refresh: bool = True) -> set[str]:
+    as_of = stock_names_as_of(conn)
+    if refresh and (as_of is None or as_of < trade_date):
+        try:
+            # 延迟导入远程数据源
+            from stock_collector.data.symbol_loader import load_stock_names
+
+            names = load_stock_names()
+            replace_stock_names(conn, [(to_sina_symbol(code), name) for code, name in names.items()], trade_date)
+            conn.commit()
+        except Exception as exc:
+            logging.getLogger(__name__).warning("stock name refresh failed, using cache as of %s: %r", as_of, exc)
+    return fetch_st_symbols(conn)
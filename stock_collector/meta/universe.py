@@ -1,15 +1,15 @@
 import json
+import os
 from pathlib import Path
-from typing import Any
-from urllib.request import urlopen
+from typing import Any, Iterator
 
 import yaml
 
-from stock_collector.config.settings import get_url
-
 
 # 默认股票池配置路径
 DEFAULT_CONFIG_PATH = "stock_collector/config/stocks.yaml"
+# 两次全量快照之间最多保存的增量快照数（限制还原时需要回溯的文件数）
+FULL_SNAPSHOT_INTERVAL = 20
 
 
 # 读取股票池配置文件
@@ -19,59 +19,180 @@ def _read_config(config_path: str = DEFAULT_CONFIG_PATH) -> dict[str, Any]:
         return yaml.safe_load(file_handle)
 
 
-# 读取股票池列表（优先缓存）
+# 统一股票代码为新浪格式（600000.SH / SH600000 → sh600000）
+def to_sina_symbol(symbol: str) -> str:
+    value = symbol.strip()
+    if "." in value:
+        code, market = value.split(".", 1)
+        return f"{market.lower()}{code}"
+    return value.lower()
+
+
+# 快照目录
+def _universe_dir(config: dict[str, Any]) -> Path:
+    return Path(config["universe_dir"])
+
+
+# 快照文件路径
+def _snapshot_path(directory: Path, trade_date: str) -> Path:
+    return directory / f"{trade_date}.json"
+
+
+# 列出已有快照日期（升序）
+def snapshot_dates(config: dict[str, Any] | None = None) -> list[str]:
+    directory = _universe_dir(config or _read_config())
+    if not directory.exists():
+        return []
+    return sorted(path.stem for path in directory.glob("*.json"))
+
+
+# 读取快照原始内容
+def _read_payload(directory: Path, trade_date: str) -> dict[str, Any]:
+    return json.loads(_snapshot_path(directory, trade_date).read_text(encoding="utf-8"))
+
+
+# 写入快照（先写临时文件再替换）
+def _write_payload(directory: Path, payload: dict[str, Any]) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    path = _snapshot_path(directory, payload["date"])
+    tmp_path = path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+# 读取指定日期的股票池快照，沿增量链还原为完整列表（restored 为已还原的日期，命中时不再向前回溯）
+def load_snapshot(
+    trade_date: str,
+    config: dict[str, Any] | None = None,
+    restored: dict[str, list[str]] | None = None,
+) -> list[str] | None:
+    directory = _universe_dir(config or _read_config())
+    if not _snapshot_path(directory, trade_date).exists():
+        return None
+    known = restored or {}
+    payload = _read_payload(directory, trade_date)
+    chain = []
+    while "symbols" not in payload and payload["base"] not in known:
+        chain.append(payload)
+        payload = _read_payload(directory, payload["base"])
+    if "symbols" in payload:
+        symbols = set(payload["symbols"])
+    else:
+        chain.append(payload)
+        symbols = set(known[payload["base"]])
+    for delta in reversed(chain):
+        symbols.difference_update(delta["removed"])
+        symbols.update(delta["added"])
+    result = sorted(symbols)
+    if restored is not None:
+        restored[trade_date] = result
+    return result
+
+
+# 按日期升序批量读取快照（相邻日期共享增量链，每个文件只读一次）
+def load_snapshots(trade_dates: list[str], config: dict[str, Any] | None = None) -> dict[str, list[str] | None]:
+    config = config or _read_config()
+    restored: dict[str, list[str]] = {}
+    return {date_value: load_snapshot(date_value, config, restored) for date_value in sorted(trade_dates)}
+
+
+# 按日期升序遍历股票池变化 (日期, 新增, 移除)；首个快照全部计为新增，增量快照直接取其增减
+def iter_universe_changes(config: dict[str, Any] | None = None) -> Iterator[tuple[str, set[str], set[str]]]:
+    config = config or _read_config()
+    directory = _universe_dir(config)
+    current: set[str] = set()
+    previous_date = None
+    for date_value in snapshot_dates(config):
+        payload = _read_payload(directory, date_value)
+        if "symbols" not in payload and payload["base"] == previous_date:
+            added, removed = set(payload["added"]), set(payload["removed"])
+        else:
+            symbols = set(payload["symbols"]) if "symbols" in payload else set(load_snapshot(date_value, config) or [])
+            added, removed = symbols - current, current - symbols
+        current = (current - removed) | added
+        previous_date = date_value
+        yield date_value, added, removed
+
+
+# 覆盖某日快照前，将以其为基准的增量快照改写为全量，避免后续还原出错
+def _materialize_dependents(directory: Path, trade_date: str, config: dict[str, Any]) -> None:
+    for date_value in snapshot_dates(config):
+        if date_value <= trade_date:
+            continue
+        payload = _read_payload(directory, date_value)
+        if payload.get("base") == trade_date:
+            symbols = load_snapshot(date_value, config)
+            _write_payload(directory, {"date": date_value, "depth": 0, "symbols": symbols})
+
+
+# 保存股票池快照：相对上一份快照只记录增减，定期写全量；返回增减数量
+def save_snapshot(trade_date: str, symbols: list[str], config: dict[str, Any] | None = None) -> dict[str, int]:
+    config = config or _read_config()
+    directory = _universe_dir(config)
+    current = set(symbols)
+    if _snapshot_path(directory, trade_date).exists():
+        _materialize_dependents(directory, trade_date, config)
+
+    previous_dates = [date_value for date_value in snapshot_dates(config) if date_value < trade_date]
+    if not previous_dates:
+        _write_payload(directory, {"date": trade_date, "depth": 0, "symbols": sorted(current)})
+        return {"added": len(current), "removed": 0}
+
+    base = previous_dates[-1]
+    previous = set(load_snapshot(base, config) or [])
+    added = sorted(current - previous)
+    removed = sorted(previous - current)
+    depth = _read_payload(directory, base).get("depth", 0) + 1
+    if depth >= FULL_SNAPSHOT_INTERVAL:
+        payload = {"date": trade_date, "depth": 0, "symbols": sorted(current)}
+    else:
+        payload = {"date": trade_date, "base": base, "depth": depth, "added": added, "removed": removed}
+    _write_payload(directory, payload)
+    return {"added": len(added), "removed": len(removed)}
+
+
+# 获取指定交易日的可交易股票（优先读取本地快照，缺失时从 tushare daily_basic 整表拉取并按增减落盘；
+# 新浪股票列表不区分停牌、不能按日期查询，不作为股票池来源）
+def get_tradeable_symbols(trade_date: str, refresh: bool = False) -> list[str]:
+    config = _read_config()
+    if not refresh:
+        cached = load_snapshot(trade_date, config)
+        if cached:
+            return cached
+
+    # 延迟导入远程数据源
+    from stock_collector.data.symbol_loader import load_tradeable_a_share_symbols
+
+    symbols = sorted({to_sina_symbol(symbol) for symbol in load_tradeable_a_share_symbols(trade_date)})
+    diff = save_snapshot(trade_date, symbols, config)
+    print(f"[universe] {trade_date} 可交易股票 {len(symbols)} 只（tushare daily_basic；新增 {diff['added']}，移除 {diff['removed']}）")
+    return symbols
+
+
+# 读取股票池列表（优先最近一份快照）
 def load_universe(config: dict[str, Any]) -> list[str]:
-    # 缓存文件路径
-    cache_path = Path(config["universe_cache"])
-    if cache_path.exists():
+    dates = snapshot_dates(config)
+    if dates:
         try:
-            # 读取缓存内容
-            with cache_path.open("r", encoding="utf-8") as file_handle:
-                payload = json.load(file_handle)
-            if isinstance(payload, list):
-                symbols = payload
-            else:
-                symbols = payload.get("symbols", [])
+            symbols = load_snapshot(dates[-1], config)
             if symbols:
-                return [symbol.upper() for symbol in symbols]
+                return symbols
         except Exception as exc:
-            print(f"[universe] 读取缓存失败，使用默认列表: {exc}")
+            print(f"[universe] 读取快照失败，使用默认列表: {exc}")
     # 返回默认列表
-    return [symbol.upper() for symbol in config.get("default_symbols", [])]
+    return [to_sina_symbol(symbol) for symbol in config.get("default_symbols", [])]
 
 
-# 刷新股票池缓存
-def refresh_universe_cache(config_path: str = DEFAULT_CONFIG_PATH) -> list[str]:
-    # 读取配置并准备缓存目录
-    config = _read_config(config_path)
-    cache_path = Path(config["universe_cache"])
-    cache_path.parent.mkdir(parents=True, exist_ok=True)
-    default_symbols = [symbol.upper() for symbol in config.get("default_symbols", [])]
-    symbols: list[str] = []
+# 刷新股票池快照（默认市场时区当天，非交易日取上一交易日）
+def refresh_universe_cache(trade_date: str | None = None, config_path: str = DEFAULT_CONFIG_PATH) -> list[str]:
+    from stock_collector.pipeline.trading_calendar import is_calendar_trading_day, market_today, previous_session
 
-    # 通过公开接口抓取股票池
-    url = get_url("sina_stock_list")
+    target_date = trade_date or market_today()
+    if not is_calendar_trading_day(target_date):
+        target_date = previous_session(target_date)
     try:
-        with urlopen(url, timeout=10) as response:
-            payload = json.loads(response.read().decode("utf-8"))
-        data = payload.get("result", {}).get("data", [])
-        for item in data:
-            raw = item.get("symbol") or item.get("code") or ""
-            if not raw:
-                continue
-            raw_upper = raw.upper()
-            if raw_upper.startswith("SH") or raw_upper.startswith("SZ"):
-                symbols.append(raw_upper)
-        if not symbols:
-            raise ValueError("抓取结果为空")
-        print(f"[universe] 从公开接口抓取股票池: {len(symbols)}")
+        return get_tradeable_symbols(target_date, refresh=True)
     except Exception as exc:
-        # 抓取失败时回退到默认列表
-        print(f"[universe] 抓取股票池失败，使用默认列表: {exc}")
-        symbols = default_symbols
-
-    # 写入缓存文件
-    with cache_path.open("w", encoding="utf-8") as file_handle:
-        json.dump({"symbols": symbols}, file_handle, ensure_ascii=False, indent=2)
-    # 返回最终股票池
-    return symbols
+        # 拉取失败时回退到已有快照或默认列表
+        print(f"[universe] 刷新股票池失败，使用已有快照或默认列表: {exc}")
+        return load_universe(_read_config(config_path))
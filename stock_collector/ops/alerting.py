@@ -1,12 +1,5 @@
-import json
-from pathlib import Path
 from typing import Any
 
-from stock_collector.config.settings import get_path
-
-# 汇总文件目录
-SUMMARY_DIR = get_path("summary_dir")
-
 
 # 计算告警等级
 def compute_level(success_rate: float, consecutive_error_days: int, thresholds: dict[str, Any]) -> str:
@@ -19,28 +12,11 @@ def compute_level(success_rate: float, consecutive_error_days: int, thresholds:
     return "INFO"
 
 
-# 读取单个汇总文件的告警等级
-def _read_summary_level(path: Path) -> str:
-    try:
-        with path.open("r", encoding="utf-8") as file_handle:
-            return json.load(file_handle).get("level", "INFO")
-    except Exception:
-        return "INFO"
-
-
-# 计算连续错误天数
+# 计算连续错误天数（查询运行历史索引）
 def get_consecutive_error_days() -> int:
-    if not SUMMARY_DIR.exists():
-        return 0
-    files = sorted(SUMMARY_DIR.glob("*.json"), key=lambda path: path.stem, reverse=True)
-    count = 0
-    for file_path in files:
-        level = _read_summary_level(file_path)
-        if level in {"ERROR", "CRITICAL"}:
-            count += 1
-        else:
-            break
-    return count
+    from stock_collector.ops import run_history
+
+    return run_history.consecutive_error_days()
 
 
 # 根据规则判断是否需要人工介入
@@ -6,13 +6,13 @@ from pathlib import Path
 
 from stock_collector.config.settings import get_path
 
-# 数据目录与备份目录
-DATA_DIR = get_path("data_dir")
-BACKUP_DIR = get_path("backup_dir")
+# 备份目录
+def _backup_dir() -> Path:
+    return get_path("backup_dir")
 
 
 # 计算文件 SHA256
-def _file_hash(path: Path) -> str:
+def file_hash(path: Path) -> str:
     hasher = hashlib.sha256()
     with path.open("rb") as file_handle:
         for chunk in iter(lambda: file_handle.read(8192), b""):
@@ -23,7 +23,7 @@ def _file_hash(path: Path) -> str:
 # 创建备份包（数据库与汇总）
 def create_backup_bundle(date_value: str) -> Path:
     # 创建备份目录
-    backup_path = BACKUP_DIR / date_value
+    backup_path = _backup_dir() / date_value
     backup_path.mkdir(parents=True, exist_ok=True)
 
     db_path = get_path("db_path")
@@ -45,7 +45,7 @@ def create_backup_bundle(date_value: str) -> Path:
             {
                 "name": file_path.name,
                 "size": file_path.stat().st_size,
-                "sha256": _file_hash(file_path),
+                "sha256": file_hash(file_path),
             }
             for file_path in files
         ],
@@ -58,10 +58,11 @@ def create_backup_bundle(date_value: str) -> Path:
 
 # 清理过期备份
 def cleanup_backups(retention_days: int = 30) -> None:
-    if not BACKUP_DIR.exists():
+    backup_dir = _backup_dir()
+    if not backup_dir.exists():
         return
     cutoff = datetime.utcnow() - timedelta(days=retention_days)
-    for path in BACKUP_DIR.iterdir():
+    for path in backup_dir.iterdir():
         if not path.is_dir():
             continue
         try:
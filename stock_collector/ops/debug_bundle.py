@@ -8,8 +8,12 @@ from dataclasses import dataclass, asdict
 from pathlib import Path
 from typing import Any, Dict, Optional
 
+from stock_collector.config.settings import get_path
+
+
 # 调试信息输出目录
-DEBUG_DIR = Path("stock_collector/data/debug_bundle")
+def debug_dir() -> Path:
+    return get_path("debug_dir")
 
 
 # 调试包数据结构
@@ -56,8 +60,9 @@ def safe_env_snapshot() -> Dict[str, Any]:
 # 写入调试包到文件
 def write_bundle(b: DebugBundle) -> Path:
     # 确保输出目录存在
-    DEBUG_DIR.mkdir(parents=True, exist_ok=True)
-    path = DEBUG_DIR / f"{b.target_date}.{b.stage}.json"
+    directory = debug_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{b.target_date}.{b.stage}.json"
     # 序列化数据
     payload = asdict(b)
     payload["env"] = b.env
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import json
+from collections import Counter
+from threading import Lock
+from typing import Any
+
+# 请求来源：API 首次请求、API 重试、行情页面加载、页面 DOM 解析
+SOURCES = ("api", "retry", "http_page", "dom")
+# 每个数量级的子桶位数（128 个子桶，相对误差不超过 1/64）
+SUB_BUCKET_BITS = 7
+# 汇总中输出的分位数
+QUANTILES = (("p50_ms", 0.5), ("p90_ms", 0.9), ("p99_ms", 0.99))
+
+
+# 数值（微秒）映射到对数-线性桶
+def _bucket_index(value_us: int) -> int:
+    if value_us < (1 << SUB_BUCKET_BITS):
+        return value_us
+    shift = value_us.bit_length() - SUB_BUCKET_BITS
+    return (shift << (SUB_BUCKET_BITS - 1)) + (value_us >> shift)
+
+
+# 桶对应的最大值（微秒）
+def _bucket_upper(index: int) -> int:
+    if index < (1 << SUB_BUCKET_BITS):
+        return index
+    shift = (index >> (SUB_BUCKET_BITS - 1)) - 1
+    top = index - (shift << (SUB_BUCKET_BITS - 1))
+    return ((top + 1) << shift) - 1
+
+
+# HDR 风格的耗时直方图（稀疏桶，记录为 O(1)，可合并）
+class Histogram:
+    # 初始化
+    def __init__(self) -> None:
+        self.buckets: Counter[int] = Counter()
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    # 记录一次耗时（毫秒）
+    def record(self, latency_ms: float) -> None:
+        value_us = max(0, int(latency_ms * 1000))
+        self.buckets[_bucket_index(value_us)] += 1
+        self.count += 1
+        self.total_us += value_us
+        self.max_us = max(self.max_us, value_us)
+
+    # 合并另一个直方图
+    def merge(self, other: Histogram) -> None:
+        self.buckets.update(other.buckets)
+        self.count += other.count
+        self.total_us += other.total_us
+        self.max_us = max(self.max_us, other.max_us)
+
+    # 计算分位数（毫秒）
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        target = max(1, int(q * self.count + 0.5))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= target:
+                return min(_bucket_upper(index), self.max_us) / 1000
+        return self.max_us / 1000
+
+    # 导出为汇总字段（include_buckets 用于分片合并）
+    def snapshot(self, include_buckets: bool = False) -> dict[str, Any]:
+        payload: dict[str, Any] = {"count": self.count}
+        for key, q in QUANTILES:
+            payload[key] = round(self.quantile(q), 2)
+        payload["max_ms"] = round(self.max_us / 1000, 2)
+        payload["mean_ms"] = round(self.total_us / self.count / 1000, 2) if self.count else 0.0
+        if include_buckets:
+            payload["buckets"] = sorted(self.buckets.items())
+            payload["total_us"] = self.total_us
+        return payload
+
+    # 从快照还原（需包含桶数据）
+    @classmethod
+    def from_snapshot(cls, payload: dict[str, Any]) -> Histogram:
+        histogram = cls()
+        for index, count in payload.get("buckets", []):
+            histogram.buckets[int(index)] += int(count)
+        histogram.count = int(payload.get("count", 0))
+        histogram.total_us = int(payload.get("total_us", 0))
+        histogram.max_us = int(float(payload.get("max_ms", 0.0)) * 1000)
+        return histogram
+
+
+# 按来源统计的耗时直方图与结果计数（线程安全，异步代码在事件循环线程内直接调用）
+class MetricsRegistry:
+    # 初始化
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._histograms: dict[str, Histogram] = {}
+        self._outcomes: dict[str, Counter[str]] = {}
+
+    # 记录一次请求
+    def record(self, source: str, latency_ms: float, outcome: str) -> None:
+        with self._lock:
+            histogram = self._histograms.get(source)
+            if histogram is None:
+                histogram = self._histograms[source] = Histogram()
+                self._outcomes[source] = Counter()
+            histogram.record(latency_ms)
+            self._outcomes[source][outcome] += 1
+
+    # 导出快照
+    def snapshot(self, include_buckets: bool = False) -> dict[str, Any]:
+        with self._lock:
+            return {
+                source: {
+                    "latency": self._histograms[source].snapshot(include_buckets),
+                    "outcomes": dict(sorted(self._outcomes[source].items())),
+                }
+                for source in sorted(self._histograms, key=_source_order)
+            }
+
+
+# 来源排序（已知来源在前）
+def _source_order(source: str) -> tuple[int, str]:
+    return (SOURCES.index(source) if source in SOURCES else len(SOURCES), source)
+
+
+# 异常归类为结果标签（按类名判断，避免依赖 requests / playwright）
+def classify_exception(exc: BaseException) -> str:
+    response = getattr(exc, "response", None)
+    status_code = getattr(response, "status_code", None)
+    if status_code is not None:
+        return f"http_{status_code}"
+    message = str(exc)
+    if "API_MISSING" in message or type(exc).__name__ == "MissingBarError":
+        return "missing"
+    if "STOCK_SUSPENDED" in message:
+        return "suspended"
+    names = {cls.__name__ for cls in type(exc).__mro__}
+    if any("Timeout" in name for name in names):
+        return "timeout"
+    if "ConnectionError" in names:
+        return "connect_error"
+    if names & {"ValueError", "KeyError", "IndexError", "TypeError"}:
+        return "parse_error"
+    return "error"
+
+
+# 合并多个快照（快照需包含桶数据）
+def merge_snapshots(snapshots: list[dict[str, Any]], include_buckets: bool = False) -> dict[str, Any]:
+    histograms: dict[str, Histogram] = {}
+    outcomes: dict[str, Counter[str]] = {}
+    for snapshot in snapshots:
+        for source, item in (snapshot or {}).items():
+            histograms.setdefault(source, Histogram()).merge(Histogram.from_snapshot(item.get("latency", {})))
+            outcomes.setdefault(source, Counter()).update(item.get("outcomes", {}))
+    return {
+        source: {
+            "latency": histograms[source].snapshot(include_buckets),
+            "outcomes": dict(sorted(outcomes[source].items())),
+        }
+        for source in sorted(histograms, key=_source_order)
+    }
+
+
+# 去掉桶数据，仅保留分位数与计数（写入运行历史）
+def compact(snapshot: dict[str, Any]) -> str:
+    payload = {
+        source: {
+            "latency": {k: v for k, v in item.get("latency", {}).items() if k not in {"buckets", "total_us"}},
+            "outcomes": item.get("outcomes", {}),
+        }
+        for source, item in (snapshot or {}).items()
+    }
+    return json.dumps(payload, ensure_ascii=False)
+
+
+# 当前运行的统计
+_REGISTRY = MetricsRegistry()
+
+
+# 清零统计（每次采集前调用）
+def reset() -> None:
+    global _REGISTRY
+    _REGISTRY = MetricsRegistry()
+
+
+# 记录一次请求
+def record(source: str, latency_ms: float, outcome: str) -> None:
+    _REGISTRY.record(source, latency_ms, outcome)
+
+
+# 导出当前统计
+def snapshot(include_buckets: bool = False) -> dict[str, Any]:
+    return _REGISTRY.snapshot(include_buckets)
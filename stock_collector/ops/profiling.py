@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import cProfile
+import importlib.util
+import io
+import json
+import pstats
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable
+
+from stock_collector.ops.debug_bundle import debug_dir
+
+# 支持的分析模式
+PROFILE_MODES = ("cpu", "alloc")
+# tracemalloc 保存的调用栈深度
+ALLOC_TRACEBACK_DEPTH = 25
+# 报告中展示的条目数
+REPORT_TOP = 60
+# 内存折叠栈保留的调用栈数量（按存活字节数取前 N）
+ALLOC_COLLAPSE_TOP = 2000
+# 折叠栈中忽略的耗时（秒），避免调用图展开过大
+COLLAPSE_MIN_SECONDS = 1e-4
+# 折叠栈最大深度
+COLLAPSE_MAX_DEPTH = 64
+
+
+# 分析会话状态（checkpoint 在未开启分析时为空操作）
+_SESSION: dict[str, Any] | None = None
+
+
+# 当前进程的峰值 RSS（MB）
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 单位为字节，Linux 为 KB
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# 记录阶段检查点（耗时、峰值 RSS；内存模式下附带 tracemalloc 统计与新增分配最多的位置）
+def checkpoint(stage: str) -> None:
+    session = _SESSION
+    if session is None:
+        return
+    entry: dict[str, Any] = {
+        "stage": stage,
+        "elapsed_seconds": round(time.perf_counter() - session["started"], 3),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        entry["traced_current_mb"] = round(current / 1024 / 1024, 2)
+        entry["traced_peak_mb"] = round(peak / 1024 / 1024, 2)
+        snapshot = tracemalloc.take_snapshot()
+        previous = session.get("snapshot")
+        if previous is not None:
+            diff = snapshot.compare_to(previous, "lineno")[:10]
+            entry["top_growth"] = [
+                {"site": str(stat.traceback[0]), "size_diff_kb": round(stat.size_diff / 1024, 1), "count_diff": stat.count_diff}
+                for stat in diff
+            ]
+        session["snapshot"] = snapshot
+    session["checkpoints"].append(entry)
+
+
+# 格式化函数标识（折叠栈中不能出现分号）
+def _frame_name(func: tuple[str, int, str]) -> str:
+    filename, line, name = func
+    return f"{Path(filename).name}:{name}:{line}".replace(";", ",")
+
+
+# 由 pstats 调用图近似生成折叠栈（按调用边的累计耗时向下分摊，单位微秒）
+def _collapse_pstats(stats: pstats.Stats) -> dict[str, int]:
+    entries = stats.stats
+    callees: dict[tuple, list[tuple[tuple, float]]] = defaultdict(list)
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, caller_stats in callers.items():
+            callees[caller].append((func, caller_stats[3]))
+    roots = [func for func, (_, _, _, _, callers) in entries.items() if not callers]
+    collapsed: dict[str, float] = defaultdict(float)
+
+    # 沿调用路径分摊：weight 为本路径上分到的累计耗时
+    def walk(func: tuple, path: list[str], on_path: set, weight: float) -> None:
+        _, _, self_time, cumulative, _ = entries[func]
+        ratio = weight / cumulative if cumulative > 0 else 0.0
+        if self_time * ratio > 0:
+            collapsed[";".join(path)] += self_time * ratio
+        if len(path) >= COLLAPSE_MAX_DEPTH:
+            return
+        for callee, edge_time in callees.get(func, []):
+            child_weight = edge_time * ratio
+            if callee in on_path or child_weight < COLLAPSE_MIN_SECONDS:
+                continue
+            on_path.add(callee)
+            walk(callee, path + [_frame_name(callee)], on_path, child_weight)
+            on_path.discard(callee)
+
+    for root in roots:
+        walk(root, [_frame_name(root)], {root}, entries[root][3])
+    return {stack: int(seconds * 1_000_000) for stack, seconds in collapsed.items() if seconds > 0}
+
+
+# 输出文件路径（前缀已含日期等多个点号，不能用 with_suffix）
+def _output(prefix: Path, extension: str) -> Path:
+    return prefix.parent / f"{prefix.name}{extension}"
+
+
+# 写出折叠栈文件（flamegraph.pl / speedscope 可直接读取）
+def _write_collapsed(path: Path, collapsed: dict[str, int]) -> None:
+    lines = [f"{stack} {value}" for stack, value in sorted(collapsed.items()) if value > 0]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+# CPU 分析：主线程与工作线程各自挂载 cProfile，结束后合并
+def _run_cprofile(func: Callable[[], Any], prefix: Path) -> tuple[Any, list[Path]]:
+    thread_profiles: list[cProfile.Profile] = []
+    lock = threading.Lock()
+
+    # 新线程首次进入时挂载独立的 profiler（替换当前的 setprofile 钩子）
+    def start_thread_profile(*_args) -> None:
+        profile = cProfile.Profile()
+        with lock:
+            thread_profiles.append(profile)
+        profile.enable()
+
+    main_profile = cProfile.Profile()
+    threading.setprofile(start_thread_profile)
+    main_profile.enable()
+    try:
+        result = func()
+    finally:
+        main_profile.disable()
+        threading.setprofile(None)
+
+    stats = pstats.Stats(main_profile)
+    with lock:
+        for profile in thread_profiles:
+            try:
+                stats.add(profile)
+            except Exception:
+                # 仍在运行的线程可能无法导出，忽略
+                continue
+    stats.dump_stats(str(_output(prefix, ".prof")))
+
+    report = io.StringIO()
+    stats.stream = report
+    stats.sort_stats("cumulative").print_stats(REPORT_TOP)
+    report.write("\n")
+    stats.sort_stats("tottime").print_stats(REPORT_TOP)
+    report_path = _output(prefix, ".txt")
+    report_path.write_text(report.getvalue(), encoding="utf-8")
+
+    collapsed_path = _output(prefix, ".collapsed")
+    _write_collapsed(collapsed_path, _collapse_pstats(stats))
+    return result, [report_path, _output(prefix, ".prof"), collapsed_path]
+
+
+# CPU 分析：已安装 pyinstrument 时使用采样分析（支持 asyncio）
+def _run_sampling(func: Callable[[], Any], prefix: Path) -> tuple[Any, list[Path]]:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+
+    profiler = Profiler(async_mode="enabled")
+    profiler.start()
+    try:
+        result = func()
+    finally:
+        profiler.stop()
+    report_path = _output(prefix, ".txt")
+    report_path.write_text(profiler.output_text(unicode=True, show_all=False), encoding="utf-8")
+    speedscope_path = _output(prefix, ".speedscope.json")
+    speedscope_path.write_text(profiler.output(SpeedscopeRenderer()), encoding="utf-8")
+    return result, [report_path, speedscope_path]
+
+
+# 内存分析：tracemalloc 记录分配位置与调用栈
+def _run_tracemalloc(func: Callable[[], Any], prefix: Path) -> tuple[Any, list[Path]]:
+    tracemalloc.start(ALLOC_TRACEBACK_DEPTH)
+    try:
+        result = func()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ))
+
+    lines = [f"traced peak: {peak / 1024 / 1024:.2f} MB", "", "Top allocation sites (lineno):"]
+    for stat in snapshot.statistics("lineno")[:REPORT_TOP]:
+        lines.append(f"{stat.size / 1024:10.1f} KB {stat.count:8d} blocks  {stat.traceback[0]}")
+    lines += ["", "Top allocation sites (file):"]
+    for stat in snapshot.statistics("filename")[:20]:
+        lines.append(f"{stat.size / 1024:10.1f} KB {stat.count:8d} blocks  {stat.traceback[0].filename}")
+    report_path = _output(prefix, ".txt")
+    report_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    # 以仍存活的分配字节数为权重生成折叠栈
+    collapsed: dict[str, int] = defaultdict(int)
+    for stat in snapshot.statistics("traceback")[:ALLOC_COLLAPSE_TOP]:
+        frames = [f"{Path(frame.filename).name}:{frame.lineno}" for frame in reversed(stat.traceback)]
+        collapsed[";".join(frames)] += stat.size
+    collapsed_path = _output(prefix, ".collapsed")
+    _write_collapsed(collapsed_path, collapsed)
+    return result, [report_path, collapsed_path]
+
+
+# 在分析器下执行函数，报告写入调试包目录，返回函数结果
+def run_profiled(mode: str, func: Callable[[], Any], label: str | None = None) -> Any:
+    global _SESSION
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"未知的分析模式: {mode}（可选 {', '.join(PROFILE_MODES)}）")
+    label = label or time.strftime("%Y-%m-%d")
+    directory = debug_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    prefix = directory / f"{label}.profile.{mode}"
+
+    _SESSION = {"started": time.perf_counter(), "checkpoints": [], "snapshot": None}
+    try:
+        if mode == "alloc":
+            result, outputs = _run_tracemalloc(func, prefix)
+        elif importlib.util.find_spec("pyinstrument") is not None:
+            result, outputs = _run_sampling(func, prefix)
+        else:
+            result, outputs = _run_cprofile(func, prefix)
+    finally:
+        checkpoint("finished")
+        session, _SESSION = _SESSION, None
+        stages_path = _output(prefix, ".stages.json")
+        stages_path.write_text(json.dumps(session["checkpoints"], ensure_ascii=False, indent=2), encoding="utf-8")
+
+    for path in [*outputs, stages_path]:
+        print(f"[profile] {path}")
+    return result
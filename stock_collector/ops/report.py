@@ -1,15 +1,17 @@
 import json
 from collections import Counter
 from datetime import datetime
+from pathlib import Path
 from typing import Any
 
 from stock_collector.config.settings import get_path
 
 # 汇总文件目录
-SUMMARY_DIR = get_path("summary_dir")
+def _summary_dir() -> Path:
+    return get_path("summary_dir")
 
 
-# 构建并写入汇总信息
+# 构建汇总信息
 def build_summary(
     date_value: str,
     expected: int,
@@ -25,8 +27,6 @@ def build_summary(
     level: str,
     errors: list[str],
 ) -> dict[str, Any]:
-    # 确保输出目录存在
-    SUMMARY_DIR.mkdir(parents=True, exist_ok=True)
     # 统计最常见错误
     top_errors = Counter(errors).most_common(5)
     summary = {
@@ -60,16 +60,25 @@ def build_summary(
     )
     if counted != total:
         raise RuntimeError(f"Summary invariant broken: total={total}, counted={counted}")
-    # 写入汇总文件
-    summary_path = SUMMARY_DIR / f"{date_value}.json"
-    with summary_path.open("w", encoding="utf-8") as file_handle:
-        json.dump(summary, file_handle, ensure_ascii=False, indent=2)
     return summary
 
 
+# 写入汇总 JSON（默认写入汇总目录，同时追加运行历史；指定路径的分片汇总不计入历史）
+def write_summary(summary: dict[str, Any], summary_path: Path | None = None) -> Path:
+    if summary_path is None:
+        # 延迟导入，避免仅读取汇总时加载数据库模块
+        from stock_collector.ops import run_history
+
+        run_history.record_summary(summary)
+    path = summary_path or _summary_dir() / f"{summary['date']}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+    return path
+
+
 # 读取指定日期的汇总信息
 def load_summary(date_value: str) -> dict[str, Any] | None:
-    summary_path = SUMMARY_DIR / f"{date_value}.json"
+    summary_path = _summary_dir() / f"{date_value}.json"
     if not summary_path.exists():
         return None
     try:
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from contextlib import contextmanager
+from typing import Any
+
+from stock_collector.config.settings import get_path
+from stock_collector.ops import metrics
+from stock_collector.storage.schema import RunRecord
+from stock_collector.storage.sqlite_store import fetch_latest_run, insert_run_record, iter_latest_runs
+from stock_collector.storage.writer import open_db
+
+# 视为错误的告警等级
+ERROR_LEVELS = {"ERROR", "CRITICAL"}
+
+
+# 由汇总构建运行记录
+def record_from_summary(summary: dict[str, Any]) -> RunRecord:
+    stages = dict(summary.get("stages") or {})
+    if summary.get("fetch_span_seconds") is not None:
+        stages["fetch_span_seconds"] = summary["fetch_span_seconds"]
+    return RunRecord(
+        trade_date=summary["date"],
+        level=summary.get("level", "INFO"),
+        expected=int(summary.get("expected", 0) or 0),
+        success=int(summary.get("success", 0) or 0),
+        failed=int(summary.get("failed", 0) or 0),
+        missing=int(summary.get("missing", 0) or 0),
+        skipped=int(summary.get("skipped", 0) or 0),
+        retry_success=int(summary.get("retry_success", 0) or 0),
+        duration_seconds=float(summary.get("duration_seconds", 0.0) or 0.0),
+        skip_reason=summary.get("skip_reason") or "",
+        runner=summary.get("runner") or "",
+        stages=json.dumps(stages, ensure_ascii=False),
+        metrics=metrics.compact(summary.get("metrics") or {}),
+        generated_at=summary.get("generated_at") or "",
+    )
+
+
+# 历史表为空时从已有汇总文件导入（仅首次执行）
+def _backfill(conn: sqlite3.Connection) -> None:
+    if conn.execute("SELECT 1 FROM run_history LIMIT 1").fetchone() is not None:
+        return
+    summary_dir = get_path("summary_dir")
+    if not summary_dir.exists():
+        return
+    for path in sorted(summary_dir.glob("*.json"), key=lambda item: item.stem):
+        try:
+            summary = json.loads(path.read_text(encoding="utf-8"))
+            summary.setdefault("date", path.stem)
+            insert_run_record(conn, record_from_summary(summary))
+        except Exception:
+            # 无法解析的文件跳过
+            continue
+    conn.commit()
+
+
+# 打开主库并确保历史已导入
+@contextmanager
+def _history_db():
+    with open_db() as conn:
+        _backfill(conn)
+        yield conn
+
+
+# 追加一次运行记录
+def record_summary(summary: dict[str, Any]) -> None:
+    with _history_db() as conn:
+        insert_run_record(conn, record_from_summary(summary))
+
+
+# 获取指定日期最新一次运行记录
+def latest_run(date_value: str) -> RunRecord | None:
+    with _history_db() as conn:
+        return fetch_latest_run(conn, date_value)
+
+
+# 计算截至最近一次运行的连续错误天数（只读取连续段内的行）
+def consecutive_error_days() -> int:
+    count = 0
+    with _history_db() as conn:
+        for record in iter_latest_runs(conn):
+            if record.level not in ERROR_LEVELS:
+                break
+            count += 1
+    return count
+
+
+# 读取日期区间内每日最新运行记录（升序，用于趋势分析）
+def runs_between(start_date: str, end_date: str) -> list[RunRecord]:
+    with _history_db() as conn:
+        return list(reversed(list(iter_latest_runs(conn, start_date, end_date))))
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+from stock_collector.config.settings import get_path
+
+# Prometheus 指标前缀
+METRIC_PREFIX = "stock_collector"
+
+
+# 单个阶段的聚合耗时（流水线阶段并发执行，窗口为首次开始到最后结束）
+@dataclass
+class StageTiming:
+    # 首次开始时间（epoch 秒）
+    start: float
+    # 最后结束时间（epoch 秒）
+    end: float
+    # 处理条目数
+    items: int = 0
+    # 调用次数
+    calls: int = 0
+    # 各次调用耗时之和（秒，并发时可大于窗口）
+    busy_seconds: float = 0.0
+
+    # 窗口耗时（秒）
+    @property
+    def seconds(self) -> float:
+        return max(0.0, self.end - self.start)
+
+    # 吞吐（条/秒）
+    @property
+    def per_second(self) -> float:
+        return self.items / self.seconds if self.seconds > 0 else 0.0
+
+
+# 阶段计时句柄（在 with 块内补充条目数）
+@dataclass
+class SpanHandle:
+    # 条目数
+    items: int = 0
+
+
+# 单次运行的阶段计时器（线程安全）
+class Tracer:
+    # 初始化
+    def __init__(self, trade_date: str = "", tag: str = "") -> None:
+        self.trade_date = trade_date
+        self.tag = tag
+        self.started_at = time.time()
+        self._stages: dict[str, StageTiming] = {}
+        self._lock = Lock()
+
+    # 记录一段耗时，同名阶段合并窗口并累加条目
+    def mark(self, name: str, start: float, end: float, items: int = 0) -> None:
+        with self._lock:
+            stage = self._stages.get(name)
+            if stage is None:
+                stage = StageTiming(start=start, end=end)
+                self._stages[name] = stage
+            stage.start = min(stage.start, start)
+            stage.end = max(stage.end, end)
+            stage.items += items
+            stage.calls += 1
+            stage.busy_seconds += end - start
+
+    # 计时上下文
+    @contextmanager
+    def span(self, name: str, items: int = 0):
+        handle = SpanHandle(items)
+        start = time.time()
+        try:
+            yield handle
+        finally:
+            self.mark(name, start, time.time(), handle.items)
+
+    # 各阶段快照（按开始时间排序）
+    def stages(self) -> list[tuple[str, StageTiming]]:
+        with self._lock:
+            return sorted(self._stages.items(), key=lambda item: item[1].start)
+
+    # 汇总用的紧凑明细
+    def breakdown(self) -> dict[str, dict[str, Any]]:
+        return {
+            name: {
+                "seconds": round(stage.seconds, 3),
+                "busy_seconds": round(stage.busy_seconds, 3),
+                "items": stage.items,
+                "per_second": round(stage.per_second, 2),
+            }
+            for name, stage in self.stages()
+        }
+
+    # 导出 Chrome/Perfetto 可读的 JSON trace（每个阶段一条轨道）
+    def write_trace(self, path: Path) -> Path:
+        events = []
+        for tid, (name, stage) in enumerate(self.stages(), start=1):
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}})
+            events.append({
+                "name": name,
+                "ph": "X",
+                "pid": 1,
+                "tid": tid,
+                "ts": int((stage.start - self.started_at) * 1_000_000),
+                "dur": int(stage.seconds * 1_000_000),
+                "args": {"items": stage.items, "calls": stage.calls, "busy_seconds": round(stage.busy_seconds, 3)},
+            })
+        payload = {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "metadata": {"trade_date": self.trade_date, "tag": self.tag, "started_at": self.started_at},
+        }
+        _atomic_write(path, json.dumps(payload, ensure_ascii=False))
+        return path
+
+    # 导出 node_exporter textfile 格式的指标
+    def write_prometheus(self, path: Path) -> Path:
+        labels = f'date="{self.trade_date}",shard="{self.tag or "all"}"'
+        lines = []
+        gauges = (
+            ("stage_seconds", "各阶段窗口耗时（秒）", lambda stage: stage.seconds),
+            ("stage_busy_seconds", "各阶段调用耗时之和（秒）", lambda stage: stage.busy_seconds),
+            ("stage_items", "各阶段处理条目数", lambda stage: stage.items),
+            ("stage_items_per_second", "各阶段吞吐（条/秒）", lambda stage: stage.per_second),
+        )
+        stages = self.stages()
+        for metric, help_text, getter in gauges:
+            lines.append(f"# HELP {METRIC_PREFIX}_{metric} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{metric} gauge")
+            for name, stage in stages:
+                lines.append(f'{METRIC_PREFIX}_{metric}{{{labels},stage="{name}"}} {getter(stage):.6g}')
+        lines.append(f"# HELP {METRIC_PREFIX}_run_timestamp_seconds 运行开始时间")
+        lines.append(f"# TYPE {METRIC_PREFIX}_run_timestamp_seconds gauge")
+        lines.append(f"{METRIC_PREFIX}_run_timestamp_seconds{{{labels}}} {self.started_at:.3f}")
+        _atomic_write(path, "\n".join(lines) + "\n")
+        return path
+
+    # 写出 trace 与指标文件
+    def export(self) -> tuple[Path, Path]:
+        suffix = f".{self.tag}" if self.tag else ""
+        metrics_dir = get_path("metrics_dir")
+        trace_path = self.write_trace(metrics_dir / "trace" / f"{self.trade_date}{suffix}.json")
+        # textfile collector 只读取 *.prom，每次运行覆盖
+        prom_path = self.write_prometheus(metrics_dir / f"stock_collector{suffix}.prom")
+        return trace_path, prom_path
+
+
+# 先写临时文件再替换，避免采集方读取到半截文件
+def _atomic_write(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text(text, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+# 当前运行的计时器（未开始运行时记录到临时计时器）
+_CURRENT = Tracer()
+
+
+# 开始一次运行的计时
+def start_run(trade_date: str, tag: str = "") -> Tracer:
+    global _CURRENT
+    _CURRENT = Tracer(trade_date, tag)
+    return _CURRENT
+
+
+# 获取当前计时器
+def current() -> Tracer:
+    return _CURRENT
+
+
+# 在当前计时器上计时
+def span(name: str, items: int = 0):
+    return _CURRENT.span(name, items)
+
+
+# 在当前计时器上记录一段耗时
+def mark(name: str, start: float, end: float, items: int = 0) -> None:
+    _CURRENT.mark(name, start, end, items)
+
+
+# 导出阶段耗时（失败不影响采集结果）
+def export_quietly(tracer: Tracer) -> None:
+    try:
+        tracer.export()
+    except Exception as exc:
+        logging.getLogger(__name__).warning("阶段耗时导出失败: %s", exc)
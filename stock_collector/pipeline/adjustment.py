@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import time
+from dataclasses import replace
+from threading import Lock
+from typing import Any
+
+import numpy as np
+
+from stock_collector.ops import tracing
+from stock_collector.pipeline.trading_calendar import date_to_int, market_today, next_session
+from stock_collector.pipeline.validator import (
+    PRICE_TICK_TOLERANCE,
+    fetch_session_prev_close,
+    price_limit_ratios,
+    session_prev_close,
+)
+from stock_collector.storage.columnar import (
+    BarColumns,
+    date_ints,
+    fetch_day_derived,
+    fetch_symbol_columns,
+    group_bounds,
+    iter_history_chunks,
+)
+from stock_collector.storage.sqlite_store import (
+    adj_event_stamp,
+    clear_adj_events,
+    fetch_adj_events,
+    init_db,
+    insert_adj_events,
+    replace_adj_events,
+)
+from stock_collector.storage.writer import open_db
+
+# 支持的复权方式：前复权（最新价不变）与后复权（上市首日价不变）
+ADJUST_MODES = ("qfq", "hfq")
+# 全量重建时每块读取的日线行数
+REBUILD_CHUNK_ROWS = 200_000
+
+
+# 识别除权除息：数据源昨收与库中前收盘不一致即为除权日，比例 = 前收盘 / 昨收；
+# 无数据源昨收时，开盘价低于按前收盘计算的跌停价（涨跌停限制下不可能出现）视为价格断层，按开盘价估计比例。
+# prev_close 须为上一交易日的收盘价（有缺口时为 NaN，不识别），返回每行比例（无事件为 NaN）与是否为估计值
+def detect_actions(
+    columns: BarColumns,
+    pre_close: np.ndarray,
+    prev_close: np.ndarray,
+    limit_ratio: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    ratio = np.full(len(columns), np.nan, dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        has_prev = prev_close > 0
+        declared = has_prev & (pre_close > 0) & (np.abs(pre_close - prev_close) > PRICE_TICK_TOLERANCE)
+        lower = np.round(prev_close * (1 - limit_ratio), 2) - PRICE_TICK_TOLERANCE
+        estimated = has_prev & ~(pre_close > 0) & (columns.open > 0) & (columns.open < lower)
+    ratio[declared] = prev_close[declared] / pre_close[declared]
+    ratio[estimated] = prev_close[estimated] / columns.open[estimated]
+    return ratio, estimated
+
+
+# 有事件的行转为 (股票, 除权日, 比例, 来源)
+def _events(columns: BarColumns, ratio: np.ndarray, estimated: np.ndarray) -> list[tuple[str, str, float, str]]:
+    rows = np.flatnonzero(~np.isnan(ratio))
+    return [
+        (str(columns.symbol[row]), str(columns.trade_date[row]), float(ratio[row]), "estimated" if estimated[row] else "pre_close")
+        for row in rows.tolist()
+    ]
+
+
+# 复权因子缓存：每只股票缓存除权日（YYYYMMDD 整数）与后复权累计因子，
+# 读取前比对事件表的 (条数, 最近更新时间)，其他进程写入新事件后自动失效
+class FactorCache:
+    # 初始化
+    def __init__(self) -> None:
+        self._entries: dict[str, tuple[tuple, np.ndarray, np.ndarray]] = {}
+        self._lock = Lock()
+
+    # 读取单只股票的除权日与累计因子（累计因子首个元素为 1，第 k 个为前 k 次事件比例之积）
+    def get(self, conn: sqlite3.Connection, symbol: str) -> tuple[np.ndarray, np.ndarray]:
+        stamp = adj_event_stamp(conn, symbol)
+        with self._lock:
+            entry = self._entries.get(symbol)
+        if entry is not None and entry[0] == stamp:
+            return entry[1], entry[2]
+        events = fetch_adj_events(conn, symbol)
+        days = np.array([date_to_int(ex_date) for ex_date, _ in events], dtype=np.int32)
+        cumulative = np.concatenate([[1.0], np.cumprod(np.array([ratio for _, ratio in events], dtype=np.float64))])
+        with self._lock:
+            self._entries[symbol] = (stamp, days, cumulative)
+        return days, cumulative
+
+    # 使部分（或全部）股票的缓存失效
+    def invalidate(self, symbols: list[str] | None = None) -> None:
+        with self._lock:
+            if symbols is None:
+                self._entries.clear()
+                return
+            for symbol in symbols:
+                self._entries.pop(symbol, None)
+
+
+# 进程内共享的因子缓存
+_FACTORS = FactorCache()
+
+
+# 各交易日的复权因子：后复权为截至当日的累计因子，前复权再除以最新累计因子
+def adjust_factors(conn: sqlite3.Connection, symbol: str, trade_dates: np.ndarray, mode: str) -> np.ndarray:
+    days, cumulative = _FACTORS.get(conn, symbol)
+    factors = cumulative[np.searchsorted(days, date_ints(trade_dates), side="right")]
+    return factors / cumulative[-1] if mode == "qfq" else factors
+
+
+# 读取单只股票日线（adjust 为 qfq / hfq 时四个价格乘以缓存的复权因子，成交量与成交额保持原值）
+def read_bars(
+    conn: sqlite3.Connection,
+    symbol: str,
+    start: str | None = None,
+    end: str | None = None,
+    adjust: str | None = None,
+) -> BarColumns:
+    if adjust is not None and adjust not in ADJUST_MODES:
+        raise ValueError(f"unknown adjust mode: {adjust}")
+    columns = fetch_symbol_columns(conn, symbol, start, end)
+    if adjust is None or not len(columns):
+        return columns
+    factors = adjust_factors(conn, symbol, columns.trade_date, adjust)
+    return replace(
+        columns,
+        open=columns.open * factors,
+        high=columns.high * factors,
+        low=columns.low * factors,
+        close=columns.close * factors,
+    )
+
+
+# 识别单日除权除息事件并重写该日事件（symbols 非空时只处理这些股票），返回当日有日线的股票与统计
+def _detect_day(conn: sqlite3.Connection, trade_date: str, symbols: list[str] | None) -> tuple[list[str], dict[str, int]]:
+    columns, derived = fetch_day_derived(conn, trade_date, symbols)
+    if not len(columns):
+        return [], {"events": 0, "estimated": 0}
+    prev_close = fetch_session_prev_close(conn, trade_date, columns.symbol)
+    ratio, estimated = detect_actions(columns, derived.pre_close, prev_close, price_limit_ratios(columns.symbol))
+    events = _events(columns, ratio, estimated)
+    replace_adj_events(
+        conn,
+        trade_date,
+        symbols,
+        [(symbol, value, source) for symbol, _, value, source in events],
+    )
+    _FACTORS.invalidate([symbol for symbol, *_ in events] if symbols is None else symbols)
+    return columns.symbol.tolist(), {
+        "events": len(events),
+        "estimated": sum(1 for *_, source in events if source == "estimated"),
+    }
+
+
+# 增量更新单日除权除息事件（全天落库后执行，重跑同一日会先清除该日旧事件）。
+# 补齐的日期改变了下一交易日的前收盘，已入库的下一交易日对这些股票一并重新识别
+def update_day(conn: sqlite3.Connection, trade_date: str, symbols: list[str] | None = None) -> dict[str, Any]:
+    touched, stats = _detect_day(conn, trade_date, symbols)
+    if touched:
+        _, following = _detect_day(conn, next_session(trade_date), touched)
+        stats["next_day_events"] = following["events"]
+    return stats
+
+
+# 由全部历史重建除权除息事件（按股票顺序分块读取，相邻两行为相邻交易日时构成前收盘）
+def rebuild_factors(chunk_rows: int = REBUILD_CHUNK_ROWS) -> int:
+    log = logging.getLogger(__name__)
+    tracer = tracing.start_run(market_today(), "adjust")
+    try:
+        started = time.time()
+        scanned = 0
+        events = 0
+        estimated = 0
+        init_db()
+        with open_db() as conn, tracing.span("adjust_rebuild") as span:
+            clear_adj_events(conn)
+            for chunk in iter_history_chunks(conn, chunk_rows):
+                columns = chunk.columns
+                starts, ends = group_bounds(columns.symbol)
+                limit_ratio = np.repeat(price_limit_ratios(columns.symbol[starts]), ends - starts)
+                ratio, guessed = detect_actions(columns, chunk.pre_close, session_prev_close(columns), limit_ratio)
+                rows = _events(columns, ratio, guessed)
+                insert_adj_events(conn, rows)
+                scanned += len(columns)
+                events += len(rows)
+                estimated += int(np.count_nonzero(guessed))
+            span.items = scanned
+            conn.commit()
+        _FACTORS.invalidate()
+        log.info(
+            "adjustment factors rebuilt in %.1fs: rows=%s events=%s estimated=%s",
+            time.time() - started, scanned, events, estimated,
+        )
+        return 0
+    finally:
+        tracing.export_quietly(tracer)
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from stock_collector.config.settings import get_path
+from stock_collector.ops import tracing
+from stock_collector.pipeline.trading_calendar import market_today
+from stock_collector.pipeline.validator import (
+    CODE_CLOSE_OUT_OF_RANGE,
+    CODE_HIGH_BELOW_LOW,
+    CODE_NEGATIVE_VOLUME,
+    CODE_NON_POSITIVE_PRICE,
+    CODE_OPEN_OUT_OF_RANGE,
+    CODE_PRICE_LIMIT,
+    price_limit_ratios,
+    session_prev_close,
+    validate_bars,
+)
+from stock_collector.storage.columnar import HistoryChunk, group_bounds, iter_history_chunks
+from stock_collector.storage.schema import AuditFinding
+from stock_collector.storage.sqlite_store import clear_audit_findings, init_db, insert_audit_findings, now_iso
+from stock_collector.storage.writer import open_db
+
+# 跨日审计规则位（接续 validator 的批量校验错误码）
+CODE_ZERO_VOLUME = 1 << 7
+CODE_CHANGE_FROM_OPEN = 1 << 8
+CODE_CHANGE_MISMATCH = 1 << 9
+
+# 规则位对应的 (规则名, 严重程度)
+AUDIT_RULES = {
+    CODE_NON_POSITIVE_PRICE: ("non_positive_price", "error"),
+    CODE_HIGH_BELOW_LOW: ("high_below_low", "error"),
+    CODE_OPEN_OUT_OF_RANGE: ("open_out_of_range", "error"),
+    CODE_CLOSE_OUT_OF_RANGE: ("close_out_of_range", "error"),
+    CODE_NEGATIVE_VOLUME: ("negative_volume", "error"),
+    CODE_PRICE_LIMIT: ("price_limit", "warning"),
+    CODE_ZERO_VOLUME: ("zero_volume", "warning"),
+    CODE_CHANGE_FROM_OPEN: ("change_from_open", "warning"),
+    CODE_CHANGE_MISMATCH: ("change_mismatch", "warning"),
+}
+
+# 每块读取的日线行数（决定审计的内存上限）
+AUDIT_CHUNK_ROWS = 200_000
+# 涨跌额按分取整、涨跌幅按 0.01% 取整，比较时的容差
+CHANGE_TOLERANCE = 0.011
+CHANGE_PCT_TOLERANCE = 0.011
+
+
+# 审计一块日线：昨收优先取数据源昨收（除权日以其为基准），缺失时仅在上一行恰为上一交易日时取其收盘价，
+# 返回每行的规则位与昨收（两者都没有时为 NaN，跳过涨跌停与涨跌额规则）
+def audit_chunk(chunk: HistoryChunk) -> tuple[np.ndarray, np.ndarray]:
+    columns = chunk.columns
+    starts, ends = group_bounds(columns.symbol)
+    prev_close = np.where(np.nan_to_num(chunk.pre_close) > 0, chunk.pre_close, session_prev_close(columns))
+
+    # 单行 OHLC 与涨跌停规则复用批量校验（板块限制按股票计算一次后展开）
+    limit_ratio = np.repeat(price_limit_ratios(columns.symbol[starts]), ends - starts)
+    codes = validate_bars(columns, prev_close=prev_close, limit_ratio=limit_ratio)
+    codes[columns.volume == 0] |= CODE_ZERO_VOLUME
+
+    # 涨跌额/涨跌幅应以昨收为基准；与按开盘价计算的结果吻合时单独归类
+    with np.errstate(divide="ignore", invalid="ignore"):
+        known = prev_close > 0
+        expected_change = columns.close - prev_close
+        expected_pct = expected_change / prev_close * 100
+        open_change = columns.close - columns.open
+        open_pct = np.where(columns.open > 0, open_change / columns.open * 100, 0.0)
+        off = known & (
+            (np.abs(chunk.change - expected_change) > CHANGE_TOLERANCE)
+            | (np.abs(chunk.change_pct - expected_pct) > CHANGE_PCT_TOLERANCE)
+        )
+        from_open = off & (np.abs(chunk.change - open_change) <= CHANGE_TOLERANCE) & (
+            np.abs(chunk.change_pct - open_pct) <= CHANGE_PCT_TOLERANCE
+        )
+    codes[from_open] |= CODE_CHANGE_FROM_OPEN
+    codes[off & ~from_open] |= CODE_CHANGE_MISMATCH
+    return codes, prev_close
+
+
+# 命中行的明细文本
+def _detail(chunk: HistoryChunk, prev_close: np.ndarray, row: int) -> str:
+    columns = chunk.columns
+    return (
+        f"open={columns.open[row]:g} high={columns.high[row]:g} low={columns.low[row]:g} "
+        f"close={columns.close[row]:g} prev_close={prev_close[row]:g} change={chunk.change[row]:g} "
+        f"change_pct={chunk.change_pct[row]:g} volume={columns.volume[row]}"
+    )
+
+
+# 将每条规则在同一股票内连续命中的行合并为区间
+def _findings(chunk: HistoryChunk, codes: np.ndarray, prev_close: np.ndarray, audited_at: str) -> list[AuditFinding]:
+    columns = chunk.columns
+    starts, ends = group_bounds(columns.symbol)
+    first = np.zeros(len(columns), dtype=bool)
+    first[starts] = True
+    last = np.zeros(len(columns), dtype=bool)
+    last[ends - 1] = True
+
+    findings: list[AuditFinding] = []
+    for bit, (rule, severity) in AUDIT_RULES.items():
+        flagged = (codes & bit) != 0
+        if not flagged.any():
+            continue
+        run_starts = np.flatnonzero(flagged & (first | ~np.r_[False, flagged[:-1]]))
+        run_ends = np.flatnonzero(flagged & (last | ~np.r_[flagged[1:], False]))
+        for begin, end in zip(run_starts.tolist(), run_ends.tolist()):
+            findings.append(AuditFinding(
+                symbol=str(columns.symbol[begin]),
+                rule=rule,
+                start_date=str(columns.trade_date[begin]),
+                end_date=str(columns.trade_date[end]),
+                rows=end - begin + 1,
+                severity=severity,
+                detail=_detail(chunk, prev_close, begin),
+                audited_at=audited_at,
+            ))
+    return findings
+
+
+# 全量审计 daily_bar：按股票顺序分块读取、向量化检查相邻交易日，结果整体重写 bar_audit 表
+# 并写出按规则的统计（存在 error 级问题时返回 2）
+def run_audit(chunk_rows: int = AUDIT_CHUNK_ROWS) -> int:
+    log = logging.getLogger(__name__)
+    today = market_today()
+    tracer = tracing.start_run(today, "audit")
+    try:
+        started = time.time()
+        audited_at = now_iso()
+        stats: dict[str, dict] = defaultdict(lambda: {"severity": "", "findings": 0, "rows": 0, "symbols": 0})
+        scanned = 0
+        init_db()
+        with open_db() as conn, tracing.span("bar_audit") as span:
+            clear_audit_findings(conn)
+            for chunk in iter_history_chunks(conn, chunk_rows):
+                codes, prev_close = audit_chunk(chunk)
+                findings = _findings(chunk, codes, prev_close, audited_at)
+                insert_audit_findings(conn, findings)
+                scanned += len(chunk.columns)
+                # 同一股票不跨块，按块去重即可得到股票数
+                symbols_by_rule: dict[str, set[str]] = defaultdict(set)
+                for finding in findings:
+                    entry = stats[finding.rule]
+                    entry["severity"] = finding.severity
+                    entry["findings"] += 1
+                    entry["rows"] += finding.rows
+                    symbols_by_rule[finding.rule].add(finding.symbol)
+                for rule, symbols in symbols_by_rule.items():
+                    stats[rule]["symbols"] += len(symbols)
+            span.items = scanned
+            conn.commit()
+
+        audit_dir = get_path("audit_dir")
+        audit_dir.mkdir(parents=True, exist_ok=True)
+        path = audit_dir / f"bar_audit_{today}.json"
+        payload = {"audited_at": audited_at, "rows": scanned, "rules": dict(stats)}
+        path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        log.info(
+            "bar audit finished in %.1fs: rows=%s findings=%s report=%s",
+            time.time() - started, scanned, {rule: entry["rows"] for rule, entry in stats.items()}, path,
+        )
+        return 2 if any(entry["severity"] == "error" for entry in stats.values()) else 0
+    finally:
+        tracing.export_quietly(tracer)
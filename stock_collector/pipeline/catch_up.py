@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import date, timedelta
+from threading import Lock
+from typing import Any, Awaitable, Callable
+
+from stock_collector.config.settings import get_path
+from stock_collector.meta.universe import get_tradeable_symbols, load_snapshots
+from stock_collector.ops import tracing
+from stock_collector.pipeline.run_after_close import CollectDeps, dates_to_collect, record_crash, run_async
+from stock_collector.pipeline.trading_calendar import market_today, sessions_between
+from stock_collector.pipeline.validator import MissingBarError
+from stock_collector.scraper.parsers import parse_kline_json
+from stock_collector.scraper.sina_api import fetch_kline_text
+from stock_collector.storage import raw_archive
+from stock_collector.storage.sqlite_store import default_db_path, init_db
+from stock_collector.storage.writer import open_db
+
+# 未指定起始日期时回溯的自然日数
+DEFAULT_LOOKBACK_DAYS = 30
+# 交易日历与接口偶有出入（如临时休市），K 线窗口多取的根数
+DATALEN_MARGIN = 2
+
+
+# 覆盖 first_date 至 today 所需的 K 线根数
+def kline_datalen(first_date: str, today: str) -> int:
+    return len(sessions_between(first_date, today)) + DATALEN_MARGIN
+
+
+# 按股票合并的多日 K 线抓取：每只股票首次请求覆盖全部补采日期，之后的日期直接解析缓存的响应
+class MultiDayKline:
+    # 初始化（datalen 为覆盖最早补采日期所需的 K 线根数）
+    def __init__(self, datalen: int) -> None:
+        self.datalen = datalen
+        self._payloads: dict[str, str] = {}
+        self._lock = Lock()
+        self.requests = 0
+        self.cache_hits = 0
+
+    # 抓取单只股票指定交易日的日线（签名与 fetch_daily_bar_from_sina_api 一致；失败不缓存，下一日期重新请求）
+    def __call__(self, symbol: str, trade_date: str) -> dict:
+        with self._lock:
+            text = self._payloads.get(symbol)
+        if text is None:
+            text = fetch_kline_text(symbol, self.datalen)
+            with self._lock:
+                self._payloads[symbol] = text
+                self.requests += 1
+        else:
+            with self._lock:
+                self.cache_hits += 1
+            # 命中缓存同样写入当日归档，保证按日离线重放
+            raw_archive.append("api", symbol, text, 200)
+        return parse_kline_json(text, symbol, trade_date)
+
+    # 请求与命中统计
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"datalen": self.datalen, "requests": self.requests, "cache_hits": self.cache_hits}
+
+
+# 历史交易日的页面兜底：行情页只有最新一日，直接判为缺失
+def _history_dom(trade_date: str) -> Callable[[Any, str], Awaitable[dict]]:
+    async def fetch(page: Any, symbol: str) -> dict:
+        raise MissingBarError(symbol, trade_date, "行情页不提供历史交易日数据")
+
+    return fetch
+
+
+# 加载各日期股票池（相邻日期共享快照增量链，缺失快照的日期按原逻辑拉取并落盘）
+def _load_universes(dates: list[str]) -> dict[str, list[str]]:
+    snapshots = load_snapshots(dates)
+    return {date_value: symbols or get_tradeable_symbols(date_value) for date_value, symbols in snapshots.items()}
+
+
+# 在同一事件循环中逐日采集，共享 HTTP Session、K 线缓存与数据库连接
+async def _catch_up_async(dates: list[str], today: str) -> int:
+    log = logging.getLogger(__name__)
+    universes = _load_universes(dates)
+    fetcher = MultiDayKline(kline_datalen(dates[0], today))
+    db_path = default_db_path()
+    init_db(db_path)
+    exit_code = 0
+
+    with open_db(db_path, check_same_thread=False) as conn:
+        for trade_date in dates:
+            tracer = tracing.start_run(trade_date)
+            deps = CollectDeps(fetch_api=fetcher, conn=conn)
+            if trade_date != today:
+                # 历史交易日不启动浏览器
+                deps.fetch_dom = _history_dom(trade_date)
+                deps.open_browser = None
+            try:
+                code = await run_async(trade_date, universes[trade_date], db_path=db_path, deps=deps)
+            except Exception as exc:
+                # 单日失败不影响其余日期
+                log.error("catch-up failed for %s: %r", trade_date, exc)
+                conn.rollback()
+                record_crash(trade_date, exc)
+                code = 1
+            finally:
+                tracing.export_quietly(tracer)
+            conn.commit()
+            exit_code = max(exit_code, code)
+            log.info("catch-up %s finished with %s (%s)", trade_date, code, fetcher.stats())
+    return exit_code
+
+
+# 补采 since（默认回溯 30 天）至今需要（再次）采集的交易日，单进程完成
+def catch_up(since: str | None = None) -> int:
+    log = logging.getLogger(__name__)
+    get_path("csv_dir").mkdir(parents=True, exist_ok=True)
+    get_path("summary_dir").mkdir(parents=True, exist_ok=True)
+    today = market_today()
+    since = since or (date.fromisoformat(today) - timedelta(days=DEFAULT_LOOKBACK_DAYS)).isoformat()
+    dates = dates_to_collect(since, today)
+    if not dates:
+        log.info("nothing to catch up between %s and %s", since, today)
+        return 0
+    log.info("catching up %s dates between %s and %s: %s", len(dates), since, today, dates)
+    return asyncio.run(_catch_up_async(dates, today))
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import sqlite3
+from typing import Any, Callable
+
+from stock_collector.ops import tracing
+from stock_collector.pipeline import adjustment, enrich, features, period_bars, validator
+from stock_collector.pipeline.validator import MissingBarError
+from stock_collector.storage.schema import DailyBar
+from stock_collector.storage.sqlite_store import now_iso
+
+
+# 启动浏览器（仅在需要 DOM 兜底时才加载 Playwright）
+async def open_browser():
+    from stock_collector.scraper.browser import create_browser
+
+    return await create_browser()
+
+
+# 将原始数据转换为 DailyBar 对象
+def build_daily_bar(raw: dict) -> DailyBar:
+    return DailyBar(
+        symbol=raw["symbol"],
+        trade_date=raw["trade_date"],
+        open=float(raw.get("open", 0.0)),
+        high=float(raw.get("high", 0.0)),
+        low=float(raw.get("low", 0.0)),
+        close=float(raw.get("close", 0.0)),
+        change=float(raw.get("change", 0.0)),
+        change_pct=float(raw.get("change_pct", 0.0)),
+        volume=int(raw.get("volume", 0)),
+        amplitude_pct=float(raw.get("amplitude_pct", 0.0)),
+        turnover_pct=float(raw.get("turnover_pct", 0.0)),
+        amount=float(raw["amount"]) if raw.get("amount") is not None else None,
+        pre_close=float(raw["pre_close"]) if raw.get("pre_close") else None,
+        price_type="raw",
+        source=raw.get("source", "sina"),
+        updated_at=now_iso(),
+    )
+
+
+# 构建单日的日线校验函数（日期不符视为缺失，规则不通过视为失败）
+def day_validator(trade_date: str) -> Callable[[DailyBar], None]:
+    def validate_bar(bar: DailyBar) -> None:
+        if bar.trade_date != trade_date:
+            raise MissingBarError(bar.symbol, trade_date, f"日期不匹配: {bar.trade_date}")
+        validate_errors = validator.validate_bar(bar)
+        if validate_errors:
+            raise RuntimeError(";".join(validate_errors))
+
+    return validate_bar
+
+
+# 落库后处理：整日补算派生字段并刷新复权事件、周线 / 月线与技术特征（各步骤均幂等，重跑可补齐中断前未完成的部分）
+def post_persist(
+    conn: sqlite3.Connection,
+    trade_date: str,
+    symbols: list[str] | None = None,
+    refresh_shares: bool = True,
+) -> dict[str, Any]:
+    with tracing.span("enrich") as span:
+        enrichment = enrich.enrich_day(conn, trade_date, symbols, refresh_shares=refresh_shares)
+        enrichment["adjustment"] = adjustment.update_day(conn, trade_date, symbols)
+        enrichment["periods"] = period_bars.update_day(conn, trade_date, symbols)
+        enrichment["features"] = features.update_day(conn, trade_date, symbols)
+        conn.commit()
+        span.items = enrichment["rows"]
+    return enrichment
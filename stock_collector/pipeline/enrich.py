@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import sqlite3
+from typing import Any
+
+import numpy as np
+
+from stock_collector.meta.share_capital import load_float_shares
+from stock_collector.storage.columnar import fetch_day_derived, fetch_prev_stats
+from stock_collector.storage.sqlite_store import update_derived_fields
+
+# 派生字段保留的小数位
+DERIVED_DECIMALS = 4
+
+
+# 整日派生字段补算（全天日线落库后执行一次）：昨收优先取接口/行情页给出的昨收，缺失时取库中该股票
+# 上一根日线的收盘价；涨跌额、涨跌幅、振幅统一以昨收为基准，换手率按流通股本计算，单次批量更新写回。
+# 两种昨收都没有的行（如新股首日）保留采集时的值
+def enrich_day(
+    conn: sqlite3.Connection,
+    trade_date: str,
+    symbols: list[str] | None = None,
+    refresh_shares: bool = True,
+) -> dict[str, Any]:
+    columns, derived = fetch_day_derived(conn, trade_date, symbols)
+    if not len(columns):
+        return {"rows": 0}
+    db_prev_close, _ = fetch_prev_stats(conn, trade_date, columns.symbol)
+    from_source = derived.pre_close > 0
+    pre_close = np.where(from_source, derived.pre_close, db_prev_close)
+    known = pre_close > 0
+
+    float_shares = load_float_shares(conn, trade_date, refresh=refresh_shares)
+    shares = np.array([float_shares.get(symbol, np.nan) for symbol in columns.symbol.tolist()], dtype=np.float64)
+    has_shares = shares > 0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = np.where(known, columns.close - pre_close, derived.change)
+        change_pct = np.where(known, (columns.close - pre_close) / pre_close * 100, derived.change_pct)
+        amplitude_pct = np.where(known, (columns.high - columns.low) / pre_close * 100, derived.amplitude_pct)
+        turnover_pct = np.where(has_shares, columns.volume / shares * 100, derived.turnover_pct)
+
+    update_derived_fields(conn, list(zip(
+        np.round(change, DERIVED_DECIMALS).tolist(),
+        np.round(change_pct, DERIVED_DECIMALS).tolist(),
+        np.round(amplitude_pct, DERIVED_DECIMALS).tolist(),
+        np.round(turnover_pct, DERIVED_DECIMALS).tolist(),
+        columns.symbol.tolist(),
+        columns.trade_date.tolist(),
+    )))
+    return {
+        "rows": len(columns),
+        "source_pre_close": int(np.count_nonzero(from_source)),
+        "db_pre_close": int(np.count_nonzero(known & ~from_source)),
+        "without_pre_close": int(np.count_nonzero(~known)),
+        "turnover": int(np.count_nonzero(has_shares)),
+    }
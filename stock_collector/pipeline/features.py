@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from stock_collector.ops import tracing
+from stock_collector.pipeline.adjustment import adjust_factors
+from stock_collector.pipeline.trading_calendar import market_today
+from stock_collector.storage.columnar import (
+    BarColumns,
+    fetch_day_columns,
+    fetch_day_derived,
+    fetch_day_features,
+    fetch_symbol_columns,
+    group_bounds,
+    iter_history_chunks,
+)
+from stock_collector.storage.sqlite_store import (
+    FEATURE_COLUMNS,
+    clear_features,
+    delete_symbol_features,
+    fetch_adj_ratios_on,
+    fetch_feature_states,
+    has_feature_states,
+    init_db,
+    insert_features,
+    upsert_feature_states,
+)
+from stock_collector.storage.writer import open_db
+
+# 均线窗口、收益率周期、波动率窗口与量比窗口（交易日）
+MA_WINDOWS = (5, 10, 20, 60)
+RETURN_HORIZONS = (1, 5, 20, 60)
+VOLATILITY_WINDOW = 20
+VOLUME_RATIO_WINDOWS = (5, 20)
+# 每只股票保留的滚动窗口长度（最长收益率周期需要再往前一天的收盘价）
+WINDOW = max(*MA_WINDOWS, *(horizon + 1 for horizon in RETURN_HORIZONS), VOLATILITY_WINDOW + 1, *(window + 1 for window in VOLUME_RATIO_WINDOWS))
+# 全量重建时每块读取的日线行数（窗口视图上的归约会产生 行数 × 窗口 的临时数组）
+REBUILD_CHUNK_ROWS = 100_000
+
+
+# 按窗口计算特征：closes / volumes 为以当日结尾的后复权收盘价与成交量窗口 [行, WINDOW]，
+# history 为同一股票在当日之前的行数（不足所需窗口的特征为 NaN），factor 为当日后复权因子（均线换算回当日价格口径）。
+# 返回 [行, 特征] 矩阵，列顺序同 FEATURE_COLUMNS
+def compute_features(closes: np.ndarray, volumes: np.ndarray, history: np.ndarray, factor: np.ndarray) -> np.ndarray:
+    features: dict[str, np.ndarray] = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for window in MA_WINDOWS:
+            features[f"ma_{window}"] = np.where(history >= window - 1, closes[:, -window:].mean(axis=1) / factor, np.nan)
+        for horizon in RETURN_HORIZONS:
+            features[f"ret_{horizon}"] = np.where(history >= horizon, closes[:, -1] / closes[:, -1 - horizon] - 1, np.nan)
+        log_returns = np.diff(np.log(closes[:, -VOLATILITY_WINDOW - 1:]), axis=1)
+        features[f"volatility_{VOLATILITY_WINDOW}"] = np.where(
+            history >= VOLATILITY_WINDOW, log_returns.std(axis=1, ddof=1), np.nan
+        )
+        for window in VOLUME_RATIO_WINDOWS:
+            features[f"volume_ratio_{window}"] = np.where(
+                history >= window, volumes[:, -1] / volumes[:, -1 - window:-1].mean(axis=1), np.nan
+            )
+    values = np.column_stack([features[name] for name in FEATURE_COLUMNS])
+    values[~np.isfinite(values)] = np.nan
+    return values
+
+
+# 每行以该行结尾的窗口视图（前部以 NaN 补齐，跨股票部分由 history 屏蔽）
+def _windows(values: np.ndarray) -> np.ndarray:
+    return sliding_window_view(np.r_[np.full(WINDOW - 1, np.nan), values], WINDOW)
+
+
+# 特征矩阵转为 insert_features 的行格式
+def _feature_rows(symbols: np.ndarray, trade_dates: np.ndarray, values: np.ndarray) -> list[tuple]:
+    return list(zip(symbols.tolist(), trade_dates.tolist(), *(values[:, col].tolist() for col in range(values.shape[1]))))
+
+
+# 每只股票的滚动状态（与当日日线同序的数组）
+@dataclass
+class FeatureState:
+    # 股票代码
+    symbol: np.ndarray
+    # 状态对应的最近交易日（无状态为空字符串）
+    last_date: np.ndarray
+    # 截至最近交易日的累计行数
+    history: np.ndarray
+    # 最近交易日与前一行的后复权因子
+    factor: np.ndarray
+    prev_factor: np.ndarray
+    # 以最近交易日结尾的后复权收盘价与成交量窗口 [股票, WINDOW]
+    closes: np.ndarray
+    volumes: np.ndarray
+
+    # 写入 upsert_feature_states 的行格式
+    def rows(self) -> list[tuple]:
+        return [
+            (symbol, last_date, history, factor, prev_factor, closes.tobytes(), volumes.tobytes())
+            for symbol, last_date, history, factor, prev_factor, closes, volumes in zip(
+                self.symbol.tolist(),
+                self.last_date.tolist(),
+                self.history.tolist(),
+                self.factor.tolist(),
+                self.prev_factor.tolist(),
+                self.closes,
+                self.volumes,
+            )
+        ]
+
+
+# 读取与 symbols 对齐的滚动状态
+def _load_states(conn: sqlite3.Connection, symbols: np.ndarray) -> FeatureState:
+    count = len(symbols)
+    state = FeatureState(
+        symbol=symbols,
+        last_date=np.full(count, "", dtype=object),
+        history=np.zeros(count, dtype=np.int64),
+        factor=np.ones(count, dtype=np.float64),
+        prev_factor=np.ones(count, dtype=np.float64),
+        closes=np.full((count, WINDOW), np.nan, dtype=np.float64),
+        volumes=np.full((count, WINDOW), np.nan, dtype=np.float64),
+    )
+    position = {symbol: index for index, symbol in enumerate(symbols.tolist())}
+    for symbol, last_date, history, factor, prev_factor, closes, volumes in fetch_feature_states(conn, symbols.tolist()):
+        index = position[symbol]
+        state.last_date[index] = last_date
+        state.history[index] = history
+        state.factor[index] = factor
+        state.prev_factor[index] = prev_factor
+        state.closes[index] = np.frombuffer(closes, dtype=np.float64)
+        state.volumes[index] = np.frombuffer(volumes, dtype=np.float64)
+    return state
+
+
+# 由按 (股票, 交易日) 排序的完整历史计算每行特征与每只股票的末行状态
+def _history_features(conn: sqlite3.Connection, columns: BarColumns) -> tuple[list[tuple], FeatureState]:
+    starts, ends = group_bounds(columns.symbol)
+    factor = np.concatenate([
+        adjust_factors(conn, str(columns.symbol[start]), columns.trade_date[start:end], "hfq")
+        for start, end in zip(starts.tolist(), ends.tolist())
+    ])
+    history = np.arange(len(columns)) - np.repeat(starts, ends - starts)
+    closes = _windows(columns.close * factor)
+    volumes = _windows(columns.volume / factor)
+    values = compute_features(closes, volumes, history, factor)
+
+    # 末行窗口中早于该股票首行的位置属于其他股票，置为 NaN
+    last = ends - 1
+    stale = np.arange(WINDOW) < (WINDOW - 1 - history[last])[:, None]
+    state_closes = closes[last].copy()
+    state_volumes = volumes[last].copy()
+    state_closes[stale] = np.nan
+    state_volumes[stale] = np.nan
+    state = FeatureState(
+        symbol=columns.symbol[last],
+        last_date=columns.trade_date[last],
+        history=history[last] + 1,
+        factor=factor[last],
+        prev_factor=np.where(ends - starts > 1, factor[np.maximum(last - 1, 0)], 1.0),
+        closes=state_closes,
+        volumes=state_volumes,
+    )
+    return _feature_rows(columns.symbol, columns.trade_date, values), state
+
+
+# 由全部历史重算部分股票的特征与状态（无状态或补采了早于状态的交易日时使用）
+def _recompute_symbols(conn: sqlite3.Connection, symbols: list[str]) -> None:
+    delete_symbol_features(conn, symbols)
+    for symbol in symbols:
+        columns = fetch_symbol_columns(conn, symbol)
+        if not len(columns):
+            continue
+        rows, state = _history_features(conn, columns)
+        insert_features(conn, rows)
+        upsert_feature_states(conn, state.rows())
+
+
+# 由全部历史日线构建特征与滚动状态（按股票顺序分块读取，同一股票不跨块）
+def build_all(conn: sqlite3.Connection, chunk_rows: int = REBUILD_CHUNK_ROWS) -> dict[str, int]:
+    stats = {"rows": 0, "symbols": 0}
+    clear_features(conn)
+    for chunk in iter_history_chunks(conn, chunk_rows):
+        rows, state = _history_features(conn, chunk.columns)
+        insert_features(conn, rows)
+        upsert_feature_states(conn, state.rows())
+        stats["rows"] += len(rows)
+        stats["symbols"] += len(state.symbol)
+    return stats
+
+
+# 增量计算单日特征（全天落库、复权事件更新后执行）：状态停在之前交易日的股票把当日行情推入窗口，
+# 同一日重跑的以窗口前 WINDOW - 1 行为基准重新推入，均为 O(股票数) 的数组运算；
+# 无状态或状态晚于当日（补采历史日期）的股票由其完整历史重算。状态表为空时（首次运行）由全部历史构建
+def update_day(conn: sqlite3.Connection, trade_date: str, symbols: list[str] | None = None) -> dict[str, Any]:
+    if not has_feature_states(conn):
+        return {"built": True, **build_all(conn)}
+    columns = fetch_day_columns(conn, trade_date) if symbols is None else fetch_day_derived(conn, trade_date, symbols)[0]
+    if not len(columns):
+        return {"built": False, "incremental": 0, "recomputed": 0}
+    state = _load_states(conn, columns.symbol)
+    forward = (state.last_date != "") & (state.last_date < trade_date)
+    rerun = state.last_date == trade_date
+    incremental = forward | rerun
+    recompute = columns.symbol[~incremental].tolist()
+
+    # 新交易日丢弃窗口最旧的一行，同日重跑替换窗口最新的一行
+    ratios = fetch_adj_ratios_on(conn, trade_date)
+    base_factor = np.where(rerun, state.prev_factor, state.factor)
+    factor = base_factor * np.array([ratios.get(symbol, 1.0) for symbol in columns.symbol.tolist()], dtype=np.float64)
+    history = np.where(rerun, state.history - 1, state.history)
+    closes = np.where(rerun[:, None], state.closes[:, :-1], state.closes[:, 1:])
+    volumes = np.where(rerun[:, None], state.volumes[:, :-1], state.volumes[:, 1:])
+    closes = np.column_stack([closes, columns.close * factor])
+    volumes = np.column_stack([volumes, columns.volume / factor])
+
+    values = compute_features(closes[incremental], volumes[incremental], history[incremental], factor[incremental])
+    insert_features(conn, _feature_rows(columns.symbol[incremental], columns.trade_date[incremental], values))
+    upsert_feature_states(conn, FeatureState(
+        symbol=columns.symbol[incremental],
+        last_date=columns.trade_date[incremental],
+        history=history[incremental] + 1,
+        factor=factor[incremental],
+        prev_factor=base_factor[incremental],
+        closes=closes[incremental],
+        volumes=volumes[incremental],
+    ).rows())
+    if recompute:
+        _recompute_symbols(conn, recompute)
+    return {"built": False, "incremental": int(np.count_nonzero(incremental)), "recomputed": len(recompute)}
+
+
+# 读取指定交易日的技术特征（策略晨间直接读表）
+def read_day(
+    conn: sqlite3.Connection,
+    trade_date: str,
+    symbols: list[str] | None = None,
+) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    return fetch_day_features(conn, trade_date, symbols)
+
+
+# 由全部历史日线重建技术特征（修正历史数据或调整特征定义后执行）
+def rebuild_features(chunk_rows: int = REBUILD_CHUNK_ROWS) -> int:
+    log = logging.getLogger(__name__)
+    tracer = tracing.start_run(market_today(), "features")
+    try:
+        started = time.time()
+        init_db()
+        with open_db() as conn, tracing.span("feature_rebuild") as span:
+            stats = build_all(conn, chunk_rows)
+            span.items = stats["rows"]
+            conn.commit()
+        log.info(
+            "features rebuilt in %.1fs: rows=%s symbols=%s",
+            time.time() - started, stats["rows"], stats["symbols"],
+        )
+        return 0
+    finally:
+        tracing.export_quietly(tracer)
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+
+import numpy as np
+
+from stock_collector.config.settings import get_path
+from stock_collector.meta.universe import iter_universe_changes
+from stock_collector.ops import tracing
+from stock_collector.pipeline.repair import execute_repairs
+from stock_collector.pipeline.trading_calendar import date_to_int, market_today, sessions_between
+from stock_collector.storage.schema import CollectStatus
+from stock_collector.storage.sqlite_store import fetch_symbol_statuses, init_db, iter_symbol_dates, now_iso
+from stock_collector.storage.writer import open_db
+
+# 停牌等确认无数据的状态，不计为缺口
+SUSPENDED_STATUSES = ("skipped",)
+
+
+# 单只股票连续缺失的交易日区间
+@dataclass
+class GapRange:
+    # 股票代码
+    symbol: str
+    # 区间首个交易日
+    start: str
+    # 区间末个交易日
+    end: str
+    # 区间内交易日数
+    sessions: int
+
+
+# 缺口扫描结果
+@dataclass
+class GapReport:
+    # 扫描区间
+    since: str
+    until: str
+    # 股票池内出现过的股票数
+    symbols: int = 0
+    # 区间内交易日数
+    sessions: int = 0
+    # 上市期内应有的 (股票, 交易日) 数
+    expected: int = 0
+    # 应有且已入库的数量
+    present: int = 0
+    # 状态表记为停牌的缺口数（不补采）
+    suspended: int = 0
+    # 落在非交易日或上市期外的日线数
+    unexpected: int = 0
+    # 缺口区间（按股票、日期排序）
+    ranges: list[GapRange] = field(default_factory=list)
+    # 补采计划（沿用状态表中的重试次数）
+    plan: list[CollectStatus] = field(default_factory=list)
+
+    # 写入报告的字段
+    def to_dict(self) -> dict:
+        payload = asdict(self)
+        payload.pop("plan")
+        payload["missing"] = len(self.plan)
+        payload["scanned_at"] = now_iso()
+        return payload
+
+
+# 日期字符串数组转 YYYYMMDD 整数数组
+def _day_array(dates: list[str]) -> np.ndarray:
+    return np.array([date_to_int(date_value) for date_value in dates], dtype=np.int32)
+
+
+# 由股票池变化构建上市期矩阵 [股票, 交易日]：加入当日起至移出前一交易日为应有数据
+def _listed_mask(changes: list[tuple[str, set[str], set[str]]], index: dict[str, int], sessions: np.ndarray) -> np.ndarray:
+    rows: list[int] = []
+    cols: list[int] = []
+    steps: list[int] = []
+    for date_value, added, removed in changes:
+        position = int(np.searchsorted(sessions, date_to_int(date_value)))
+        for symbol in added:
+            rows.append(index[symbol])
+            cols.append(position)
+            steps.append(1)
+        for symbol in removed:
+            rows.append(index[symbol])
+            cols.append(position)
+            steps.append(-1)
+    # 差分矩阵按行累加得到每个交易日是否处于上市期
+    delta = np.zeros((len(index), len(sessions) + 1), dtype=np.int8)
+    np.add.at(delta, (np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)), np.array(steps, dtype=np.int8))
+    return np.cumsum(delta[:, :-1], axis=1, dtype=np.int8) > 0
+
+
+# 读取已入库矩阵 [股票, 交易日]（单次分组查询，按股票整体映射到交易日下标），返回矩阵与无法对应的日线数
+def _present_mask(conn, index: dict[str, int], sessions: np.ndarray, since: str, until: str) -> tuple[np.ndarray, int]:
+    present = np.zeros((len(index), len(sessions)), dtype=bool)
+    unexpected = 0
+    for symbol, joined in iter_symbol_dates(conn, since, until):
+        days = np.array(joined.replace("-", "").split(","), dtype=np.int32)
+        row = index.get(symbol)
+        if row is None:
+            unexpected += len(days)
+            continue
+        positions = np.searchsorted(sessions, days)
+        positions[positions == len(sessions)] = 0
+        matched = sessions[positions] == days
+        present[row, positions[matched]] = True
+        unexpected += int(len(days) - matched.sum())
+    return present, unexpected
+
+
+# 缺口矩阵按行找出连续区间：返回 (行, 起始下标, 结束下标) 数组
+def _gap_runs(gaps: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    padded = np.zeros((gaps.shape[0], gaps.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = gaps
+    edges = np.diff(padded, axis=1)
+    # nonzero 按行优先返回，同一行的起止位置一一对应
+    start_rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    return start_rows, starts, ends - 1
+
+
+# 对比各股票上市期、交易日历与 daily_bar，找出 since（默认首个股票池快照）至 until 的缺失区间
+def scan_gaps(since: str | None = None, until: str | None = None) -> GapReport:
+    log = logging.getLogger(__name__)
+    until = until or market_today()
+    changes = list(iter_universe_changes())
+    if not changes:
+        log.warning("no universe snapshots, nothing to scan")
+        return GapReport(since=since or until, until=until)
+    since = max(since or changes[0][0], changes[0][0])
+    dates = sessions_between(since, until)
+    sessions = _day_array(dates)
+    symbols = sorted(set().union(*(added for _, added, _ in changes)))
+    index = {symbol: row for row, symbol in enumerate(symbols)}
+    report = GapReport(since=since, until=until, symbols=len(symbols), sessions=len(dates))
+    if not dates:
+        return report
+
+    with tracing.span("gap_listed", items=len(symbols)):
+        expected = _listed_mask(changes, index, sessions)
+    init_db()
+    with open_db() as conn:
+        with tracing.span("gap_present", items=len(symbols)):
+            present, report.unexpected = _present_mask(conn, index, sessions, since, until)
+        gaps = expected & ~present
+        report.unexpected += int((present & ~expected).sum())
+        report.expected = int(expected.sum())
+        report.present = report.expected - int(gaps.sum())
+
+        # 仅为有缺口的股票读取状态表，剔除停牌
+        gap_rows = np.flatnonzero(gaps.any(axis=1))
+        with tracing.span("gap_status", items=len(gap_rows)):
+            statuses = fetch_symbol_statuses(conn, [symbols[row] for row in gap_rows], since, until)
+    for (symbol, date_value), status in statuses.items():
+        if status.status in SUSPENDED_STATUSES:
+            position = int(np.searchsorted(sessions, date_to_int(date_value)))
+            if position < len(sessions) and sessions[position] == date_to_int(date_value) and gaps[index[symbol], position]:
+                gaps[index[symbol], position] = False
+                report.suspended += 1
+
+    rows, starts, ends = _gap_runs(gaps)
+    report.ranges = [
+        GapRange(symbol=symbols[row], start=dates[start], end=dates[end], sessions=int(end - start + 1))
+        for row, start, end in zip(rows.tolist(), starts.tolist(), ends.tolist())
+    ]
+    updated_at = now_iso()
+    for row, col in zip(*(axis.tolist() for axis in np.nonzero(gaps))):
+        symbol, date_value = symbols[row], dates[col]
+        previous = statuses.get((symbol, date_value))
+        report.plan.append(CollectStatus(
+            trade_date=date_value,
+            symbol=symbol,
+            status="missing",
+            retry_count=previous.retry_count if previous else 0,
+            last_error=previous.last_error if previous else "gap scan",
+            updated_at=updated_at,
+        ))
+    return report
+
+
+# 扫描历史缺口并写出报告；repair 为真时按报告中的计划补采（有缺口未解决时返回 2）
+def run_scan(since: str | None = None, repair: bool = False) -> int:
+    log = logging.getLogger(__name__)
+    today = market_today()
+    tracer = tracing.start_run(today, "gap-scan")
+    try:
+        started = time.time()
+        with tracing.span("gap_scan"):
+            report = scan_gaps(since, today)
+        audit_dir = get_path("audit_dir")
+        audit_dir.mkdir(parents=True, exist_ok=True)
+        path = audit_dir / f"gaps_{today}.json"
+        path.write_text(json.dumps(report.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+        log.info(
+            "gap scan finished in %.1fs: symbols=%s sessions=%s expected=%s present=%s missing=%s ranges=%s suspended=%s unexpected=%s report=%s",
+            time.time() - started, report.symbols, report.sessions, report.expected, report.present,
+            len(report.plan), len(report.ranges), report.suspended, report.unexpected, path,
+        )
+        if not report.plan:
+            return 0
+        if not repair:
+            return 2
+        return execute_repairs(report.plan, today)
+    finally:
+        tracing.export_quietly(tracer)
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Any
+
+from stock_collector.config.settings import get_path
+from stock_collector.pipeline.stages import CollectState, Outcome
+
+# 运行日志文件扩展名
+JOURNAL_SUFFIX = ".jsonl"
+
+
+# 运行日志配置
+@dataclass
+class JournalConfig:
+    # 是否写入运行日志
+    enabled: bool = True
+    # 累计未落盘的结果达到该条数时 fsync
+    fsync_every: int = 500
+    # 距上次 fsync 超过该间隔（毫秒）时 fsync
+    fsync_interval_ms: int = 1000
+
+    # 从爬虫配置构建
+    @classmethod
+    def from_config(cls, scraper_config: dict[str, Any]) -> JournalConfig:
+        known = {item.name for item in fields(cls)}
+        return cls(**{k: v for k, v in scraper_config.get("journal", {}).items() if k in known})
+
+
+# 续跑所需的运行进度
+@dataclass
+class ResumePoint:
+    # 交易日
+    trade_date: str
+    # 本次运行的全部股票（用于计算应采数量）
+    symbols: list[str]
+    # 由日志恢复的计数与集合
+    state: CollectState
+    # 尚无终态的股票（保持原调度顺序）
+    pending: list[str]
+    # 已读取的结果条数
+    records: int
+    # 此前续跑的次数
+    resumes: int
+    # 运行是否已完整结束（汇总已写出）
+    finished: bool
+
+
+# 指定交易日（及分片）的运行日志路径
+def journal_path(trade_date: str, tag: str = "") -> Path:
+    name = f"{trade_date}.{tag}" if tag else trade_date
+    return get_path("journal_dir") / f"{name}{JOURNAL_SUFFIX}"
+
+
+# 截掉末尾未写完整的行（进程中断时的半行）
+def _truncate_torn_tail(path: Path) -> None:
+    data = path.read_bytes()
+    valid = data.rfind(b"\n") + 1
+    if valid < len(data):
+        with path.open("r+b") as file_handle:
+            file_handle.truncate(valid)
+
+
+# 追加写入的运行日志：落库线程每提交一批结果追加一批记录，按条数或间隔批量 fsync
+class RunJournal:
+    # 打开日志（续跑时追加，否则覆盖上次运行）
+    def __init__(self, path: Path, config: JournalConfig, resume: bool = False) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if resume and path.exists():
+            _truncate_torn_tail(path)
+        self.path = path
+        self.config = config
+        self._file = path.open("ab" if resume else "wb")
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        self.records = 0
+        self.fsyncs = 0
+
+    # 写入若干条记录
+    def _write(self, records: list[dict[str, Any]]) -> None:
+        self._file.write(b"".join(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n" for record in records))
+        self._file.flush()
+
+    # 刷盘
+    def sync(self) -> None:
+        if self._file.closed:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        self.fsyncs += 1
+
+    # 记录运行开始：全部股票与调度后的待采集列表（立即刷盘，之后的结果均以此为准）
+    def begin(self, trade_date: str, symbols: list[str], todo: list[str]) -> None:
+        self._write([{
+            "type": "start",
+            "trade_date": trade_date,
+            "started_at": round(time.time(), 3),
+            "symbols": symbols,
+            "todo": todo,
+        }])
+        self.sync()
+
+    # 记录一次续跑
+    def resumed(self, pending: int) -> None:
+        self._write([{"type": "resume", "resumed_at": round(time.time(), 3), "pending": pending}])
+        self.sync()
+
+    # 记录一批已提交的处理结果（在落库线程中调用，数据库提交之后写入）
+    def record(self, outcomes: list[Outcome]) -> None:
+        self._write([
+            {"type": "outcome", "symbol": o.symbol, "status": o.status, "source": o.source, "error": o.error}
+            for o in outcomes
+        ])
+        self.records += len(outcomes)
+        self._unsynced += len(outcomes)
+        elapsed_ms = (time.monotonic() - self._synced_at) * 1000
+        if self._unsynced >= self.config.fsync_every or elapsed_ms >= self.config.fsync_interval_ms:
+            self.sync()
+
+    # 刷盘并关闭，返回统计
+    def close(self) -> dict[str, Any]:
+        self.sync()
+        self._file.close()
+        return {"path": str(self.path), "records": self.records, "fsyncs": self.fsyncs}
+
+
+# 按配置打开运行日志（未启用时返回 None）
+def open_journal(path: Path, config: JournalConfig, resume: bool = False) -> RunJournal | None:
+    if not config.enabled:
+        return None
+    return RunJournal(path, config, resume=resume)
+
+
+# 汇总写出后追加结束标记
+def mark_finished(path: Path, level: str) -> None:
+    if not path.exists():
+        return
+    with path.open("ab") as file_handle:
+        record = {"type": "finish", "finished_at": round(time.time(), 3), "level": level}
+        file_handle.write(json.dumps(record).encode("utf-8") + b"\n")
+        file_handle.flush()
+        os.fsync(file_handle.fileno())
+
+
+# 顺序读取一次日志，恢复计数、集合与待采集队列（无日志或缺少开始记录时返回 None）
+def load(path: Path) -> ResumePoint | None:
+    if not path.exists():
+        return None
+    start: dict[str, Any] | None = None
+    state = CollectState()
+    terminal: set[str] = set()
+    records = 0
+    resumes = 0
+    finished = False
+    with path.open("rb") as file_handle:
+        for line in file_handle:
+            # 末尾半行视为中断写入
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            kind = record.get("type")
+            if kind == "start":
+                start = record
+            elif kind == "outcome":
+                outcome = Outcome(record["symbol"], record["status"], record["source"], error=record.get("error", ""))
+                state.apply(outcome)
+                if outcome.terminal:
+                    terminal.add(outcome.symbol)
+                records += 1
+            elif kind == "resume":
+                resumes += 1
+            elif kind == "finish":
+                finished = True
+    if start is None:
+        return None
+
+    # 开始前已采集的股票计为成功
+    todo = start["todo"]
+    todo_set = set(todo)
+    for symbol in start["symbols"]:
+        if symbol not in todo_set:
+            state.mark_success(symbol)
+    return ResumePoint(
+        trade_date=start["trade_date"],
+        symbols=start["symbols"],
+        state=state,
+        pending=[symbol for symbol in todo if symbol not in terminal],
+        records=records,
+        resumes=resumes,
+        finished=finished,
+    )
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import time
+from typing import Any
+
+import numpy as np
+
+from stock_collector.ops import tracing
+from stock_collector.pipeline.trading_calendar import market_today
+from stock_collector.storage.columnar import BarColumns, fetch_period_columns, fetch_range_columns, iter_history_chunks
+from stock_collector.storage.sqlite_store import (
+    clear_period_bars,
+    fetch_day_symbols,
+    has_period_bars,
+    init_db,
+    insert_period_bars,
+    replace_period_bars,
+)
+from stock_collector.storage.writer import open_db
+
+# 聚合周期与对应的物化表
+PERIOD_TABLES = {"week": "weekly_bar", "month": "monthly_bar"}
+# 全量构建时每块读取的日线行数
+BUILD_CHUNK_ROWS = 200_000
+
+
+# 交易日所在周期的起始日（周线为周一，月线为月初），返回 datetime64[D] 数组
+def period_starts(trade_dates: np.ndarray, period: str) -> np.ndarray:
+    days = trade_dates.astype("datetime64[D]")
+    if period == "week":
+        # 1970-01-01 为周四，天数偏移 3 后对 7 取余即为距周一的天数
+        return days - (days.astype(np.int64) + 3) % 7
+    return days.astype("datetime64[M]").astype("datetime64[D]")
+
+
+# 周期的最后一个自然日
+def _period_end(start: np.datetime64, period: str) -> np.datetime64:
+    if period == "week":
+        return start + 6
+    return (start.astype("datetime64[M]") + 1).astype("datetime64[D]") - 1
+
+
+# 按 (股票, 周期) 分组聚合已按股票、日期排序的日线：开盘取首日、收盘取末日、高低取极值、量额求和
+# （任一日成交额缺失则周期成交额为空），返回 replace_period_bars 的行格式
+def aggregate(columns: BarColumns, period: str) -> list[tuple]:
+    if not len(columns):
+        return []
+    keys = period_starts(columns.trade_date, period)
+    first = np.flatnonzero(np.r_[True, (columns.symbol[1:] != columns.symbol[:-1]) | (keys[1:] != keys[:-1])])
+    last = np.r_[first[1:], len(columns)] - 1
+    partial_amount = np.add.reduceat(np.isnan(columns.amount).astype(np.int64), first) > 0
+    amount = np.add.reduceat(np.nan_to_num(columns.amount), first)
+    return list(zip(
+        columns.symbol[first].tolist(),
+        keys[first].astype(str).tolist(),
+        columns.trade_date[first].tolist(),
+        columns.trade_date[last].tolist(),
+        columns.open[first].tolist(),
+        np.maximum.reduceat(columns.high, first).tolist(),
+        np.minimum.reduceat(columns.low, first).tolist(),
+        columns.close[last].tolist(),
+        np.add.reduceat(columns.volume, first).tolist(),
+        [None if partial else value for partial, value in zip(partial_amount.tolist(), amount.tolist())],
+        (last - first + 1).tolist(),
+    ))
+
+
+# 由全部历史日线构建周线与月线（按股票顺序分块读取，同一股票不跨块，一次读取同时聚合两个周期）
+def build_all(conn: sqlite3.Connection, chunk_rows: int = BUILD_CHUNK_ROWS) -> dict[str, int]:
+    stats = {"rows": 0, **{period: 0 for period in PERIOD_TABLES}}
+    for table in PERIOD_TABLES.values():
+        clear_period_bars(conn, table)
+    for chunk in iter_history_chunks(conn, chunk_rows):
+        for period, table in PERIOD_TABLES.items():
+            rows = aggregate(chunk.columns, period)
+            insert_period_bars(conn, table, rows)
+            stats[period] += len(rows)
+        stats["rows"] += len(chunk.columns)
+    return stats
+
+
+# 增量刷新交易日所在的周期（全天落库后执行）：只重算当日有日线（或指定）股票的该周 / 该月，
+# 物化表为空时（首次运行）改为由全部历史构建
+def update_day(conn: sqlite3.Connection, trade_date: str, symbols: list[str] | None = None) -> dict[str, Any]:
+    if not all(has_period_bars(conn, table) for table in PERIOD_TABLES.values()):
+        return {"built": True, **build_all(conn)}
+    symbols = fetch_day_symbols(conn, trade_date) if symbols is None else symbols
+    stats: dict[str, Any] = {"built": False, "symbols": len(symbols)}
+    for period, table in PERIOD_TABLES.items():
+        start = period_starts(np.array([trade_date]), period)[0]
+        columns = fetch_range_columns(conn, str(start), str(_period_end(start, period)), symbols)
+        rows = aggregate(columns, period)
+        replace_period_bars(conn, table, str(start), symbols, rows)
+        stats[period] = len(rows)
+    return stats
+
+
+# 读取单只股票的周线 / 月线（直接读物化表，trade_date 为周期内末个交易日，可按其限定区间）
+def read_period_bars(
+    conn: sqlite3.Connection,
+    symbol: str,
+    period: str,
+    start: str | None = None,
+    end: str | None = None,
+) -> BarColumns:
+    if period not in PERIOD_TABLES:
+        raise ValueError(f"unknown period: {period}")
+    return fetch_period_columns(conn, PERIOD_TABLES[period], symbol, start, end)
+
+
+# 由全部历史日线重建周线与月线（修正历史数据后执行）
+def rebuild_periods(chunk_rows: int = BUILD_CHUNK_ROWS) -> int:
+    log = logging.getLogger(__name__)
+    tracer = tracing.start_run(market_today(), "periods")
+    try:
+        started = time.time()
+        init_db()
+        with open_db() as conn, tracing.span("period_rebuild") as span:
+            stats = build_all(conn, chunk_rows)
+            span.items = stats["rows"]
+            conn.commit()
+        log.info(
+            "period bars rebuilt in %.1fs: rows=%s weekly=%s monthly=%s",
+            time.time() - started, stats["rows"], stats["week"], stats["month"],
+        )
+        return 0
+    finally:
+        tracing.export_quietly(tracer)
@@ -1,6 +1,43 @@
-from stock_collector.storage.sqlite_store import DEFAULT_DB_PATH, fetch_statuses, init_db
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from datetime import date, timedelta
+from typing import Any
+
+from stock_collector.config.settings import get_path, load_yaml
+from stock_collector.meta.universe import load_snapshots
+from stock_collector.ops import alerting, report, tracing
+from stock_collector.pipeline.catch_up import DEFAULT_LOOKBACK_DAYS, kline_datalen
+from stock_collector.pipeline.daily import build_daily_bar, day_validator, open_browser, post_persist
+from stock_collector.pipeline.run_after_close import SCHEDULE_CONFIG, SCRAPER_CONFIG
+from stock_collector.pipeline.stages import StageConfig, csv_row
+from stock_collector.pipeline.trading_calendar import market_today
+from stock_collector.scraper.parsers import parse_kline_json
+from stock_collector.scraper.retry import RetryConfig
+from stock_collector.scraper.sina_api import configure_retries, fetch_kline_text
+from stock_collector.scraper.sina_dom import fetch_daily_bar_from_sina_dom
+from stock_collector.storage.csv_writer import write_summary_csv, write_symbol_csv
+from stock_collector.storage.schema import CollectStatus, DailyBar
+from stock_collector.storage.sqlite_store import (
+    count_statuses,
+    fetch_statuses,
+    fetch_statuses_between,
+    init_db,
+    now_iso,
+    upsert_collect_statuses,
+    upsert_daily_bars,
+)
 from stock_collector.storage.writer import open_db
 
+# 需要补采的状态
+REPAIR_STATUSES = ("missing", "failed", "api_failed")
+
 
 # 根据汇总信息生成补采计划
 def plan_repairs_from_summary(summary: dict) -> list[str]:
@@ -10,10 +47,258 @@ def plan_repairs_from_summary(summary: dict) -> list[str]:
         return []
 
     # 初始化数据库并读取状态
-    init_db(DEFAULT_DB_PATH)
-    with open_db(DEFAULT_DB_PATH) as conn:
+    init_db()
+    with open_db() as conn:
         current_status = fetch_statuses(conn, trade_date)
 
     # 仅挑选需要修复的状态
-    eligible = {"missing", "failed", "api_failed"}
+    eligible = set(REPAIR_STATUSES)
     return [symbol for symbol, status in current_status.items() if status.status in eligible]
+
+
+# 读取日期区间内全部待补采的 (股票, 交易日)（单次查询）
+def plan_repairs(since: str, until: str) -> list[CollectStatus]:
+    init_db()
+    with open_db() as conn:
+        return fetch_statuses_between(conn, since, until, REPAIR_STATUSES)
+
+
+# 按股票合并待补采记录（每只股票的缺口日期升序）
+def group_by_symbol(items: list[CollectStatus]) -> dict[str, list[CollectStatus]]:
+    grouped: dict[str, list[CollectStatus]] = defaultdict(list)
+    for item in sorted(items, key=lambda status: status.trade_date):
+        grouped[item.symbol].append(item)
+    return grouped
+
+
+# 补采结果
+@dataclass
+class RepairResult:
+    # 补采成功的日线
+    bars: list[DailyBar] = field(default_factory=list)
+    # 未解决的 (股票, 交易日) 及最后一次错误
+    unresolved: dict[tuple[str, str], str] = field(default_factory=dict)
+    # 接口请求次数
+    api_requests: int = 0
+    # 页面兜底次数
+    dom_requests: int = 0
+
+    # 合并另一批结果
+    def merge(self, other: RepairResult) -> None:
+        self.bars.extend(other.bars)
+        self.unresolved.update(other.unresolved)
+        self.api_requests += other.api_requests
+        self.dom_requests += other.dom_requests
+
+
+# 单只股票一次请求覆盖其全部缺口日期，逐日解析并校验
+def _repair_symbol(symbol: str, items: list[CollectStatus], today: str) -> RepairResult:
+    dates = [item.trade_date for item in items]
+    result = RepairResult(api_requests=1)
+    try:
+        text = fetch_kline_text(symbol, kline_datalen(dates[0], today))
+    except Exception as exc:
+        result.unresolved = {(symbol, date_value): str(exc) for date_value in dates}
+        return result
+    for date_value in dates:
+        try:
+            bar = build_daily_bar(parse_kline_json(text, symbol, date_value))
+            day_validator(date_value)(bar)
+        except Exception as exc:
+            result.unresolved[(symbol, date_value)] = str(exc)
+            continue
+        result.bars.append(bar)
+    return result
+
+
+# 接口补采：按股票并发，每只股票一个请求
+def _repair_api(grouped: dict[str, list[CollectStatus]], today: str, workers: int) -> RepairResult:
+    result = RepairResult()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="repair") as executor:
+        futures = [executor.submit(_repair_symbol, symbol, items, today) for symbol, items in grouped.items()]
+        for future in futures:
+            result.merge(future.result())
+    return result
+
+
+# 页面兜底：仅当日缺口可由行情页补齐，按配置的页面数与限速抓取
+async def _repair_dom(symbols: list[str], today: str, config: StageConfig) -> RepairResult:
+    result = RepairResult()
+    queue: asyncio.Queue = asyncio.Queue()
+    for symbol in symbols:
+        queue.put_nowait(symbol)
+    validate_bar = day_validator(today)
+    browser = await open_browser()
+    pages: list[Any] = []
+
+    async def worker() -> None:
+        page = await browser.context.new_page()
+        pages.append(page)
+        while not queue.empty():
+            symbol = queue.get_nowait()
+            result.dom_requests += 1
+            try:
+                bar = build_daily_bar(await fetch_daily_bar_from_sina_dom(page, symbol))
+                validate_bar(bar)
+            except Exception as exc:
+                result.unresolved[(symbol, today)] = str(exc)
+            else:
+                result.bars.append(bar)
+            # 限速等待
+            await asyncio.sleep((config.dom_delay_ms + random.randint(0, config.dom_jitter_ms)) / 1000)
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, min(config.dom_workers, len(symbols))))))
+    finally:
+        for page in pages:
+            await page.close()
+        await browser.close()
+    return result
+
+
+# 补采后的状态记录：成功改为 success，未解决的保留原状态并更新错误；重试次数均加一
+def _status_updates(items: list[CollectStatus], result: RepairResult) -> list[CollectStatus]:
+    repaired = {(bar.symbol, bar.trade_date) for bar in result.bars}
+    updated_at = now_iso()
+    updates = []
+    for item in items:
+        key = (item.symbol, item.trade_date)
+        if key in repaired:
+            updates.append(replace(item, status="success", retry_count=item.retry_count + 1, last_error="", updated_at=updated_at))
+        else:
+            error = result.unresolved.get(key, item.last_error)
+            updates.append(replace(item, retry_count=item.retry_count + 1, last_error=error, updated_at=updated_at))
+    return updates
+
+
+# 按补采后的状态表刷新各日汇总（计数、成功率、告警等级），连同汇总 CSV 写出后计入运行历史；
+# 跳过或崩溃留下的汇总没有应采数量，按当日股票池快照计算
+def _refresh_summaries(
+    counts: dict[str, dict[str, int]],
+    repaired_by_date: dict[str, list[str]],
+    schedule: dict[str, Any],
+) -> None:
+    log = logging.getLogger(__name__)
+    thresholds = schedule["thresholds"]
+    summaries = {date_value: report.load_summary(date_value) for date_value in counts}
+    without_summary = [date_value for date_value, summary in summaries.items() if summary is None]
+    placeholder_dates = [
+        date_value for date_value, summary in summaries.items()
+        if summary is not None and ("skip_reason" in summary or not summary["expected"])
+    ]
+    snapshots = load_snapshots(placeholder_dates) if placeholder_dates else {}
+    consecutive_error_days = alerting.get_consecutive_error_days()
+    for date_value, by_status in counts.items():
+        summary = summaries[date_value]
+        if summary is None:
+            continue
+        repair_info: dict[str, Any] = {"repaired": len(repaired_by_date.get(date_value, [])), "repaired_at": now_iso()}
+        if date_value in snapshots:
+            universe = snapshots[date_value]
+            summary["expected"] = len(universe) if universe else sum(by_status.values())
+            if "skip_reason" in summary:
+                repair_info["skip_reason"] = summary.pop("skip_reason")
+        expected = summary["expected"]
+        success = by_status.get("success", 0)
+        missing = by_status.get("missing", 0)
+        skipped = by_status.get("skipped", 0)
+        failed = max(expected - success - missing - skipped, 0)
+        for key, value in (("success", success), ("missing", missing), ("skipped", skipped), ("failed", failed)):
+            summary[key] = value
+            summary[f"{key}_symbols"] = value
+        summary["success_rate"] = success / expected if expected else 0.0
+        # 告警等级规则同采集流程：连续错误天数达到阈值时 ERROR 升级为 CRITICAL
+        summary["level"] = alerting.compute_level(summary["success_rate"], 0, thresholds)
+        if consecutive_error_days >= thresholds.get("critical_consecutive_error_days", 2) and summary["level"] == "ERROR":
+            summary["level"] = "CRITICAL"
+        summary["human_required"] = alerting.compute_human_required(summary, schedule["human_required"])
+        summary["repair"] = repair_info
+        write_summary_csv(
+            base_dir=get_path("csv_dir"),
+            trade_date=date_value,
+            summary_rows=summary.get("symbols", []),
+        )
+        report.write_summary(summary)
+    # 历史缺口多数日期没有汇总，合并为一条日志
+    if without_summary:
+        log.warning(
+            "no summary for %s dates (%s..%s), status table updated only",
+            len(without_summary), without_summary[0], without_summary[-1],
+        )
+
+
+# 执行补采计划：每只股票一个多日 K 线请求，仅当日仍未解决的转入页面兜底，
+# 最后批量更新日线、状态表与各日汇总（未解决时返回 2）
+def execute_repairs(items: list[CollectStatus], today: str) -> int:
+    log = logging.getLogger(__name__)
+    scraper_config = load_yaml(SCRAPER_CONFIG)
+    config = StageConfig.from_config(scraper_config)
+    configure_retries(RetryConfig.from_config(scraper_config))
+    grouped = group_by_symbol(items)
+    started = time.time()
+    with tracing.span("repair_api", items=len(grouped)):
+        result = _repair_api(grouped, today, config.source_workers)
+
+    # 行情页只有最新一日，历史缺口不转入页面兜底；浏览器启动等整体失败时当日缺口保持未解决，接口补采结果照常落库
+    dom_symbols = sorted(symbol for symbol, date_value in result.unresolved if date_value == today)
+    if dom_symbols:
+        try:
+            with tracing.span("repair_dom", items=len(dom_symbols)):
+                dom_result = asyncio.run(_repair_dom(dom_symbols, today, config))
+        except Exception as exc:
+            log.warning("repair DOM fallback failed for %s symbols: %s", len(dom_symbols), exc)
+            for symbol in dom_symbols:
+                result.unresolved[(symbol, today)] = f"页面兜底失败: {exc}"
+        else:
+            for symbol in dom_symbols:
+                result.unresolved.pop((symbol, today))
+            result.merge(dom_result)
+
+    # 单事务批量写入日线与状态，提交后再按日补算补采日线的派生字段、复权事件、周线 / 月线与技术特征（每日单独提交），
+    # 最后按日期统计刷新汇总
+    dates = sorted({item.trade_date for item in items})
+    repaired_by_date: dict[str, list[str]] = defaultdict(list)
+    for bar in result.bars:
+        repaired_by_date[bar.trade_date].append(bar.symbol)
+    with tracing.span("repair_persist", items=len(items)):
+        with open_db() as conn:
+            upsert_daily_bars(conn, result.bars)
+            upsert_collect_statuses(conn, _status_updates(items, result))
+            conn.commit()
+            for date_value in sorted(repaired_by_date):
+                post_persist(conn, date_value, repaired_by_date[date_value], refresh_shares=date_value == today)
+            counts = count_statuses(conn, dates)
+    for bar in result.bars:
+        write_symbol_csv(
+            base_dir=get_path("csv_dir"),
+            trade_date=bar.trade_date,
+            symbol=bar.symbol,
+            rows=[csv_row(bar)],
+        )
+    with tracing.span("summary_write", items=len(dates)):
+        _refresh_summaries(counts, repaired_by_date, load_yaml(SCHEDULE_CONFIG))
+
+    log.info(
+        "repair finished in %.1fs: pairs=%s symbols=%s dates=%s api_requests=%s dom_requests=%s repaired=%s unresolved=%s",
+        time.time() - started, len(items), len(grouped), len(dates),
+        result.api_requests, result.dom_requests, len(result.bars), len(result.unresolved),
+    )
+    return 2 if result.unresolved else 0
+
+
+# 补采 since（默认回溯 30 天）至今状态为 missing / failed 的股票
+def repair(since: str | None = None) -> int:
+    log = logging.getLogger(__name__)
+    today = market_today()
+    since = since or (date.fromisoformat(today) - timedelta(days=DEFAULT_LOOKBACK_DAYS)).isoformat()
+    tracer = tracing.start_run(today, "repair")
+    try:
+        with tracing.span("repair_plan") as span:
+            items = plan_repairs(since, today)
+            span.items = len(items)
+        if not items:
+            log.info("nothing to repair between %s and %s", since, today)
+            return 0
+        return execute_repairs(items, today)
+    finally:
+        tracing.export_quietly(tracer)
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+from stock_collector.config.settings import get_path, load_yaml
+from stock_collector.meta.stock_names import load_st_symbols
+from stock_collector.meta.universe import load_snapshot
+from stock_collector.ops import report, tracing
+from stock_collector.pipeline import validator
+from stock_collector.pipeline.daily import build_daily_bar, day_validator, post_persist
+from stock_collector.pipeline.run_after_close import SCHEDULE_CONFIG, SCRAPER_CONFIG, build_final_summary
+from stock_collector.pipeline.stages import CollectState, StageConfig, StreamingCollector, csv_row
+from stock_collector.scraper.parsers import parse_kline_json, parse_kline_jsonp, parse_quote_extract
+from stock_collector.storage import raw_archive
+from stock_collector.storage.csv_writer import write_symbol_csv
+from stock_collector.storage.sqlite_store import default_db_path, fetch_day_bars, fetch_statuses, init_db
+from stock_collector.storage.writer import open_db, write_status
+
+# 接口类原始响应对应的解析函数（按优先顺序尝试）
+KLINE_PARSERS = (("api", parse_kline_json), ("jsonp", parse_kline_jsonp))
+
+
+# 按股票、类型分组归档记录（保持写入顺序）
+def group_payloads(records: Iterable[dict[str, Any]]) -> dict[str, dict[str, list[dict[str, Any]]]]:
+    grouped: dict[str, dict[str, list[dict[str, Any]]]] = defaultdict(lambda: defaultdict(list))
+    for record in records:
+        grouped[record["symbol"]][record["kind"]].append(record)
+    return grouped
+
+
+# 由归档构建接口抓取函数：任一响应解析成功即采用，否则缺失优先于其它错误
+def _archived_api(payloads: dict[str, dict[str, list[dict[str, Any]]]]) -> Callable[[str, str], dict]:
+    def fetch(symbol: str, trade_date: str) -> dict:
+        error: Exception | None = None
+        for kind, parse in KLINE_PARSERS:
+            for record in payloads[symbol].get(kind, []):
+                try:
+                    status = record.get("status")
+                    if status is not None and status >= 400:
+                        raise RuntimeError(f"HTTP_{status}")
+                    return parse(record["body"], symbol, trade_date)
+                except Exception as exc:
+                    if error is None or str(exc) == "API_MISSING":
+                        error = exc
+        raise error or RuntimeError("REPLAY_NO_PAYLOAD")
+
+    return fetch
+
+
+# 由归档构建页面兜底函数（取最后一次提取结果）
+def _archived_dom(payloads: dict[str, dict[str, list[dict[str, Any]]]]) -> Callable[[Any, str], Any]:
+    async def fetch(page: Any, symbol: str) -> dict:
+        records = payloads[symbol].get("dom", [])
+        if not records:
+            raise RuntimeError("REPLAY_NO_PAYLOAD")
+        return parse_quote_extract(json.loads(records[-1]["body"]), symbol)
+
+    return fetch
+
+
+# 重放汇总路径（与当日采集汇总分开，不计入运行记录）
+def replay_summary_path(trade_date: str) -> Path:
+    return get_path("summary_dir") / "replay" / f"{trade_date}.json"
+
+
+# 离线重建：以归档响应驱动同一条流水线，按 upsert 覆盖当日日线；
+# 重放未成功而原先已成功的股票保留原日线并恢复原状态
+async def _replay_async(
+    trade_date: str,
+    payloads: dict[str, dict[str, list[dict[str, Any]]]],
+    db_path: str,
+) -> dict[str, Any]:
+    schedule = load_yaml(SCHEDULE_CONFIG)
+    scraper_config = load_yaml(SCRAPER_CONFIG)
+    symbols = sorted(payloads)
+    state = CollectState()
+    # 无网络请求，去掉兜底限速
+    config = replace(StageConfig.from_config(scraper_config), dom_delay_ms=0, dom_jitter_ms=0)
+    with tracing.span("db_init"):
+        init_db(db_path)
+    start_time = time.time()
+
+    with open_db(db_path, check_same_thread=False) as conn:
+        previous = fetch_statuses(conn, trade_date)
+        collector = StreamingCollector(
+            trade_date=trade_date,
+            conn=conn,
+            state=state,
+            config=config,
+            csv_base_dir=get_path("csv_dir"),
+            fetch_api=_archived_api(payloads),
+            fetch_dom=_archived_dom(payloads),
+            open_browser=None,
+            build_bar=build_daily_bar,
+            validate_bar=day_validator(trade_date),
+            # 保留原始运行的抓取耗时
+            record_timing=False,
+        )
+        await collector.run(symbols)
+        kept = sorted(
+            symbol for symbol in symbols
+            if symbol not in state.success_symbols
+            and symbol in previous and previous[symbol].status == "success"
+        )
+        for symbol in kept:
+            write_status(conn, previous[symbol])
+        conn.commit()
+        # 兜底导出已为这些股票写出空 CSV，按原日线重写
+        for bar in fetch_day_bars(conn, trade_date, kept):
+            write_symbol_csv(base_dir=get_path("csv_dir"), trade_date=trade_date, symbol=bar.symbol, rows=[csv_row(bar)])
+        # 离线重建只读股本缓存
+        enrichment = post_persist(conn, trade_date, refresh_shares=False)
+        # 离线重建只读简称缓存
+        st_symbols = load_st_symbols(conn, trade_date, refresh=False)
+        validation = validator.summarize_flags(validator.validate_day(conn, trade_date, st_symbols))
+        # 按当日股票池统计重放后的状态（归档未覆盖的股票沿用原状态）
+        universe = load_snapshot(trade_date) or symbols
+        statuses = fetch_statuses(conn, trade_date)
+
+    counts: dict[str, int] = defaultdict(int)
+    for symbol in universe:
+        counts[statuses[symbol].status if symbol in statuses else "missing"] += 1
+    summary = build_final_summary(
+        trade_date,
+        schedule,
+        expected=len(universe),
+        success=counts["success"],
+        failed=counts["failed"],
+        missing=counts["missing"],
+        skipped=counts["skipped"],
+        retry_success=state.retry_success,
+        duration_seconds=time.time() - start_time,
+        errors=state.errors,
+    )
+    summary["runner"] = "replay"
+    summary["validation"] = validation
+    summary["enrichment"] = enrichment
+    summary["replay"] = {
+        "symbols": len(symbols),
+        "success": len(state.success_symbols),
+        "failed": len(state.failed_symbols),
+        "missing": len(state.missing_symbols),
+        "skipped": len(state.skipped_symbols),
+        "kept": len(kept),
+    }
+    return summary
+
+
+# 从原始归档重建指定交易日的日线与 CSV，汇总写入独立的重放汇总（不发起网络请求，不发送通知）
+def replay(target_date: str, db_path: str | None = None) -> int:
+    log = logging.getLogger(__name__)
+    tracing.start_run(target_date, "replay")
+    with tracing.span("archive_read"):
+        records = list(raw_archive.iter_records(target_date))
+        payloads = group_payloads(records)
+    if not payloads:
+        log.error("no raw archive for %s under %s", target_date, get_path("raw_dir"))
+        return 1
+
+    summary = asyncio.run(_replay_async(target_date, payloads, db_path or default_db_path()))
+    summary["replay"]["records"] = len(records)
+    summary["stages"] = tracing.current().breakdown()
+    with tracing.span("summary_write"):
+        report.write_summary(summary, replay_summary_path(target_date))
+    log.info(
+        "replay finished for %s: records=%s success=%s missing=%s failed=%s skipped=%s kept=%s",
+        target_date, len(records), summary["replay"]["success"], summary["replay"]["missing"],
+        summary["replay"]["failed"], summary["replay"]["skipped"], summary["replay"]["kept"],
+    )
+    return 2 if summary["level"] in {"ERROR", "CRITICAL"} else 0
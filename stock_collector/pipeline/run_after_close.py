@@ -1,45 +1,51 @@
 import asyncio
-import json
 import logging
 import os
-import random
+import sqlite3
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from datetime import datetime
-from pathlib import Path
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
 
-import pytz
-import yaml
-
-from stock_collector.config.settings import get_path
-from stock_collector.ops import alerting, backup, notifier_email, report
+from stock_collector.config.settings import get_path, load_yaml
+from stock_collector.ops import alerting, backup, metrics, notifier_email, profiling, report, run_history, tracing
 from stock_collector.ops.notifier_email import send_sms_via_email_once_per_day
 from stock_collector.ops.debug_bundle import DebugBundle, safe_env_snapshot, write_bundle
-from stock_collector.pipeline import validator
-from stock_collector.pipeline.validator import MissingBarError
-from stock_collector.pipeline.trading_calendar import is_calendar_trading_day
-from stock_collector.data.symbol_loader import load_tradeable_a_share_symbols
-from stock_collector.scraper.browser import create_browser
-from stock_collector.scraper.sina_api import fetch_daily_bar_from_sina_api
+from stock_collector.pipeline import journal, scheduler, validator
+from stock_collector.pipeline.daily import build_daily_bar, day_validator, open_browser, post_persist
+from stock_collector.pipeline.journal import ResumePoint
+from stock_collector.pipeline.stages import CollectState, StageConfig, StreamingCollector
+from stock_collector.pipeline.shard import (
+    Shard,
+    all_shards,
+    combine_shard_summaries,
+    load_shard_summaries,
+    merge_shard_dbs,
+    select_shard,
+)
+from stock_collector.pipeline.trading_calendar import is_calendar_trading_day, market_today, sessions_between
+from stock_collector.meta.stock_names import load_st_symbols
+from stock_collector.meta.universe import get_tradeable_symbols
+from stock_collector.scraper.retry import RetryConfig
+from stock_collector.scraper.sina_api import (
+    HedgeConfig,
+    configure_hedging,
+    configure_retries,
+    fetch_daily_bar_from_sina_api,
+    hedge_stats,
+    retry_stats,
+)
 from stock_collector.scraper.sina_dom import fetch_daily_bar_from_sina_dom
-from stock_collector.storage.schema import CollectStatus, DailyBar
-from stock_collector.storage.csv_writer import write_summary_csv, write_symbol_csv
-from stock_collector.storage.sqlite_store import DEFAULT_DB_PATH, fetch_statuses, init_db, now_iso
-from stock_collector.storage.writer import open_db, write_daily_bar, write_status
+from stock_collector.storage.schema import CollectStatus, RunRecord
+from stock_collector.storage import raw_archive
+from stock_collector.storage.csv_writer import write_summary_csv
+from stock_collector.storage.sqlite_store import default_db_path, fetch_statuses, init_db, now_iso
+from stock_collector.storage.writer import open_db, write_status
 
 
 # 配置与运行参数
 SCHEDULE_CONFIG = "stock_collector/config/schedule.yaml"
 SCRAPER_CONFIG = "stock_collector/config/scraper.yaml"
-API_WORKERS = 16
-DOM_WORKERS = 4
-CSV_BASE_DIR = Path("stock_collector/data/csv")
-
-
-# 加载 YAML 文件
-def _load_yaml(path: str) -> dict:
-    with open(path, "r", encoding="utf-8") as file_handle:
-        return yaml.safe_load(file_handle)
 
 
 # 获取运行环境名称
@@ -47,8 +53,13 @@ def _runner_name() -> str:
     return "github-actions" if os.getenv("GITHUB_ACTIONS") else "local"
 
 
+# 生成调试包阶段名（分片运行追加分片标签，避免互相覆盖）
+def _stage(name: str, shard: Shard | None) -> str:
+    return f"{name}.{shard.tag}" if shard else name
+
+
 # 写入跳过采集的汇总文件
-def _write_skip_summary(trade_date: str, reason: str) -> None:
+def _write_skip_summary(trade_date: str, reason: str, shard: Shard | None = None) -> None:
     # 构建汇总结构
     summary = report.build_summary(
         date_value=trade_date,
@@ -69,212 +80,205 @@ def _write_skip_summary(trade_date: str, reason: str) -> None:
     summary["same_symbol_missing_days"] = 0
     summary["human_required"] = False
     summary["skip_reason"] = reason
+    summary["stages"] = tracing.current().breakdown()
 
     # 写入 CSV 汇总
     write_summary_csv(
-        base_dir=CSV_BASE_DIR,
+        base_dir=get_path("csv_dir"),
         trade_date=trade_date,
         summary_rows=summary.get("symbols", []),
     )
     # 写入 JSON 汇总
-    summary_path = get_path("summary_dir") / f"{trade_date}.json"
-    summary_path.parent.mkdir(parents=True, exist_ok=True)
-    summary_path.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
-
-
-# 将原始数据转换为 DailyBar 对象
-def _build_daily_bar(raw: dict) -> DailyBar:
-    return DailyBar(
-        symbol=raw["symbol"],
-        trade_date=raw["trade_date"],
-        open=float(raw.get("open", 0.0)),
-        high=float(raw.get("high", 0.0)),
-        low=float(raw.get("low", 0.0)),
-        close=float(raw.get("close", 0.0)),
-        change=float(raw.get("change", 0.0)),
-        change_pct=float(raw.get("change_pct", 0.0)),
-        volume=int(raw.get("volume", 0)),
-        amplitude_pct=float(raw.get("amplitude_pct", 0.0)),
-        turnover_pct=float(raw.get("turnover_pct", 0.0)),
-        amount=float(raw["amount"]) if raw.get("amount") is not None else None,
-        price_type="raw",
-        source=raw.get("source", "sina"),
-        updated_at=now_iso(),
+    report.write_summary(summary, shard.summary_path(trade_date) if shard else None)
+
+
+# 构建汇总并根据连续错误天数确定最终告警等级
+def build_final_summary(
+    trade_date: str,
+    schedule: dict,
+    expected: int,
+    success: int,
+    failed: int,
+    missing: int,
+    skipped: int,
+    retry_success: int,
+    duration_seconds: float,
+    errors: list[str],
+) -> dict:
+    success_rate = success / expected if expected else 0.0
+    thresholds = schedule["thresholds"]
+    initial_level = alerting.compute_level(success_rate, 0, thresholds)
+    summary = report.build_summary(
+        date_value=trade_date,
+        expected=expected,
+        success=success,
+        failed=failed,
+        missing=missing,
+        skipped=skipped,
+        retry_success=retry_success,
+        duration_seconds=duration_seconds,
+        source="sina",
+        runner=_runner_name(),
+        human_required=False,
+        level=initial_level,
+        errors=errors,
     )
+    summary["success_rate"] = success_rate
+    summary["same_symbol_missing_days"] = 0
 
+    # 判断是否需要人工处理
+    summary["human_required"] = alerting.compute_human_required(summary, schedule["human_required"])
 
-# 异步执行采集流程
-async def _run_async(trade_date: str, symbols: list[str]) -> int:
-    # 初始化日志与配置
-    log = logging.getLogger(__name__)
-    schedule = _load_yaml(SCHEDULE_CONFIG)
-    scraper_config = _load_yaml(SCRAPER_CONFIG)
-
-    # 初始化状态变量
-    trade_date_str = trade_date
-    is_trading_day = is_calendar_trading_day(trade_date)
-    success_count = 0
-    missing_count = 0
-    failed_count = 0
-    first_error = None
-    # 写入启动调试包
+    # 根据连续错误天数调整告警等级
+    consecutive_error_days = alerting.get_consecutive_error_days()
+    if consecutive_error_days >= thresholds.get("critical_consecutive_error_days", 2):
+        if initial_level in {"ERROR", "CRITICAL"}:
+            summary["level"] = "CRITICAL"
+    return summary
+
+
+# 写出汇总并发送通知与备份（分片运行只写分片汇总）
+def _publish_summary(
+    trade_date: str,
+    summary: dict,
+    missing_symbols: list[str],
+    shard: Shard | None = None,
+) -> None:
+    # 汇总中记录截至此时的阶段耗时（通知与备份耗时见 trace 与指标文件）
+    summary["stages"] = tracing.current().breakdown()
+    with tracing.span("summary_write"):
+        # 写入汇总 CSV
+        write_summary_csv(
+            base_dir=get_path("csv_dir"),
+            trade_date=trade_date,
+            summary_rows=summary.get("symbols", []),
+        )
+        if shard is not None:
+            # 通知与备份由分片合并步骤统一完成
+            report.write_summary(summary, shard.summary_path(trade_date))
+            return
+
+        # 写入汇总 JSON
+        report.write_summary(summary)
+
+    # 发送通知
+    with tracing.span("email"):
+        notifier_email.send_email(summary, missing_symbols)
+        if summary.get("level") == "CRITICAL":
+            sms_text = (
+                "A股采集 CRITICAL\n"
+                f"{summary.get('date')} "
+                f"{summary.get('success')}/{summary.get('expected')}\n"
+                f"missing={summary.get('missing')}"
+            )
+            send_sms_via_email_once_per_day(sms_text)
+    # 备份与清理
+    with tracing.span("backup"):
+        backup.create_backup_bundle(trade_date)
+        backup.cleanup_backups()
+
+
+# 采集依赖（多日补采时替换接口抓取并共享数据库连接）
+@dataclass
+class CollectDeps:
+    # 接口抓取
+    fetch_api: Callable[[str, str], dict] = fetch_daily_bar_from_sina_api
+    # 页面兜底抓取
+    fetch_dom: Callable[[Any, str], Awaitable[dict]] = fetch_daily_bar_from_sina_dom
+    # 启动浏览器
+    open_browser: Callable[[], Awaitable[Any]] | None = open_browser
+    # 已打开的数据库连接（为空时按 db_path 打开）
+    conn: sqlite3.Connection | None = None
+
+
+# 写入指定阶段的调试包
+def _write_stage_bundle(
+    trade_date: str,
+    stage: str,
+    shard: Shard | None,
+    is_trading_day: bool,
+    total_symbols: int,
+    state: CollectState,
+    note: str,
+) -> None:
+    # 性能分析模式下记录阶段内存快照
+    profiling.checkpoint(_stage(stage, shard))
     write_bundle(DebugBundle(
-        target_date=trade_date_str,
-        stage="start",
+        target_date=trade_date,
+        stage=_stage(stage, shard),
         is_trading_day=is_trading_day,
-        total_symbols=0,
-        success_count=success_count,
-        missing_count=missing_count,
-        failed_count=failed_count,
-        first_error=first_error,
-        note="pipeline started",
+        total_symbols=total_symbols,
+        success_count=state.success_count,
+        missing_count=state.missing_count,
+        failed_count=state.failed_count,
+        first_error=state.first_error,
+        note=note,
         env=safe_env_snapshot(),
     ))
 
-    # 写入加载股票池后的调试包
-    write_bundle(DebugBundle(
-        target_date=trade_date_str,
-        stage="after_symbols_loaded",
-        is_trading_day=is_trading_day,
-        total_symbols=len(symbols),
-        success_count=success_count,
-        missing_count=missing_count,
-        failed_count=failed_count,
-        first_error=first_error,
-        note="symbols loaded",
-        env=safe_env_snapshot(),
-    ))
-    # 写入交易日判断后的调试包
-    write_bundle(DebugBundle(
-        target_date=trade_date_str,
-        stage="trading_day_checked",
-        is_trading_day=is_trading_day,
-        total_symbols=len(symbols),
-        success_count=success_count,
-        missing_count=missing_count,
-        failed_count=failed_count,
-        first_error=first_error,
-        note="trading day decided",
-        env=safe_env_snapshot(),
-    ))
-    # 初始化数据库
-    init_db(DEFAULT_DB_PATH)
 
-    # 初始化统计容器
-    start_time = time.time()
-    errors: list[str] = []
-    success_symbols: set[str] = set()
-    failed_symbols: set[str] = set()
-    missing_symbols: set[str] = set()
-    skipped_symbols: set[str] = set()
-    failed_event_symbols: set[str] = set()
-    api_failed_symbols: list[str] = []
-    retry_success = 0
-
-    # 读取限速配置
-    rate_limit = scraper_config.get("rate_limit", {})
-    delay_ms = rate_limit.get("per_symbol_delay_ms", 200)
-    jitter_ms = rate_limit.get("random_jitter_ms", 120)
-
-    # 打开数据库连接
-    with open_db(DEFAULT_DB_PATH) as conn:
-        # 记录采集状态
-        def record_status(symbol: str, status: str, retry_count: int, last_error: str = "") -> None:
-            status_obj = CollectStatus(
-                trade_date=trade_date,
-                symbol=symbol,
-                status=status,
-                retry_count=retry_count,
-                last_error=last_error,
-                updated_at=now_iso(),
+# 交易日业务约束校验：必须全部成功且无缺失/失败
+def _check_trading_day_axiom(
+    trade_date: str,
+    shard: Shard | None,
+    is_trading_day: bool,
+    symbols: list[str],
+    state: CollectState,
+) -> None:
+    if is_trading_day and state.success_count == 0:
+        raise RuntimeError(
+            "TRADING_DAY_NO_DATA: "
+            f"{trade_date} tradeable stocks={len(symbols)}, success=0"
+        )
+    if is_trading_day:
+        if state.success_count != len(symbols) or state.missing_count != 0 or state.failed_count != 0:
+            _write_stage_bundle(
+                trade_date, "fatal", shard, is_trading_day, len(symbols), state,
+                "FATAL: trading day requires full success with zero missing/failed",
             )
-            write_status(conn, status_obj)
-
-        # 记录成功状态
-        def record_success(symbol: str, retry_count: int = 0, source: str = "api") -> None:
-            nonlocal success_count
-            if symbol not in success_symbols:
-                success_count += 1
-            success_symbols.add(symbol)
-            record_status(symbol, "success", retry_count, "")
-
-        # 记录跳过状态
-        def record_skipped(symbol: str, reason: str, retry_count: int = 0) -> None:
-            skipped_symbols.add(symbol)
-            record_status(symbol, "skipped", retry_count, reason)
-            write_symbol_csv(
-                base_dir=CSV_BASE_DIR,
-                trade_date=trade_date,
-                symbol=symbol,
-                rows=[],
+            raise RuntimeError(
+                "FATAL: 交易日出现缺失/失败，违反业务公理。"
+                f" total={len(symbols)} success={state.success_count}"
+                f" missing={state.missing_count} failed={state.failed_count}"
+                f" first_error={state.first_error}"
             )
 
-        # 记录 API 失败状态
-        def record_api_failure(symbol: str, error: str) -> None:
-            nonlocal failed_count, first_error
-            record_status(symbol, "api_failed", 0, error)
-            errors.append(error)
-            if symbol not in failed_event_symbols:
-                failed_count += 1
-                failed_event_symbols.add(symbol)
-            if first_error is None:
-                first_error = {
-                    "type": "failed",
-                    "symbol": symbol,
-                    "exception": repr(error),
-                }
-            write_symbol_csv(
-                base_dir=CSV_BASE_DIR,
-                trade_date=trade_date,
-                symbol=symbol,
-                rows=[],
-            )
 
-        # 记录通用失败状态
-        def record_failure(symbol: str, error: str) -> None:
-            nonlocal failed_count, first_error
-            if symbol not in failed_event_symbols:
-                failed_count += 1
-                failed_event_symbols.add(symbol)
-            failed_symbols.add(symbol)
-            record_status(symbol, "failed", 0, error)
-            errors.append(error)
-            if first_error is None:
-                first_error = {
-                    "type": "failed",
-                    "symbol": symbol,
-                    "exception": repr(error),
-                }
-            write_symbol_csv(
-                base_dir=CSV_BASE_DIR,
-                trade_date=trade_date,
-                symbol=symbol,
-                rows=[],
-            )
+# 异步执行采集流程
+async def run_async(
+    trade_date: str,
+    symbols: list[str],
+    db_path: str | None = None,
+    shard: Shard | None = None,
+    resume_point: ResumePoint | None = None,
+    deps: CollectDeps | None = None,
+) -> int:
+    # 初始化日志与配置
+    log = logging.getLogger(__name__)
+    db_path = db_path or default_db_path()
+    deps = deps or CollectDeps()
+    schedule = load_yaml(SCHEDULE_CONFIG)
+    scraper_config = load_yaml(SCRAPER_CONFIG)
 
-        # 记录缺失状态
-        def record_missing(symbol: str, reason: str) -> None:
-            nonlocal missing_count, first_error
-            if symbol not in missing_symbols:
-                missing_count += 1
-            missing_symbols.add(symbol)
-            record_status(symbol, "missing", 0, reason)
-            if first_error is None:
-                first_error = {
-                    "type": "missing",
-                    "symbol": symbol,
-                    "exception": repr(reason),
-                }
-            write_symbol_csv(
-                base_dir=CSV_BASE_DIR,
-                trade_date=trade_date,
-                symbol=symbol,
-                rows=[],
-            )
+    # 初始化状态变量
+    is_trading_day = is_calendar_trading_day(trade_date)
+    # 续跑时由运行日志恢复计数与集合
+    state = resume_point.state if resume_point else CollectState()
+    # 写入启动、加载股票池与交易日判断后的调试包
+    _write_stage_bundle(trade_date, "start", shard, is_trading_day, 0, state, "pipeline started")
+    _write_stage_bundle(trade_date, "after_symbols_loaded", shard, is_trading_day, len(symbols), state, "symbols loaded")
+    _write_stage_bundle(trade_date, "trading_day_checked", shard, is_trading_day, len(symbols), state, "trading day decided")
+    # 初始化数据库（共享连接已由调用方初始化）
+    if deps.conn is None:
+        with tracing.span("db_init"):
+            init_db(db_path)
+    start_time = time.time()
 
+    # 打开数据库连接（落库阶段在独立线程中使用该连接）
+    with open_db(db_path, check_same_thread=False) if deps.conn is None else nullcontext(deps.conn) as conn:
         # 判断是否已采集
         def already_collected(symbol: str, date_value: str) -> bool:
-            if symbol in success_symbols:
+            if symbol in state.success_symbols:
                 return True
             cursor = conn.execute(
                 "SELECT 1 FROM daily_bar WHERE symbol = ? AND trade_date = ? LIMIT 1",
@@ -282,95 +286,37 @@ async def _run_async(trade_date: str, symbols: list[str]) -> int:
             )
             return cursor.fetchone() is not None
 
-        # 校验日线数据
-        def validate_bar(bar: DailyBar) -> None:
-            if bar.trade_date != trade_date:
-                raise MissingBarError(bar.symbol, trade_date, f"日期不匹配: {bar.trade_date}")
-            validate_errors = validator.validate_bar(bar)
-            if validate_errors:
-                raise RuntimeError(";".join(validate_errors))
-
-        # 保存日线数据并写出 CSV
-        def store_bar(bar: DailyBar) -> None:
-            if already_collected(bar.symbol, bar.trade_date):
-                return
-            write_daily_bar(conn, bar)
-            write_symbol_csv(
-                base_dir=CSV_BASE_DIR,
-                trade_date=bar.trade_date,
-                symbol=bar.symbol,
-                rows=[
-                    {
-                        "trade_date": bar.trade_date,
-                        "symbol": bar.symbol,
-                        "open": bar.open,
-                        "high": bar.high,
-                        "low": bar.low,
-                        "close": bar.close,
-                        "volume": bar.volume,
-                        "amount": bar.amount,
-                    }
-                ],
-            )
-
-        # 读取已有状态并构建待采集列表
-        current_status = fetch_statuses(conn, trade_date)
-        todo_symbols: list[str] = []
-        for symbol in symbols:
+        # 读取已有状态并构建待采集列表（续跑时直接取日志中的未完成队列，不再逐只查询）
+        todo_symbols: list[str] = list(resume_point.pending) if resume_point else []
+        scan_symbols = symbols if resume_point is None else []
+        current_status = fetch_statuses(conn, trade_date) if scan_symbols else {}
+        for symbol in scan_symbols:
             status = current_status.get(symbol)
             if status and status.status == "success":
-                if symbol not in success_symbols:
-                    success_count += 1
-                success_symbols.add(symbol)
+                state.mark_success(symbol)
                 continue
             if already_collected(symbol, trade_date):
-                record_success(symbol, source="existing")
+                state.mark_success(symbol)
+                write_status(conn, CollectStatus(
+                    trade_date=trade_date,
+                    symbol=symbol,
+                    status="success",
+                    retry_count=0,
+                    last_error="",
+                    updated_at=now_iso(),
+                ))
                 continue
             todo_symbols.append(symbol)
+        conn.commit()
 
         # 输出待采集数量
         log.info("todo_symbols=%s for %s", len(todo_symbols), trade_date)
 
-        # 若无待采集则直接收尾
-        if not todo_symbols:
-            write_bundle(DebugBundle(
-                target_date=trade_date,
-                stage="after_fetch",
-                is_trading_day=is_trading_day,
-                total_symbols=len(symbols),
-                success_count=success_count,
-                missing_count=missing_count,
-                failed_count=failed_count,
-                first_error=first_error,
-                note="fetch finished",
-                env=safe_env_snapshot(),
-            ))
-            # 交易日但无数据时抛错
-            if is_trading_day and success_count == 0:
-                raise RuntimeError(
-                    "TRADING_DAY_NO_DATA: "
-                    f"{trade_date} tradeable stocks={len(symbols)}, success=0"
-                )
-            if is_trading_day:
-                if success_count != len(symbols) or missing_count != 0 or failed_count != 0:
-                    write_bundle(DebugBundle(
-                        target_date=trade_date_str,
-                        stage="fatal",
-                        is_trading_day=is_trading_day,
-                        total_symbols=len(symbols),
-                        success_count=success_count,
-                        missing_count=missing_count,
-                        failed_count=failed_count,
-                        first_error=first_error,
-                        note="FATAL: trading day requires full success with zero missing/failed",
-                        env=safe_env_snapshot(),
-                    ))
-                    raise RuntimeError(
-                        "FATAL: 交易日出现缺失/失败，违反业务公理。"
-                        f" total={len(symbols)} success={success_count}"
-                        f" missing={missing_count} failed={failed_count}"
-                        f" first_error={first_error}"
-                    )
+        # 若无待采集则直接收尾（上次运行可能在落库后中断，仍需补齐落库后处理）
+        if not todo_symbols and resume_point is None:
+            enrichment = post_persist(conn, trade_date) if shard is None else {}
+            _write_stage_bundle(trade_date, "after_fetch", shard, is_trading_day, len(symbols), state, "fetch finished")
+            _check_trading_day_axiom(trade_date, shard, is_trading_day, symbols, state)
             # 生成汇总信息
             duration_seconds = time.time() - start_time
             expected = len(symbols)
@@ -380,7 +326,7 @@ async def _run_async(trade_date: str, symbols: list[str]) -> int:
                 success=expected,
                 failed=0,
                 missing=0,
-                skipped=len(skipped_symbols),
+                skipped=len(state.skipped_symbols),
                 retry_success=0,
                 duration_seconds=duration_seconds,
                 source="sina",
@@ -392,198 +338,112 @@ async def _run_async(trade_date: str, symbols: list[str]) -> int:
             summary["success_rate"] = 1.0 if expected else 0.0
             summary["same_symbol_missing_days"] = 0
             summary["human_required"] = False
-            # 写入汇总 CSV 与 JSON
-            write_summary_csv(
-                base_dir=CSV_BASE_DIR,
-                trade_date=trade_date,
-                summary_rows=summary.get("symbols", []),
-            )
-            summary_path = get_path("summary_dir") / f"{trade_date}.json"
-            summary_path.parent.mkdir(parents=True, exist_ok=True)
-            summary_path.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
-            notifier_email.send_email(summary, sorted(missing_symbols))
-            backup.create_backup_bundle(trade_date)
-            backup.cleanup_backups()
+            summary["enrichment"] = enrichment
+            # 写入汇总 CSV 与 JSON，并发送通知与备份
+            _publish_summary(trade_date, summary, sorted(state.missing_symbols), shard)
             return 0
 
-        # 记录 API 缺失的股票
-        api_missing_symbols: list[str] = []
-
-        # 线程池任务函数
-        def _api_task(sym: str):
-            return sym, fetch_daily_bar_from_sina_api(sym, trade_date)
-
-        # 使用线程池并发抓取 API 数据
-        with ThreadPoolExecutor(max_workers=API_WORKERS) as ex:
-            future_to_symbol: dict = {}
-            for symbol in todo_symbols:
-                future = ex.submit(_api_task, symbol)
-                future_to_symbol[future] = symbol
-
-            for fu in as_completed(future_to_symbol):
-                symbol = future_to_symbol[fu]
-                try:
-                    _, raw_bar = fu.result()
-                    bar = _build_daily_bar(raw_bar)
-                    validate_bar(bar)
-                    store_bar(bar)
-                    record_success(symbol, source="api")
-                except RuntimeError as exc:
-                    if str(exc) == "API_MISSING":
-                        record_missing(symbol, reason="api_missing")
-                        api_missing_symbols.append(symbol)
-                    else:
-                        record_api_failure(symbol, str(exc))
-                        api_failed_symbols.append(symbol)
-                except Exception as exc:
-                    record_api_failure(symbol, str(exc))
-                    api_failed_symbols.append(symbol)
-
-        # 对 API 失败的股票使用 DOM 方式补抓
-        if api_failed_symbols:
-            browser = await create_browser()
-            try:
-                pages = [await browser.context.new_page() for _ in range(DOM_WORKERS)]
-
-                for idx, symbol in enumerate(api_failed_symbols):
-                    page = pages[idx % DOM_WORKERS]
-                    try:
-                        if already_collected(symbol, trade_date):
-                            record_success(symbol, source="existing")
-                            continue
-
-                        raw_bar = await fetch_daily_bar_from_sina_dom(page, symbol)
-                        bar = _build_daily_bar(raw_bar)
-                        validate_bar(bar)
-                        store_bar(bar)
-
-                        record_success(symbol, source="dom")
-                        retry_success += 1
-                    except MissingBarError as exc:
-                        record_missing(symbol, reason=str(exc))
-                    except RuntimeError as exc:
-                        if str(exc) == "STOCK_SUSPENDED":
-                            record_skipped(symbol, reason="suspended")
-                        else:
-                            record_failure(symbol, str(exc))
-                    except Exception as exc:
-                        record_failure(symbol, str(exc))
-                    # 限速等待
-                    await asyncio.sleep((delay_ms + random.randint(0, jitter_ms)) / 1000)
-            finally:
-                # 释放页面与浏览器资源
-                if "pages" in locals():
-                    for p in pages:
-                        await p.close()
-                await browser.close()
+        # 按历史耗时与失败率排序（分片同样读取主库历史；续跑沿用日志中的顺序）
+        if resume_point is None:
+            todo_symbols = scheduler.order_symbols(
+                todo_symbols,
+                trade_date,
+                scheduler.SchedulerConfig.from_config(scraper_config),
+            )
+
+        # 逐批记录处理结果到运行日志（进程中断后可 --resume 续跑）
+        journal_file = journal.journal_path(trade_date, shard.tag if shard else "")
+        run_journal = journal.open_journal(
+            journal_file,
+            journal.JournalConfig.from_config(scraper_config),
+            resume=resume_point is not None,
+        )
+        if run_journal is not None:
+            if resume_point is None:
+                run_journal.begin(trade_date, symbols, todo_symbols)
+            else:
+                run_journal.resumed(len(todo_symbols))
+
+        # 配置 API 对冲请求（慢请求超过分位耗时后重复发出）
+        configure_hedging(HedgeConfig.from_config(scraper_config))
+        # 配置按域名自适应的超时与全程重试预算
+        configure_retries(RetryConfig.from_config(scraper_config))
+        # 清零按来源的请求耗时与结果统计
+        metrics.reset()
+
+        # 流式执行 API 抓取、DOM 兜底、校验、落库与 CSV 导出
+        collector = StreamingCollector(
+            trade_date=trade_date,
+            conn=conn,
+            state=state,
+            config=StageConfig.from_config(scraper_config),
+            csv_base_dir=get_path("csv_dir"),
+            fetch_api=deps.fetch_api,
+            fetch_dom=deps.fetch_dom,
+            open_browser=deps.open_browser,
+            build_bar=build_daily_bar,
+            validate_bar=day_validator(trade_date),
+            on_persisted=run_journal.record if run_journal else None,
+        )
+        # 原始响应按交易日追加到压缩归档（供离线重放）
+        raw_archive.start(trade_date, raw_archive.ArchiveConfig.from_config(scraper_config), shard.tag if shard else "")
+        try:
+            await collector.run(todo_symbols)
+        finally:
+            archive_stats = raw_archive.stop()
+            journal_stats = run_journal.close() if run_journal else {}
+        # 首个请求到最后一条日线落库的跨度（衡量尾部耗时）
+        fetch_span_seconds = None
+        if collector.first_request_at is not None and collector.last_stored_at is not None:
+            fetch_span_seconds = round(collector.last_stored_at - collector.first_request_at, 3)
+
+        # 整日补算涨跌额、涨跌幅、振幅与换手率并刷新复权事件、周线 / 月线与技术特征（分片库缺少历史日线，合并后在主库统一补算）
+        enrichment = post_persist(conn, trade_date) if shard is None else {}
+
+        # 整日批量校验（OHLC、涨跌停区间、成交量异常），结果仅记入汇总（分片库缺少前一交易日，合并后在主库统一校验）
+        validation = _validate_day(conn, trade_date) if shard is None else {}
 
     # 汇总统计结果
     duration_seconds = time.time() - start_time
-    expected = len(symbols)
-    success = len(success_symbols)
-    failed = len(failed_symbols)
-    missing = len(missing_symbols)
-    success_rate = success / expected if expected else 0.0
 
-    # 写入采集完成的调试包
-    write_bundle(DebugBundle(
-        target_date=trade_date_str,
-        stage="after_fetch",
-        is_trading_day=is_trading_day,
-        total_symbols=len(symbols),
-        success_count=success_count,
-        missing_count=missing_count,
-        failed_count=failed_count,
-        first_error=first_error,
-        note="fetch finished",
-        env=safe_env_snapshot(),
-    ))
-    # 交易日业务约束校验
-    if is_trading_day and success_count == 0:
-        raise RuntimeError(
-            "TRADING_DAY_NO_DATA: "
-            f"{trade_date} tradeable stocks={len(symbols)}, success=0"
-        )
-    if is_trading_day:
-        if success_count != len(symbols) or missing_count != 0 or failed_count != 0:
-            write_bundle(DebugBundle(
-                target_date=trade_date_str,
-                stage="fatal",
-                is_trading_day=is_trading_day,
-                total_symbols=len(symbols),
-                success_count=success_count,
-                missing_count=missing_count,
-                failed_count=failed_count,
-                first_error=first_error,
-                note="FATAL: trading day requires full success with zero missing/failed",
-                env=safe_env_snapshot(),
-            ))
-            raise RuntimeError(
-                "FATAL: 交易日出现缺失/失败，违反业务公理。"
-                f" total={len(symbols)} success={success_count}"
-                f" missing={missing_count} failed={failed_count}"
-                f" first_error={first_error}"
-            )
+    # 写入采集完成的调试包并校验交易日约束
+    _write_stage_bundle(trade_date, "after_fetch", shard, is_trading_day, len(symbols), state, "fetch finished")
+    _check_trading_day_axiom(trade_date, shard, is_trading_day, symbols, state)
 
     # 构建汇总并计算告警等级
-    initial_level = alerting.compute_level(success_rate, 0, schedule["thresholds"])
-    summary = report.build_summary(
-        date_value=trade_date,
-        expected=expected,
-        success=success,
-        failed=failed,
-        missing=missing,
-        skipped=len(skipped_symbols),
-        retry_success=retry_success,
+    summary = build_final_summary(
+        trade_date,
+        schedule,
+        expected=len(symbols),
+        success=len(state.success_symbols),
+        failed=len(state.failed_symbols),
+        missing=len(state.missing_symbols),
+        skipped=len(state.skipped_symbols),
+        retry_success=state.retry_success,
         duration_seconds=duration_seconds,
-        source="sina",
-        runner=_runner_name(),
-        human_required=False,
-        level=initial_level,
-        errors=errors,
+        errors=state.errors,
     )
-    summary["success_rate"] = success_rate
-    summary["same_symbol_missing_days"] = 0
-
-    # 判断是否需要人工处理
-    human_required = alerting.compute_human_required(summary, schedule["human_required"])
-    summary["human_required"] = human_required
-    # 写入汇总 CSV
-    write_summary_csv(
-        base_dir=CSV_BASE_DIR,
-        trade_date=trade_date,
-        summary_rows=summary.get("symbols", []),
-    )
-
-    # 根据连续错误天数调整告警等级
-    consecutive_error_days = alerting.get_consecutive_error_days()
-    thresholds = schedule["thresholds"]
-    level = initial_level
-    if consecutive_error_days >= thresholds.get("critical_consecutive_error_days", 2):
-        if initial_level in {"ERROR", "CRITICAL"}:
-            level = "CRITICAL"
-
-    # 更新汇总中的告警等级
-    if level != initial_level:
-        summary["level"] = level
-
-    # 写入汇总 JSON
-    summary_path = get_path("summary_dir") / f"{trade_date}.json"
-    summary_path.parent.mkdir(parents=True, exist_ok=True)
-    summary_path.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
-
-    # 发送通知与备份
-    notifier_email.send_email(summary, sorted(missing_symbols))
-    if summary.get("level") == "CRITICAL":
-        sms_text = (
-            "A股采集 CRITICAL\n"
-            f"{summary.get('date')} "
-            f"{summary.get('success')}/{summary.get('expected')}\n"
-            f"missing={summary.get('missing')}"
-        )
-        send_sms_via_email_once_per_day(sms_text)
-    backup.create_backup_bundle(trade_date)
-    backup.cleanup_backups()
+    if shard is None:
+        summary["validation"] = validation
+    summary["enrichment"] = enrichment
+    summary["fetch_span_seconds"] = fetch_span_seconds
+    summary["hedge"] = hedge_stats()
+    summary["retry"] = retry_stats()
+    summary["raw_archive"] = archive_stats
+    summary["journal"] = journal_stats
+    if resume_point is not None:
+        summary["resumed"] = {
+            "records": resume_point.records,
+            "pending": len(resume_point.pending),
+            "resumes": resume_point.resumes + 1,
+        }
+    # 分片汇总保留直方图桶，供合并时重新计算分位数
+    summary["metrics"] = metrics.snapshot(include_buckets=shard is not None)
+    level = summary["level"]
+
+    # 写出汇总并发送通知与备份
+    _publish_summary(trade_date, summary, sorted(state.missing_symbols), shard)
+    journal.mark_finished(journal_file, level)
 
     # 根据告警等级返回状态码
     if level in {"ERROR", "CRITICAL"}:
@@ -597,80 +457,210 @@ def should_collect(date_value: str) -> bool:
     if not is_calendar_trading_day(date_value):
         return False
 
-    # 读取历史汇总
-    summary = report.load_summary(date_value)
-    if summary is None:
+    # 读取最近一次运行记录
+    return _needs_collect(run_history.latest_run(date_value))
+
+
+# 列出区间内需要（再次）采集的交易日（一次读取区间内的运行记录，规则同 should_collect）
+def dates_to_collect(since: str, until: str) -> list[str]:
+    latest = {record.trade_date: record for record in run_history.runs_between(since, until)}
+    return [date_value for date_value in sessions_between(since, until) if _needs_collect(latest.get(date_value))]
+
+
+# 根据最近一次运行记录判断是否需要采集
+def _needs_collect(record: RunRecord | None) -> bool:
+    if record is None:
         return True
 
     # 空汇总需要重试
-    if summary.get("expected") == 0 and summary.get("success") == 0 and summary.get("failed") == 0 and summary.get("missing") == 0:
+    if record.expected == 0 and record.success == 0 and record.failed == 0 and record.missing == 0:
         return True
 
     # CRITICAL 需要重试
-    if summary.get("level") == "CRITICAL":
+    if record.level == "CRITICAL":
         return True
 
     # 失败或缺失需要重试
-    if summary.get("failed", 0) > 0:
+    if record.failed > 0:
         return True
 
-    if summary.get("missing", 0) > 0:
+    if record.missing > 0:
         return True
 
     # 成功不足也需要重试
-    if summary.get("success", 0) < summary.get("expected", 0):
+    if record.success < record.expected:
         return True
 
     return False
 
 
 # 运行采集流程并处理异常
-def run_collection(target_date: str, symbols: list[str]) -> int:
+def run_collection(
+    target_date: str,
+    symbols: list[str],
+    shard: Shard | None = None,
+    resume_point: ResumePoint | None = None,
+) -> int:
     # 确保输出目录存在
-    CSV_BASE_DIR.mkdir(parents=True, exist_ok=True)
+    get_path("csv_dir").mkdir(parents=True, exist_ok=True)
     get_path("summary_dir").mkdir(parents=True, exist_ok=True)
 
     try:
-        return asyncio.run(_run_async(target_date, symbols))
-    except Exception as e:
-        # 写入异常调试包
-        write_bundle(DebugBundle(
-            target_date=target_date,
-            stage="exception",
-            is_trading_day=None,
-            total_symbols=0,
-            success_count=0,
-            missing_count=0,
-            failed_count=0,
-            first_error={"type": "exception", "exception": repr(e)},
-            note="pipeline crashed before producing summary",
-            env=safe_env_snapshot(),
+        if shard is None:
+            return asyncio.run(run_async(target_date, symbols, resume_point=resume_point))
+        # 分片运行写入独立的 SQLite 文件
+        shard_db_path = shard.db_path(target_date)
+        shard_db_path.parent.mkdir(parents=True, exist_ok=True)
+        return asyncio.run(run_async(
+            target_date, symbols, db_path=str(shard_db_path), shard=shard, resume_point=resume_point,
         ))
-
-        # 写入跳过汇总并抛出异常
-        _write_skip_summary(target_date, reason=f"exception:{type(e).__name__}:{e}")
+    except Exception as e:
+        # 写入异常调试包与跳过汇总后抛出异常
+        record_crash(target_date, e, shard)
         raise
 
 
-# 收盘后执行采集
-def run_after_close(target_date: str) -> int:
-    # 非交易日直接写入跳过汇总
-    if not is_calendar_trading_day(target_date):
-        _write_skip_summary(
-            target_date,
-            reason="non_trading_day",
-        )
+# 记录采集异常：写入异常调试包与跳过汇总
+def record_crash(target_date: str, error: Exception, shard: Shard | None = None) -> None:
+    write_bundle(DebugBundle(
+        target_date=target_date,
+        stage=_stage("exception", shard),
+        is_trading_day=None,
+        total_symbols=0,
+        success_count=0,
+        missing_count=0,
+        failed_count=0,
+        first_error={"type": "exception", "exception": repr(error)},
+        note="pipeline crashed before producing summary",
+        env=safe_env_snapshot(),
+    ))
+    _write_skip_summary(target_date, reason=f"exception:{type(error).__name__}:{error}", shard=shard)
+
+
+# 读取续跑进度（无日志时返回 None，按全新运行处理）
+def _load_resume_point(target_date: str, shard: Shard | None) -> ResumePoint | None:
+    log = logging.getLogger(__name__)
+    path = journal.journal_path(target_date, shard.tag if shard else "")
+    with tracing.span("journal_load") as span:
+        point = journal.load(path)
+        span.items = point.records if point else 0
+    if point is None:
+        log.warning("no journal at %s, running %s from scratch", path, target_date)
+        return None
+    log.info(
+        "resuming %s from %s: outcomes=%s pending=%s finished=%s",
+        target_date, path, point.records, len(point.pending), point.finished,
+    )
+    return point
+
+
+# 收盘后执行采集（resume 为真时从运行日志续跑中断的采集）
+def run_after_close(target_date: str, shard: Shard | None = None, resume: bool = False) -> int:
+    tracer = tracing.start_run(target_date, shard.tag if shard else "")
+    try:
+        # 非交易日直接写入跳过汇总
+        with tracing.span("calendar"):
+            is_trading_day = is_calendar_trading_day(target_date)
+        if not is_trading_day:
+            _write_skip_summary(
+                target_date,
+                reason="non_trading_day",
+                shard=shard,
+            )
+            return 0
+
+        # 续跑时股票池、计数与待采集队列均取自运行日志
+        resume_point = _load_resume_point(target_date, shard) if resume else None
+        if resume_point is not None:
+            if resume_point.finished:
+                logging.getLogger(__name__).info("%s already finished, nothing to resume", target_date)
+                return 0
+            return run_collection(target_date, resume_point.symbols, shard=shard, resume_point=resume_point)
+
+        # 加载股票池（优先本地快照）并执行采集
+        with tracing.span("universe") as span:
+            symbols = get_tradeable_symbols(target_date)
+            if shard is not None:
+                # 按分片确定性拆分股票池
+                symbols = select_shard(symbols, shard)
+            span.items = len(symbols)
+        return run_collection(target_date, symbols, shard=shard)
+    finally:
+        tracing.export_quietly(tracer)
+
+
+# 合并分片数据库与汇总，并统一发送通知与备份
+def merge_shards(count: int, target_date: str | None = None) -> int:
+    log = logging.getLogger(__name__)
+    target_date = target_date or market_today()
+    tracer = tracing.start_run(target_date, "merge")
+    try:
+        return _merge_shards(count, target_date, log)
+    finally:
+        tracing.export_quietly(tracer)
+
+
+# 整日批量校验（OHLC、涨跌停区间、成交量异常）并汇总标记
+def _validate_day(conn: sqlite3.Connection, trade_date: str) -> dict[str, Any]:
+    st_symbols = load_st_symbols(conn, trade_date)
+    return validator.summarize_flags(validator.validate_day(conn, trade_date, st_symbols))
+
+
+# 合并分片的具体流程
+def _merge_shards(count: int, target_date: str, log: logging.Logger) -> int:
+    schedule = load_yaml(SCHEDULE_CONFIG)
+    start_time = time.time()
+    summaries = load_shard_summaries(target_date, count)
+
+    # 全部分片均跳过时（如非交易日）直接写入跳过汇总
+    skip_reasons = [summary["skip_reason"] for summary in summaries if summary.get("skip_reason")]
+    if len(skip_reasons) == len(summaries):
+        _write_skip_summary(target_date, reason=skip_reasons[0])
         return 0
 
-    # 加载股票池并执行采集
-    symbols = load_tradeable_a_share_symbols(target_date)
-    return run_collection(target_date, symbols)
+    # 单事务合并分片数据库
+    shard_paths = [shard.db_path(target_date) for shard in all_shards(count)]
+    with tracing.span("merge_db", items=count):
+        merged = merge_shard_dbs(default_db_path(), [path for path in shard_paths if path.exists()])
+    log.info("merged shards for %s: %s", target_date, merged)
+
+    # 部分分片异常时汇总不完整，数据合并后报错
+    if skip_reasons:
+        raise RuntimeError(f"SHARD_FAILED: {target_date} reasons={skip_reasons}")
+
+    # 合并计数并生成主汇总
+    combined = combine_shard_summaries(summaries)
+    summary = build_final_summary(
+        target_date,
+        schedule,
+        expected=combined["expected"],
+        success=combined["success"],
+        failed=combined["failed"],
+        missing=combined["missing"],
+        skipped=combined["skipped"],
+        retry_success=combined["retry_success"],
+        duration_seconds=combined["duration_seconds"] + (time.time() - start_time),
+        errors=combined["errors"],
+    )
+    summary["shards"] = count
+    summary["hedge"] = combined["hedge"]
+    summary["retry"] = combined["retry"]
+    summary["raw_archive"] = combined["raw_archive"]
+    summary["metrics"] = metrics.merge_snapshots([item.get("metrics") for item in summaries])
+
+    # 从合并后的状态表读取缺失股票，并在主库补算当日派生字段、整日校验
+    with open_db() as conn:
+        statuses = fetch_statuses(conn, target_date)
+        summary["enrichment"] = post_persist(conn, target_date)
+        summary["validation"] = _validate_day(conn, target_date)
+    missing_symbols = sorted(symbol for symbol, status in statuses.items() if status.status == "missing")
+
+    _publish_summary(target_date, summary, missing_symbols)
+    if summary["level"] in {"ERROR", "CRITICAL"}:
+        return 2
+    return 0
 
 
 # 自动根据市场时区执行采集
-def run() -> int:
-    # 读取调度配置
-    schedule = _load_yaml(SCHEDULE_CONFIG)
-    market_tz = pytz.timezone(schedule["timezone_market"])
-    target_date = datetime.now(market_tz).strftime("%Y-%m-%d")
-    return run_after_close(target_date)
+def run(shard: Shard | None = None, target_date: str | None = None, resume: bool = False) -> int:
+    return run_after_close(target_date or market_today(), shard=shard, resume=resume)
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import statistics
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any
+
+from stock_collector.storage.sqlite_store import default_db_path
+
+# 状态表中视为失败的状态
+FAILED_STATUSES = ("failed", "missing", "api_failed")
+
+
+# 调度参数
+@dataclass
+class SchedulerConfig:
+    # 是否启用历史排序
+    enabled: bool = True
+    # 回看的自然日天数
+    lookback_days: int = 20
+    # 无 DOM 历史时的兜底耗时估计（毫秒）
+    dom_cost_ms: float = 5000.0
+
+    # 从爬虫配置构建
+    @classmethod
+    def from_config(cls, scraper_config: dict[str, Any]) -> SchedulerConfig:
+        section = scraper_config.get("scheduler", {})
+        return cls(
+            enabled=bool(section.get("enabled", cls.enabled)),
+            lookback_days=int(section.get("lookback_days", cls.lookback_days)),
+            dom_cost_ms=float(section.get("dom_cost_ms", cls.dom_cost_ms)),
+        )
+
+
+# 单只股票的历史抓取画像
+@dataclass
+class SymbolHistory:
+    # API 请求次数
+    api_attempts: int = 0
+    # API 失败次数（转入 DOM 兜底）
+    api_failures: int = 0
+    # API 平均耗时（毫秒）
+    api_ms: float | None = None
+    # DOM 平均耗时（毫秒）
+    dom_ms: float | None = None
+    # 有状态记录的天数
+    status_days: int = 0
+    # 状态为失败或缺失的天数
+    status_failures: int = 0
+
+    # 失败概率（取请求记录与状态记录中较大者）
+    @property
+    def failure_rate(self) -> float:
+        api_rate = self.api_failures / self.api_attempts if self.api_attempts else 0.0
+        status_rate = self.status_failures / self.status_days if self.status_days else 0.0
+        return max(api_rate, status_rate)
+
+    # 预计耗时 = API 耗时 + 失败概率 × DOM 兜底耗时
+    def expected_ms(self, dom_cost_ms: float) -> float:
+        return (self.api_ms or 0.0) + self.failure_rate * (self.dom_ms or dom_cost_ms)
+
+
+# 读取回看窗口内各股票的抓取历史
+def load_history(conn: sqlite3.Connection, trade_date: str, lookback_days: int) -> dict[str, SymbolHistory]:
+    start = (date.fromisoformat(trade_date) - timedelta(days=lookback_days)).isoformat()
+    history: dict[str, SymbolHistory] = {}
+    rows = conn.execute(
+        """
+        SELECT symbol,
+               SUM(source = 'api'),
+               SUM(source = 'api' AND outcome = 'api_failed'),
+               AVG(CASE WHEN source = 'api' THEN latency_ms END),
+               AVG(CASE WHEN source = 'dom' THEN latency_ms END)
+        FROM fetch_timing
+        WHERE trade_date >= ? AND trade_date < ?
+        GROUP BY symbol
+        """,
+        (start, trade_date),
+    )
+    for symbol, attempts, failures, api_ms, dom_ms in rows:
+        history[symbol] = SymbolHistory(
+            api_attempts=attempts or 0,
+            api_failures=failures or 0,
+            api_ms=api_ms,
+            dom_ms=dom_ms,
+        )
+
+    placeholders = ", ".join("?" for _ in FAILED_STATUSES)
+    rows = conn.execute(
+        f"""
+        SELECT symbol, COUNT(*), SUM(status IN ({placeholders}))
+        FROM daily_collect_status
+        WHERE trade_date >= ? AND trade_date < ?
+        GROUP BY symbol
+        """,
+        (*FAILED_STATUSES, start, trade_date),
+    )
+    for symbol, days, failures in rows:
+        item = history.setdefault(symbol, SymbolHistory())
+        item.status_days = days
+        item.status_failures = failures or 0
+    return history
+
+
+# 按预计耗时降序排列待采集股票，让慢且易失败的股票先发出，缩短整体尾部
+def order_symbols(
+    symbols: list[str],
+    trade_date: str,
+    config: SchedulerConfig,
+    db_path: str | None = None,
+) -> list[str]:
+    log = logging.getLogger(__name__)
+    path = Path(db_path or default_db_path())
+    if not config.enabled or not path.exists():
+        return list(symbols)
+
+    try:
+        with sqlite3.connect(path) as conn:
+            history = load_history(conn, trade_date, config.lookback_days)
+    except sqlite3.Error as exc:
+        # 历史库异常不影响采集，保持原顺序
+        log.warning("读取抓取历史失败，保持原顺序: %s", exc)
+        return list(symbols)
+    if not history:
+        return list(symbols)
+
+    # DOM 兜底耗时优先使用全市场历史中位数
+    dom_samples = [item.dom_ms for item in history.values() if item.dom_ms is not None]
+    dom_cost_ms = statistics.median(dom_samples) if dom_samples else config.dom_cost_ms
+    costs = {symbol: item.expected_ms(dom_cost_ms) for symbol, item in history.items()}
+    # 无历史的股票（新上市等）按中位数估计
+    default_cost = statistics.median(costs.values())
+    known = sum(1 for symbol in symbols if symbol in costs)
+    log.info("scheduler history=%s/%s default_cost_ms=%.1f", known, len(symbols), default_cost)
+    # sorted 为稳定排序，耗时相同的股票保持原顺序
+    return sorted(symbols, key=lambda symbol: costs.get(symbol, default_cost), reverse=True)
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from stock_collector.config.settings import get_path
+from stock_collector.storage.sqlite_store import init_db
+
+# 需要合并的数据表
+MERGE_TABLES = ("daily_bar", "daily_collect_status", "fetch_timing")
+# 汇总中可直接累加的计数字段
+SUMMARY_COUNT_KEYS = ("expected", "success", "failed", "missing", "skipped", "retry_success")
+
+
+# 分片标识（index 从 0 开始）
+@dataclass(frozen=True)
+class Shard:
+    # 分片序号
+    index: int
+    # 分片总数
+    count: int
+
+    # 分片文件名标签
+    @property
+    def tag(self) -> str:
+        return f"{self.index}of{self.count}"
+
+    # 分片数据库路径
+    def db_path(self, trade_date: str) -> Path:
+        return get_path("shard_dir") / trade_date / f"stock_daily.{self.tag}.db"
+
+    # 分片汇总路径
+    def summary_path(self, trade_date: str) -> Path:
+        return get_path("shard_dir") / trade_date / f"summary.{self.tag}.json"
+
+
+# 解析 i/N 形式的分片参数
+def parse_shard(spec: str) -> Shard:
+    try:
+        index_text, count_text = spec.split("/", 1)
+        index, count = int(index_text), int(count_text)
+    except ValueError:
+        raise ValueError(f"非法分片参数: {spec}（格式 i/N）")
+    if count <= 0 or not 0 <= index < count:
+        raise ValueError(f"非法分片参数: {spec}（需满足 0 <= i < N）")
+    return Shard(index=index, count=count)
+
+
+# 计算股票所属分片（crc32 与进程、列表顺序无关）
+def shard_of(symbol: str, count: int) -> int:
+    return zlib.crc32(symbol.encode("utf-8")) % count
+
+
+# 按分片筛选股票列表
+def select_shard(symbols: list[str], shard: Shard) -> list[str]:
+    return [symbol for symbol in symbols if shard_of(symbol, shard.count) == shard.index]
+
+
+# 列出指定日期的全部分片
+def all_shards(count: int) -> list[Shard]:
+    return [Shard(index=index, count=count) for index in range(count)]
+
+
+# 读取表字段列表
+def _table_columns(conn: sqlite3.Connection, table: str) -> list[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+# 读取表主键字段（按主键顺序）
+def _primary_keys(conn: sqlite3.Connection, table: str) -> list[str]:
+    rows = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    return [row[1] for row in sorted((row for row in rows if row[5]), key=lambda row: row[5])]
+
+
+# 生成从附加库 upsert 到主库的 SQL
+def _merge_sql(conn: sqlite3.Connection, table: str, alias: str) -> str:
+    columns = _table_columns(conn, table)
+    keys = _primary_keys(conn, table)
+    column_list = ", ".join(columns)
+    updates = ", ".join(f"{column}=excluded.{column}" for column in columns if column not in keys)
+    # WHERE true 用于消除 INSERT ... SELECT ... ON CONFLICT 的语法歧义
+    return (
+        f"INSERT INTO main.{table} ({column_list}) "
+        f"SELECT {column_list} FROM {alias}.{table} WHERE true "
+        f"ON CONFLICT({', '.join(keys)}) DO UPDATE SET {updates}"
+    )
+
+
+# 将分片数据库批量合并进主库（单事务）
+def merge_shard_dbs(db_path: str, shard_paths: list[Path]) -> dict[str, int]:
+    init_db(db_path)
+    for path in shard_paths:
+        # 保证分片库表结构与主库一致
+        init_db(str(path))
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        if len(shard_paths) > limit:
+            raise RuntimeError(f"SHARD_MERGE_TOO_MANY: {len(shard_paths)} > attach limit {limit}")
+
+        # ATTACH 不能在事务内执行，先全部附加
+        aliases = []
+        for idx, path in enumerate(shard_paths):
+            alias = f"shard{idx}"
+            conn.execute(f"ATTACH DATABASE ? AS {alias}", (str(path),))
+            aliases.append(alias)
+
+        merged = {table: 0 for table in MERGE_TABLES}
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for alias in aliases:
+                for table in MERGE_TABLES:
+                    cursor = conn.execute(_merge_sql(conn, table, alias))
+                    merged[table] += cursor.rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        for alias in aliases:
+            conn.execute(f"DETACH DATABASE {alias}")
+        return merged
+    finally:
+        conn.close()
+
+
+# 合并网络与归档统计：计数累加，分位耗时取最大值，列表取并集（按域名的超时不合并）
+def _merge_counters(target: dict[str, Any], source: dict[str, Any]) -> None:
+    for key, value in source.items():
+        if key == "p95_ms":
+            if value is not None:
+                target[key] = max(target.get(key) or 0.0, value)
+        elif isinstance(value, list):
+            target[key] = sorted(set(target.get(key, [])) | set(value))
+        elif isinstance(value, (int, float)):
+            target[key] = target.get(key, 0) + value
+
+
+# 合并分片汇总的计数与错误统计
+def combine_shard_summaries(summaries: list[dict[str, Any]]) -> dict[str, Any]:
+    combined: dict[str, Any] = {key: 0 for key in SUMMARY_COUNT_KEYS}
+    errors: list[str] = []
+    duration_seconds = 0.0
+    network: dict[str, dict[str, Any]] = {"hedge": {}, "retry": {}, "raw_archive": {}}
+    for summary in summaries:
+        for key in SUMMARY_COUNT_KEYS:
+            combined[key] += int(summary.get(key, 0) or 0)
+        # 各分片并行执行，耗时取最大值
+        duration_seconds = max(duration_seconds, float(summary.get("duration_seconds", 0.0) or 0.0))
+        for item in summary.get("top_errors", []):
+            errors.extend([item["error"]] * int(item.get("count", 0)))
+        for key in network:
+            _merge_counters(network[key], summary.get(key) or {})
+    combined["duration_seconds"] = duration_seconds
+    combined["errors"] = errors
+    combined.update(network)
+    return combined
+
+
+# 读取全部分片汇总，缺失时报错
+def load_shard_summaries(trade_date: str, count: int) -> list[dict[str, Any]]:
+    summaries = []
+    missing = []
+    for shard in all_shards(count):
+        path = shard.summary_path(trade_date)
+        if not path.exists():
+            missing.append(shard.tag)
+            continue
+        summaries.append(json.loads(path.read_text(encoding="utf-8")))
+    if missing:
+        raise RuntimeError(f"SHARD_SUMMARY_MISSING: {trade_date} shards={missing}")
+    return summaries
@@ -0,0 +1,476 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
+from functools import partial
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from stock_collector.ops import tracing
+from stock_collector.pipeline.validator import MissingBarError
+from stock_collector.storage.csv_writer import write_symbol_csv
+from stock_collector.storage.schema import CollectStatus, DailyBar, FetchTiming
+from stock_collector.storage.sqlite_store import now_iso
+from stock_collector.storage.writer import write_daily_bar, write_fetch_timing, write_status
+
+# 队列结束标记
+_DONE = object()
+
+
+# 流水线各阶段并发与队列配置
+@dataclass
+class StageConfig:
+    # 阶段间队列容量（背压上限）
+    queue_size: int = 256
+    # API 抓取并发数
+    source_workers: int = 16
+    # 解析并发数
+    parse_workers: int = 1
+    # 校验并发数
+    validate_workers: int = 1
+    # DOM 兜底页面数
+    dom_workers: int = 4
+    # 单次落库的最大批量
+    persist_batch: int = 200
+    # CSV 导出并发数
+    export_workers: int = 4
+    # DOM 单股限速（毫秒）
+    dom_delay_ms: int = 200
+    # DOM 随机抖动（毫秒）
+    dom_jitter_ms: int = 120
+
+    # 从爬虫配置构建
+    @classmethod
+    def from_config(cls, scraper_config: dict[str, Any]) -> StageConfig:
+        known = {item.name for item in fields(cls)}
+        values = {k: v for k, v in scraper_config.get("pipeline", {}).items() if k in known}
+        rate_limit = scraper_config.get("rate_limit", {})
+        values.setdefault("dom_delay_ms", rate_limit.get("per_symbol_delay_ms", 200))
+        values.setdefault("dom_jitter_ms", rate_limit.get("random_jitter_ms", 120))
+        return cls(**values)
+
+
+# 阶段间传递的单只股票数据
+@dataclass
+class StageItem:
+    # 股票代码
+    symbol: str
+    # 数据来源（api / dom）
+    source: str
+    # 原始数据
+    raw: dict | None = None
+    # 解析后的日线
+    bar: DailyBar | None = None
+    # 抓取耗时（毫秒）
+    latency_ms: float | None = None
+
+
+# 单只股票的处理结果
+@dataclass
+class Outcome:
+    # 股票代码
+    symbol: str
+    # 状态（success / missing / api_failed / failed / skipped）
+    status: str
+    # 数据来源（api / dom / existing）
+    source: str = "api"
+    # 成功时的日线
+    bar: DailyBar | None = None
+    # 错误或原因
+    error: str = ""
+    # 重试次数
+    retry_count: int = 0
+    # 抓取耗时（毫秒，None 表示未发起请求）
+    latency_ms: float | None = None
+
+    # api_failed 会转入 DOM 兜底，其余均为终态
+    @property
+    def terminal(self) -> bool:
+        return self.status != "api_failed"
+
+
+# 采集过程中的计数与集合
+@dataclass
+class CollectState:
+    success_count: int = 0
+    missing_count: int = 0
+    failed_count: int = 0
+    retry_success: int = 0
+    first_error: dict | None = None
+    errors: list[str] = field(default_factory=list)
+    success_symbols: set[str] = field(default_factory=set)
+    failed_symbols: set[str] = field(default_factory=set)
+    missing_symbols: set[str] = field(default_factory=set)
+    skipped_symbols: set[str] = field(default_factory=set)
+    failed_event_symbols: set[str] = field(default_factory=set)
+
+    # 标记成功（已采集的股票同样计入）
+    def mark_success(self, symbol: str) -> bool:
+        if symbol in self.success_symbols:
+            return False
+        self.success_count += 1
+        self.success_symbols.add(symbol)
+        return True
+
+    # 记录首个错误
+    def _first_error(self, kind: str, symbol: str, error: str) -> None:
+        if self.first_error is None:
+            self.first_error = {"type": kind, "symbol": symbol, "exception": repr(error)}
+
+    # 记录失败事件（每只股票只计一次）
+    def _failed_event(self, symbol: str) -> None:
+        if symbol not in self.failed_event_symbols:
+            self.failed_count += 1
+            self.failed_event_symbols.add(symbol)
+
+    # 应用处理结果，返回是否需要写入日线
+    def apply(self, outcome: Outcome) -> bool:
+        symbol = outcome.symbol
+        if outcome.status == "success":
+            is_new = self.mark_success(symbol)
+            if is_new and outcome.source == "dom":
+                self.retry_success += 1
+            return is_new and outcome.bar is not None
+        if outcome.status == "skipped":
+            self.skipped_symbols.add(symbol)
+        elif outcome.status == "api_failed":
+            self.errors.append(outcome.error)
+            self._failed_event(symbol)
+            self._first_error("failed", symbol, outcome.error)
+        elif outcome.status == "failed":
+            self._failed_event(symbol)
+            self.failed_symbols.add(symbol)
+            self.errors.append(outcome.error)
+            self._first_error("failed", symbol, outcome.error)
+        elif outcome.status == "missing":
+            if symbol not in self.missing_symbols:
+                self.missing_count += 1
+            self.missing_symbols.add(symbol)
+            self._first_error("missing", symbol, outcome.error)
+        return False
+
+
+# 日线转为 CSV 行
+def csv_row(bar: DailyBar) -> dict:
+    return {
+        "trade_date": bar.trade_date,
+        "symbol": bar.symbol,
+        "open": bar.open,
+        "high": bar.high,
+        "low": bar.low,
+        "close": bar.close,
+        "volume": bar.volume,
+        "amount": bar.amount,
+    }
+
+
+# 流式采集：source → parse → validate → persist → export，阶段间以有界队列连接
+class StreamingCollector:
+    # 初始化各阶段依赖
+    def __init__(
+        self,
+        trade_date: str,
+        conn: sqlite3.Connection,
+        state: CollectState,
+        config: StageConfig,
+        csv_base_dir: Path,
+        fetch_api: Callable[[str, str], dict],
+        fetch_dom: Callable[[Any, str], Awaitable[dict]],
+        open_browser: Callable[[], Awaitable[Any]] | None,
+        build_bar: Callable[[dict], DailyBar],
+        validate_bar: Callable[[DailyBar], None],
+        record_timing: bool = True,
+        on_persisted: Callable[[list[Outcome]], None] | None = None,
+    ) -> None:
+        self.trade_date = trade_date
+        self.conn = conn
+        self.state = state
+        self.config = config
+        self.csv_base_dir = csv_base_dir
+        self.fetch_api = fetch_api
+        self.fetch_dom = fetch_dom
+        self.open_browser = open_browser
+        self.build_bar = build_bar
+        self.validate_bar = validate_bar
+        self.record_timing = record_timing
+        # 每批提交后回调（在落库线程中执行，如写入运行日志）
+        self.on_persisted = on_persisted
+        self.log = logging.getLogger(__name__)
+
+        size = config.queue_size
+        self.symbol_q: asyncio.Queue = asyncio.Queue(size)
+        self.raw_q: asyncio.Queue = asyncio.Queue(size)
+        self.bar_q: asyncio.Queue = asyncio.Queue(size)
+        self.persist_q: asyncio.Queue = asyncio.Queue(size)
+        self.export_q: asyncio.Queue = asyncio.Queue(size)
+        # DOM 队列位于 validate → dom → parse 的环路上，不设上限以免死锁（仅存放失败的股票代码）
+        self.dom_q: asyncio.Queue = asyncio.Queue()
+
+        self._open = 0
+        self._all_terminal = asyncio.Event()
+        # 首个请求发出与最后一条日线落库的时间（epoch 秒）
+        self.first_request_at: float | None = None
+        self.last_stored_at: float | None = None
+        # 转入 DOM 兜底的股票及其 API 失败时间（用于 retry 阶段计时）
+        self._fallback_started: dict[str, float] = {}
+        self._browser = None
+        self._browser_lock = asyncio.Lock()
+        self._pages: list[Any] = []
+        self._api_executor = ThreadPoolExecutor(max_workers=config.source_workers, thread_name_prefix="api")
+        # SQLite 单写线程，连接需以 check_same_thread=False 打开
+        self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="persist")
+        self._export_executor = ThreadPoolExecutor(max_workers=config.export_workers, thread_name_prefix="export")
+
+    # 投递处理结果到落库阶段
+    async def _emit(self, outcome: Outcome) -> None:
+        await self.persist_q.put(outcome)
+
+    # 按来源将异常转换为处理结果
+    async def _fail(self, symbol: str, source: str, exc: Exception, latency_ms: float | None = None) -> None:
+        if source == "api":
+            if isinstance(exc, RuntimeError) and str(exc) == "API_MISSING":
+                await self._emit(Outcome(symbol, "missing", source, error="api_missing", latency_ms=latency_ms))
+                return
+            # API 失败记录状态后立即进入 DOM 兜底
+            await self._emit(Outcome(symbol, "api_failed", source, error=str(exc), latency_ms=latency_ms))
+            self.dom_q.put_nowait(symbol)
+            return
+        if isinstance(exc, MissingBarError):
+            await self._emit(Outcome(symbol, "missing", source, error=str(exc), latency_ms=latency_ms))
+        elif isinstance(exc, RuntimeError) and str(exc) == "STOCK_SUSPENDED":
+            await self._emit(Outcome(symbol, "skipped", source, error="suspended", latency_ms=latency_ms))
+        else:
+            await self._emit(Outcome(symbol, "failed", source, error=str(exc), latency_ms=latency_ms))
+
+    # 记录请求开始时间
+    def _request_started(self) -> float:
+        started = time.time()
+        if self.first_request_at is None:
+            self.first_request_at = started
+        return time.perf_counter()
+
+    # 投递待采集股票
+    async def _feed(self, symbols: list[str]) -> None:
+        for symbol in symbols:
+            await self.symbol_q.put(symbol)
+
+    # source 阶段：API 抓取（阻塞请求在线程池中执行）
+    async def _api_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            symbol = await self.symbol_q.get()
+            begin = time.time()
+            started = self._request_started()
+            try:
+                raw = await loop.run_in_executor(self._api_executor, self.fetch_api, symbol, self.trade_date)
+            except Exception as exc:
+                tracing.mark("api", begin, time.time(), 1)
+                await self._fail(symbol, "api", exc, (time.perf_counter() - started) * 1000)
+                continue
+            tracing.mark("api", begin, time.time(), 1)
+            latency_ms = (time.perf_counter() - started) * 1000
+            await self.raw_q.put(StageItem(symbol, "api", raw=raw, latency_ms=latency_ms))
+
+    # 按需启动浏览器并新建页面（未提供浏览器时兜底抓取不使用页面，如离线重放）
+    async def _new_page(self) -> Any:
+        if self.open_browser is None:
+            return None
+        async with self._browser_lock:
+            if self._browser is None:
+                with tracing.span("browser_launch", items=1):
+                    self._browser = await self.open_browser()
+            page = await self._browser.context.new_page()
+            self._pages.append(page)
+            return page
+
+    # source 阶段：DOM 兜底抓取（与 API 抓取并行）
+    async def _dom_worker(self) -> None:
+        page = None
+        while True:
+            symbol = await self.dom_q.get()
+            if page is None:
+                page = await self._new_page()
+            begin = time.time()
+            started = self._request_started()
+            try:
+                raw = await self.fetch_dom(page, symbol)
+            except Exception as exc:
+                tracing.mark("dom", begin, time.time(), 1)
+                await self._fail(symbol, "dom", exc, (time.perf_counter() - started) * 1000)
+            else:
+                tracing.mark("dom", begin, time.time(), 1)
+                latency_ms = (time.perf_counter() - started) * 1000
+                await self.raw_q.put(StageItem(symbol, "dom", raw=raw, latency_ms=latency_ms))
+            # 限速等待
+            delay_ms = self.config.dom_delay_ms + random.randint(0, self.config.dom_jitter_ms)
+            await asyncio.sleep(delay_ms / 1000)
+
+    # parse 阶段：原始数据转为 DailyBar
+    async def _parse_worker(self) -> None:
+        while True:
+            item = await self.raw_q.get()
+            try:
+                item.bar = self.build_bar(item.raw)
+            except Exception as exc:
+                await self._fail(item.symbol, item.source, exc, item.latency_ms)
+                continue
+            await self.bar_q.put(item)
+
+    # validate 阶段：校验通过即视为成功
+    async def _validate_worker(self) -> None:
+        while True:
+            item = await self.bar_q.get()
+            try:
+                self.validate_bar(item.bar)
+            except Exception as exc:
+                await self._fail(item.symbol, item.source, exc, item.latency_ms)
+                continue
+            await self._emit(Outcome(item.symbol, "success", item.source, bar=item.bar, latency_ms=item.latency_ms))
+
+    # 在落库线程中批量写入并提交
+    def _write_batch(self, writes: list[tuple[Outcome, bool]]) -> None:
+        for outcome, write_bar in writes:
+            if write_bar:
+                write_daily_bar(self.conn, outcome.bar)
+            write_status(self.conn, CollectStatus(
+                trade_date=self.trade_date,
+                symbol=outcome.symbol,
+                status=outcome.status,
+                retry_count=outcome.retry_count,
+                last_error=outcome.error,
+                updated_at=now_iso(),
+            ))
+            if self.record_timing and outcome.latency_ms is not None:
+                write_fetch_timing(self.conn, FetchTiming(
+                    trade_date=self.trade_date,
+                    symbol=outcome.symbol,
+                    source=outcome.source,
+                    latency_ms=outcome.latency_ms,
+                    outcome=outcome.status,
+                    updated_at=now_iso(),
+                ))
+        self.conn.commit()
+        if self.on_persisted is not None:
+            self.on_persisted([outcome for outcome, _ in writes])
+
+    # persist 阶段：单写者批量落库，终态结果转交导出
+    async def _persist_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        finished = False
+        while not finished:
+            first = await self.persist_q.get()
+            if first is _DONE:
+                break
+            batch = [first]
+            # 取走队列中已就绪的结果合并为一批
+            while len(batch) < self.config.persist_batch:
+                try:
+                    item = self.persist_q.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is _DONE:
+                    finished = True
+                    break
+                batch.append(item)
+
+            writes = [(outcome, self.state.apply(outcome)) for outcome in batch]
+            begin = time.time()
+            await loop.run_in_executor(self._db_executor, self._write_batch, writes)
+            stored_at = time.time()
+            tracing.mark("persist", begin, stored_at, len(writes))
+            if any(bar_written for _, bar_written in writes):
+                self.last_stored_at = stored_at
+            for outcome, bar_written in writes:
+                if not outcome.terminal:
+                    self._fallback_started.setdefault(outcome.symbol, stored_at)
+                    continue
+                if outcome.symbol in self._fallback_started:
+                    # retry 阶段：API 失败到兜底得出终态
+                    tracing.mark("retry", self._fallback_started.pop(outcome.symbol), stored_at, 1)
+                await self.export_q.put((outcome, bar_written))
+                self._open -= 1
+            if self._open <= 0:
+                self._all_terminal.set()
+
+        for _ in range(self.config.export_workers):
+            await self.export_q.put(_DONE)
+
+    # export 阶段：写出单股 CSV
+    async def _export_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self.export_q.get()
+            if item is _DONE:
+                return
+            outcome, bar_written = item
+            if outcome.status == "success":
+                if not bar_written:
+                    continue
+                rows = [csv_row(outcome.bar)]
+            else:
+                rows = []
+            with tracing.span("csv_export", items=1):
+                await loop.run_in_executor(self._export_executor, partial(
+                    write_symbol_csv,
+                    base_dir=self.csv_base_dir,
+                    trade_date=self.trade_date,
+                    symbol=outcome.symbol,
+                    rows=rows,
+                ))
+
+    # 释放浏览器与线程池
+    async def _close(self) -> None:
+        for page in self._pages:
+            await page.close()
+        if self._browser is not None:
+            await self._browser.close()
+        for executor in (self._api_executor, self._db_executor, self._export_executor):
+            executor.shutdown(wait=True)
+
+    # 执行流式采集，直到所有股票都有终态结果
+    async def run(self, symbols: list[str]) -> None:
+        if not symbols:
+            return
+        self._open = len(symbols)
+        config = self.config
+        upstream = [asyncio.create_task(self._feed(symbols))]
+        upstream += [asyncio.create_task(self._api_worker()) for _ in range(config.source_workers)]
+        upstream += [asyncio.create_task(self._dom_worker()) for _ in range(config.dom_workers)]
+        upstream += [asyncio.create_task(self._parse_worker()) for _ in range(config.parse_workers)]
+        upstream += [asyncio.create_task(self._validate_worker()) for _ in range(config.validate_workers)]
+        sink = [asyncio.create_task(self._persist_worker())]
+        sink += [asyncio.create_task(self._export_worker()) for _ in range(config.export_workers)]
+        waiter = asyncio.create_task(self._all_terminal.wait())
+
+        try:
+            # 等待全部终态，期间任一阶段异常退出则中止
+            pending = {waiter, *upstream, *sink}
+            while not self._all_terminal.is_set():
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task is not waiter and task.exception() is not None:
+                        raise task.exception()
+
+            # 上游全部空闲，停止上游并排空落库与导出
+            for task in upstream:
+                task.cancel()
+            await asyncio.gather(*upstream, return_exceptions=True)
+            await self.persist_q.put(_DONE)
+            await asyncio.gather(*sink)
+            self.log.info(
+                "streaming finished for %s: success=%s missing=%s failed=%s",
+                self.trade_date,
+                self.state.success_count,
+                self.state.missing_count,
+                self.state.failed_count,
+            )
+        finally:
+            for task in [waiter, *upstream, *sink]:
+                task.cancel()
+            await asyncio.gather(waiter, *upstream, *sink, return_exceptions=True)
+            await self._close()
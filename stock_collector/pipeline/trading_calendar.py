@@ -1,41 +1,211 @@
 from __future__ import annotations
 
+import logging
+import os
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
 from datetime import date, datetime
-from functools import lru_cache
+from pathlib import Path
 
+from stock_collector.config.settings import get_path
 
-# 获取上交所交易日历（带缓存）
-@lru_cache(maxsize=4)
+# 调度配置路径（读取市场时区）
+SCHEDULE_CONFIG = "stock_collector/config/schedule.yaml"
+# 缓存超过该天数即重新生成（交易所会在年底公布次年休市安排）
+CACHE_MAX_AGE_DAYS = 30
+# 刷新失败或仍不覆盖目标日期时的重试间隔（秒）
+REFRESH_RETRY_SECONDS = 3600
+
+
+# 交易日缓存（YYYYMMDD 整数，升序）
+@dataclass
+class SessionCache:
+    # 日历覆盖的起始日期
+    first_day: int
+    # 日历覆盖的结束日期
+    last_day: int
+    # 交易日列表
+    sessions: array
+    # 缓存生成时间（epoch 秒）
+    generated_at: float
+    # 最近一次加载或尝试刷新的时间（epoch 秒）
+    checked_at: float
+
+    # 缓存是否过期
+    def is_stale(self, day: int | None = None) -> bool:
+        if day is not None and day > self.last_day:
+            return True
+        return time.time() - self.generated_at > CACHE_MAX_AGE_DAYS * 86400
+
+
+# 日期字符串转 YYYYMMDD 整数
+def date_to_int(date_value: str) -> int:
+    d = date.fromisoformat(date_value)
+    return d.year * 10000 + d.month * 100 + d.day
+
+
+# YYYYMMDD 整数转日期字符串
+def _to_str(day: int) -> str:
+    return f"{day // 10000:04d}-{day // 100 % 100:02d}-{day % 100:02d}"
+
+
+# 获取上交所交易日历（仅在重新生成缓存时加载）
 def _get_xshg_calendar():
     import exchange_calendars as xcals
 
     return xcals.get_calendar("XSHG")
 
 
-# 判断指定日期是否为交易日（基于交易日历）
-def is_calendar_trading_day(date_value: str) -> bool:
-    # 获取日历对象
+# 进程内缓存
+_CACHE: SessionCache | None = None
+
+
+# 从 exchange_calendars 生成缓存文件（头部为覆盖区间，随后为交易日，均为小端 int32）
+def _build_cache(path: Path) -> None:
     cal = _get_xshg_calendar()
-    import pandas as pd
-    from datetime import date
+    sessions = cal.sessions
+    days = array("i", (sessions.year * 10000 + sessions.month * 100 + sessions.day).tolist())
+    first = cal.first_session.date()
+    last = cal.last_session.date()
+    data = array("i", [
+        first.year * 10000 + first.month * 100 + first.day,
+        last.year * 10000 + last.month * 100 + last.day,
+    ])
+    data.extend(days)
+    if sys.byteorder == "big":
+        data.byteswap()
 
-    # 解析日期并转换为时间戳
-    d = date.fromisoformat(date_value)
-    ts = pd.Timestamp(d)
+    # 先写临时文件再替换，避免并发读取到半截文件
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with tmp_path.open("wb") as file_handle:
+        data.tofile(file_handle)
+    os.replace(tmp_path, path)
 
-    first = cal.sessions[0].date()
-    last = cal.sessions[-1].date()
 
-    # 过早日期直接报错
-    if d < first:
-        raise RuntimeError(f"DATE_TOO_EARLY: {d}")
+# 读取缓存文件
+def _read_cache(path: Path) -> SessionCache:
+    data = array("i")
+    data.frombytes(path.read_bytes())
+    if sys.byteorder == "big":
+        data.byteswap()
+    if len(data) < 3:
+        raise ValueError(f"交易日缓存损坏: {path}")
+    return SessionCache(
+        first_day=data[0],
+        last_day=data[1],
+        sessions=data[2:],
+        generated_at=path.stat().st_mtime,
+        checked_at=time.time(),
+    )
 
-    # 判断是否为交易日，异常时回退为 True
+
+# 重新生成缓存；失败时回退到已有的旧缓存
+def _refresh(path: Path, current: SessionCache | None) -> SessionCache:
     try:
-        return bool(cal.is_session(ts))
-    except Exception:
+        _build_cache(path)
+    except Exception as exc:
+        if current is None:
+            raise
+        logging.getLogger(__name__).warning("交易日缓存刷新失败，继续使用旧缓存: %s", exc)
+        current.checked_at = time.time()
+        return current
+    return _read_cache(path)
+
+
+# 获取覆盖指定日期的缓存（进程内只读一次，过期或超出覆盖区间时重新生成）
+def _sessions_for(day: int | None = None) -> SessionCache:
+    global _CACHE
+    if _CACHE is None:
+        path = get_path("calendar_cache")
+        cache = _read_cache(path) if path.exists() else None
+        if cache is None or cache.is_stale(day):
+            cache = _refresh(path, cache)
+        _CACHE = cache
+    elif _CACHE.is_stale(day) and time.time() - _CACHE.checked_at > REFRESH_RETRY_SECONDS:
+        # 刷新后仍无法覆盖的日期，间隔一段时间才重试，避免反复加载重型依赖
+        _CACHE = _refresh(get_path("calendar_cache"), _CACHE)
+    return _CACHE
+
+
+# 判断指定日期是否为交易日（基于交易日历）
+def is_calendar_trading_day(date_value: str) -> bool:
+    day = date_to_int(date_value)
+    cache = _sessions_for(day)
+
+    # 过早日期直接报错
+    if day < cache.sessions[0]:
+        raise RuntimeError(f"DATE_TOO_EARLY: {date_value}")
+
+    # 超出日历覆盖范围时无法判断，按交易日处理
+    if day > cache.last_day:
         return True
 
+    idx = bisect_left(cache.sessions, day)
+    return idx < len(cache.sessions) and cache.sessions[idx] == day
+
+
+# 获取指定日期之后的下一个交易日
+def next_session(date_value: str) -> str:
+    day = date_to_int(date_value)
+    cache = _sessions_for(day)
+    idx = bisect_right(cache.sessions, day)
+    if idx >= len(cache.sessions):
+        raise RuntimeError(f"DATE_TOO_LATE: {date_value}")
+    return _to_str(cache.sessions[idx])
+
+
+# 获取指定日期之前的上一个交易日
+def previous_session(date_value: str) -> str:
+    day = date_to_int(date_value)
+    cache = _sessions_for(day)
+    idx = bisect_left(cache.sessions, day)
+    if idx == 0:
+        raise RuntimeError(f"DATE_TOO_EARLY: {date_value}")
+    return _to_str(cache.sessions[idx - 1])
+
+
+# 批量获取各日期的上一个交易日（参数与返回均为 YYYYMMDD 整数数组，早于日历覆盖范围的为 0；NumPy 按需导入）
+def previous_session_days(days):
+    import numpy as np
+
+    days = np.asarray(days, dtype=np.int32)
+    if not len(days):
+        return days
+    sessions = np.frombuffer(_sessions_for(int(days.max())).sessions, dtype=np.int32)
+    idx = np.searchsorted(sessions, days)
+    return np.where(idx > 0, sessions[np.maximum(idx - 1, 0)], 0)
+
+
+# 日期在交易日历中的序号（即此前的交易日个数，相邻交易日相差 1）
+def session_index(date_value: str) -> int:
+    day = date_to_int(date_value)
+    return bisect_left(_sessions_for(day).sessions, day)
+
+
+# 获取闭区间 [start, end] 内的全部交易日
+def sessions_between(start: str, end: str) -> list[str]:
+    start_day = date_to_int(start)
+    end_day = date_to_int(end)
+    cache = _sessions_for(end_day)
+    lo = bisect_left(cache.sessions, start_day)
+    hi = bisect_right(cache.sessions, end_day)
+    return [_to_str(day) for day in cache.sessions[lo:hi]]
+
+
+# 计算市场时区下的当天日期
+def market_today(schedule_path: str = SCHEDULE_CONFIG) -> str:
+    import pytz
+    import yaml
+
+    with open(schedule_path, "r", encoding="utf-8") as file_handle:
+        schedule = yaml.safe_load(file_handle)
+    market_tz = pytz.timezone(schedule["timezone_market"])
+    return datetime.now(market_tz).strftime("%Y-%m-%d")
+
 
 # 判断日期对象是否为交易日
 def is_trading_day(d: date | datetime) -> bool:
@@ -1,5 +1,53 @@
+from __future__ import annotations
+
+import sqlite3
+from collections import Counter
+from typing import Any
+
+import numpy as np
+
+from stock_collector.pipeline.trading_calendar import previous_session, previous_session_days
+from stock_collector.storage.columnar import (
+    BarColumns,
+    align_to,
+    date_ints,
+    fetch_day_columns,
+    fetch_day_derived,
+    fetch_prev_stats,
+    previous_close,
+    previous_trade_day,
+)
 from stock_collector.storage.schema import DailyBar
 
+# 批量校验错误码（按位组合）
+CODE_NON_POSITIVE_PRICE = 1 << 0
+CODE_HIGH_BELOW_LOW = 1 << 1
+CODE_OPEN_OUT_OF_RANGE = 1 << 2
+CODE_CLOSE_OUT_OF_RANGE = 1 << 3
+CODE_NEGATIVE_VOLUME = 1 << 4
+CODE_PRICE_LIMIT = 1 << 5
+CODE_VOLUME_OUTLIER = 1 << 6
+
+# 错误码说明（与 validate_bar 的文案保持一致）
+CODE_MESSAGES = {
+    CODE_NON_POSITIVE_PRICE: "价格必须为正数",
+    CODE_HIGH_BELOW_LOW: "最高价低于最低价",
+    CODE_OPEN_OUT_OF_RANGE: "开盘价不在高低区间",
+    CODE_CLOSE_OUT_OF_RANGE: "收盘价不在高低区间",
+    CODE_NEGATIVE_VOLUME: "成交量为负",
+    CODE_PRICE_LIMIT: "价格超出涨跌停区间",
+    CODE_VOLUME_OUTLIER: "成交量异常",
+}
+
+# 涨跌停价按分取整，比较时留出半个最小价位的余量
+PRICE_TICK_TOLERANCE = 0.005
+# 成交量截面稳健 z 分数阈值（约对应 50 倍以上的偏离）
+VOLUME_Z_MAX = 8.0
+# MAD 下限，避免当日成交量分布过于集中时误报
+VOLUME_MAD_FLOOR = 0.25
+# 参与截面统计的最少样本数
+MIN_CROSS_SECTION = 30
+
 
 # 缺失行情数据错误
 class MissingBarError(RuntimeError):
@@ -27,3 +75,122 @@ def validate_bar(bar: DailyBar) -> list[str]:
     if bar.volume < 0:
         errors.append("成交量为负")
     return errors
+
+
+# 按板块确定涨跌幅限制（创业板/科创板 20%，北交所 30%，其余 10%）
+def _board_limit(symbol: str) -> float:
+    code = "".join(ch for ch in symbol if ch.isdigit())
+    if code.startswith(("300", "301", "302", "688", "689")):
+        return 0.20
+    if code.startswith(("4", "8", "92")):
+        return 0.30
+    return 0.10
+
+
+# 计算每只股票的涨跌幅限制（主板 ST 为 5%）
+def price_limit_ratios(symbols: np.ndarray, st_symbols: set[str] | None = None) -> np.ndarray:
+    ratios = np.array([_board_limit(symbol) for symbol in symbols], dtype=np.float64)
+    if st_symbols:
+        is_st = np.isin(symbols, list(st_symbols))
+        ratios[is_st & (ratios == 0.10)] = 0.05
+    return ratios
+
+
+# 按 (股票, 交易日) 排序的日线中每行的前收盘：上一行恰为上一交易日时取其收盘价，
+# 每只股票首行或中间有缺口（缺失、停牌）时为 NaN
+def session_prev_close(columns: BarColumns) -> np.ndarray:
+    adjacent = previous_trade_day(columns) == previous_session_days(date_ints(columns.trade_date))
+    return np.where(adjacent, previous_close(columns), np.nan)
+
+
+# 各股票上一交易日的收盘价（与 symbols 同序，上一交易日无日线为 NaN）
+def fetch_session_prev_close(conn: sqlite3.Connection, trade_date: str, symbols: np.ndarray) -> np.ndarray:
+    previous = fetch_day_columns(conn, previous_session(trade_date))
+    return align_to(previous.symbol, previous.close, symbols)
+
+
+# 批量校验一整天的日线，返回每行的错误码（0 表示通过）
+def validate_bars(
+    columns: BarColumns,
+    prev_close: np.ndarray | None = None,
+    avg_volume: np.ndarray | None = None,
+    limit_ratio: np.ndarray | None = None,
+    volume_z_max: float = VOLUME_Z_MAX,
+) -> np.ndarray:
+    open_p, high, low, close = columns.open, columns.high, columns.low, columns.close
+    volume = columns.volume.astype(np.float64)
+    codes = np.zeros(len(columns), dtype=np.int32)
+
+    # 单行 OHLC 规则（与 validate_bar 等价）
+    codes[(open_p <= 0) | (high <= 0) | (low <= 0) | (close <= 0)] |= CODE_NON_POSITIVE_PRICE
+    codes[high < low] |= CODE_HIGH_BELOW_LOW
+    codes[~((low <= open_p) & (open_p <= high))] |= CODE_OPEN_OUT_OF_RANGE
+    codes[~((low <= close) & (close <= high))] |= CODE_CLOSE_OUT_OF_RANGE
+    codes[volume < 0] |= CODE_NEGATIVE_VOLUME
+
+    # 涨跌停区间：最高/最低价不得越过按昨收计算的涨跌停价（无昨收则跳过）
+    if prev_close is not None:
+        if limit_ratio is None:
+            limit_ratio = price_limit_ratios(columns.symbol)
+        known = prev_close > 0
+        upper = np.round(prev_close * (1 + limit_ratio), 2) + PRICE_TICK_TOLERANCE
+        lower = np.round(prev_close * (1 - limit_ratio), 2) - PRICE_TICK_TOLERANCE
+        codes[known & ((high > upper) | (low < lower))] |= CODE_PRICE_LIMIT
+
+    # 成交量异常：相对自身近期均量的对数比，在全市场截面上做稳健 z 分数
+    if avg_volume is not None:
+        known = (avg_volume > 0) & (volume > 0)
+        if np.count_nonzero(known) >= MIN_CROSS_SECTION:
+            log_ratio = np.log(volume[known] / avg_volume[known])
+            median = np.median(log_ratio)
+            mad = max(np.median(np.abs(log_ratio - median)) * 1.4826, VOLUME_MAD_FLOOR)
+            outlier = np.abs(log_ratio - median) / mad > volume_z_max
+            codes[np.flatnonzero(known)[outlier]] |= CODE_VOLUME_OUTLIER
+    return codes
+
+
+# 将错误码展开为错误说明
+def describe_code(code: int) -> list[str]:
+    return [message for bit, message in CODE_MESSAGES.items() if code & bit]
+
+
+# 从数据库读取整日数据与历史并批量校验，返回存在问题的股票及错误码。
+# 涨跌停以数据源昨收为基准（除权日亦正确），缺失时取上一交易日收盘价，有缺口则跳过；
+# st_symbols 为 ST 股票集合（主板 ST 按 5% 限制）
+def validate_day(
+    conn: sqlite3.Connection,
+    trade_date: str,
+    st_symbols: set[str] | None = None,
+) -> dict[str, int]:
+    columns, derived = fetch_day_derived(conn, trade_date)
+    if not len(columns):
+        return {}
+    _, avg_volume = fetch_prev_stats(conn, trade_date, columns.symbol)
+    prev_close = np.where(
+        np.nan_to_num(derived.pre_close) > 0,
+        derived.pre_close,
+        fetch_session_prev_close(conn, trade_date, columns.symbol),
+    )
+    codes = validate_bars(
+        columns,
+        prev_close=prev_close,
+        avg_volume=avg_volume,
+        limit_ratio=price_limit_ratios(columns.symbol, st_symbols),
+    )
+    flagged = np.flatnonzero(codes)
+    return {str(columns.symbol[i]): int(codes[i]) for i in flagged}
+
+
+# 汇总批量校验结果（写入 summary）
+def summarize_flags(flagged: dict[str, int], limit: int = 20) -> dict[str, Any]:
+    by_rule: Counter = Counter()
+    for code in flagged.values():
+        by_rule.update(describe_code(code))
+    return {
+        "flagged": len(flagged),
+        "by_rule": dict(by_rule),
+        "symbols": [
+            {"symbol": symbol, "errors": describe_code(code)}
+            for symbol, code in sorted(flagged.items())[:limit]
+        ],
+    }
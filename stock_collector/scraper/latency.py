@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from collections import deque
+from threading import Lock
+
+
+# 滑动窗口内的请求耗时统计（线程安全）
+class LatencyWindow:
+    # 初始化窗口
+    def __init__(self, size: int = 512, min_samples: int = 20) -> None:
+        self.min_samples = min_samples
+        self._samples: deque[float] = deque(maxlen=size)
+        self._lock = Lock()
+
+    # 记录一次耗时（毫秒）
+    def record(self, latency_ms: float) -> None:
+        with self._lock:
+            self._samples.append(latency_ms)
+
+    # 样本数量
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    # 计算分位数，样本不足时返回 None
+    def quantile(self, q: float) -> float | None:
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+        return ordered[index]
+
+    # 清空窗口
+    def clear(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+
+# 按域名分别维护的耗时窗口
+class HostLatency:
+    # 初始化
+    def __init__(self, size: int = 512, min_samples: int = 20) -> None:
+        self.size = size
+        self.min_samples = min_samples
+        self._windows: dict[str, LatencyWindow] = {}
+        self._lock = Lock()
+
+    # 获取域名对应的窗口（不存在时创建）
+    def window(self, host: str) -> LatencyWindow:
+        with self._lock:
+            window = self._windows.get(host)
+            if window is None:
+                window = LatencyWindow(self.size, self.min_samples)
+                self._windows[host] = window
+            return window
+
+    # 记录一次耗时（毫秒）
+    def record(self, host: str, latency_ms: float) -> None:
+        self.window(host).record(latency_ms)
@@ -1,71 +1,41 @@
-import re
+import json
+import time
 from datetime import datetime
 
 from stock_collector.config.settings import get_url
+from stock_collector.ops import metrics
+from stock_collector.scraper.parsers import clean_text, parse_quote_extract
+from stock_collector.storage import raw_archive
 
 
 # 新浪行情页面解析器
 class SinaQuotePage:
-    # 页面 URL 模板
-    URL_TMPL = get_url("sina_quote_page")
-
     # 初始化页面对象
     def __init__(self, page):
         self.page = page
 
     # 打开行情页面
     async def open(self, symbol: str):
-        url = self.URL_TMPL.format(symbol=symbol)
-        await self.page.goto(url, wait_until="networkidle")
-
-    # 清洗文本中的特殊字符
-    @staticmethod
-    def _clean(text: str) -> str:
-        return (
-            text.replace("\xa0", "")
-            .replace("：", "")
-            .replace(":", "")
-            .strip()
-        )
-
-    # 解析字符串数值（包含中文单位）
-    @staticmethod
-    def _parse_num(text: str) -> float:
-        if not text:
-            return 0.0
-
-        t = text.strip()
-
-        # 处理“万手”单位
-        if "万手" in t:
-            num = float(re.findall(r"[\d.]+", t)[0])
-            return num * 10000 * 100
-
-        # 处理“手”单位
-        if t.endswith("手"):
-            num = float(re.findall(r"[\d.]+", t)[0])
-            return num * 100
-
-        # 处理百分比
-        if "%" in t:
-            return float(t.replace("%", ""))
-
-        # 处理普通数值
-        return float(re.findall(r"[-\d.]+", t)[0])
+        url = get_url("sina_quote_page").format(symbol=symbol)
+        started = time.perf_counter()
+        try:
+            response = await self.page.goto(url, wait_until="networkidle")
+        except Exception as exc:
+            metrics.record("http_page", (time.perf_counter() - started) * 1000, metrics.classify_exception(exc))
+            raise
+        status = response.status if response is not None else 200
+        metrics.record("http_page", (time.perf_counter() - started) * 1000, "ok" if status < 400 else f"http_{status}")
 
     # 判断是否停牌
     async def is_suspended(self) -> bool:
         return await self.page.locator("#closed").count() > 0
 
-    # 读取价格块数据
+    # 读取价格块原始文本
     async def read_price_block(self) -> dict:
-        close_price = float(self._clean(await self.page.locator("#price").inner_text()))
-        change_val = self._parse_num(await self.page.locator("#change").inner_text())
-        change_pct = self._parse_num(await self.page.locator("#changeP").inner_text())
         return {
-            "close": close_price,
-            "change": change_val,
-            "change_pct": change_pct,
+            "price": await self.page.locator("#price").inner_text(),
+            "change": await self.page.locator("#change").inner_text(),
+            "change_pct": await self.page.locator("#changeP").inner_text(),
         }
 
     # 读取详情表格的键值对
@@ -81,36 +51,21 @@ class SinaQuotePage:
             tds = row.locator("td")
             n = min(await ths.count(), await tds.count())
             for j in range(n):
-                k = self._clean(await ths.nth(j).inner_text())
-                v = self._clean(await tds.nth(j).inner_text())
+                k = clean_text(await ths.nth(j).inner_text())
+                v = clean_text(await tds.nth(j).inner_text())
                 kv[k] = v
         return kv
 
-    # 汇总为日线数据字典
-    async def to_daily_bar(self, symbol: str) -> dict:
-        # 停牌直接抛错
-        if await self.is_suspended():
-            raise RuntimeError("STOCK_SUSPENDED")
-
-        # 读取价格和详情信息
-        price = await self.read_price_block()
-        kv = await self.read_details_table()
-
-        # 使用当前日期作为交易日
-        trade_date = datetime.now().strftime("%Y-%m-%d")
+    # 提取页面原始文本（停牌页只标记停牌），观测日期取当前日期
+    async def extract(self) -> dict:
+        extract = {"trade_date": datetime.now().strftime("%Y-%m-%d"), "suspended": await self.is_suspended()}
+        if not extract["suspended"]:
+            extract.update(await self.read_price_block())
+            extract["details"] = await self.read_details_table()
+        return extract
 
-        # 组装日线数据
-        return {
-            "symbol": symbol,
-            "trade_date": trade_date,
-            "open": self._parse_num(kv.get("开", "0")),
-            "high": self._parse_num(kv.get("高", "0")),
-            "low": self._parse_num(kv.get("低", "0")),
-            "close": price["close"],
-            "change": price["change"],
-            "change_pct": price["change_pct"],
-            "volume": int(self._parse_num(kv.get("成交量", "0"))),
-            "amplitude_pct": self._parse_num(kv.get("振幅", "0")),
-            "turnover_pct": self._parse_num(kv.get("换手率", "0")),
-            "source": "sina_dom",
-        }
+    # 汇总为日线数据字典（提取结果写入原始归档后再解析）
+    async def to_daily_bar(self, symbol: str) -> dict:
+        extract = await self.extract()
+        raw_archive.append("dom", symbol, json.dumps(extract, ensure_ascii=False))
+        return parse_quote_extract(extract, symbol)
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Any
+
+
+# 安全转换为 float
+def safe_float(v) -> float:
+    try:
+        if v is None:
+            return 0.0
+        return float(v)
+    except Exception:
+        return 0.0
+
+
+# 解析 K 线接口 JSON 响应为日线字典（无数据或日期不符时抛出 API_MISSING）
+def parse_kline_json(text: str, symbol: str, trade_date: str) -> dict:
+    data = json.loads(text)
+    return _kline_bar(data, symbol, trade_date, "sina_api")
+
+
+# 解析 JSONP 文本为结构化数据
+def parse_jsonp(text: str) -> Any:
+    # 寻找 JSON 数组边界
+    start = text.find("[")
+    end = text.rfind("]")
+    if start == -1 or end == -1:
+        raise ValueError("无法解析 JSONP 响应")
+    payload = text[start : end + 1]
+    return json.loads(payload)
+
+
+# 解析 K 线 JSONP 响应为日线字典
+def parse_kline_jsonp(text: str, symbol: str, trade_date: str) -> dict:
+    return _kline_bar(parse_jsonp(text), symbol, trade_date, "sina_jsonp")
+
+
+# K 线数组（按日期升序）取目标交易日一条并校验（单日请求即最后一条，多日请求供各日分别解析）
+def _kline_bar(data: Any, symbol: str, trade_date: str, source: str) -> dict:
+    if not data:
+        raise RuntimeError("API_MISSING")
+
+    bar = next((row for row in reversed(data) if row.get("day") == trade_date), None)
+    if bar is None:
+        raise RuntimeError("API_MISSING")
+    day = bar["day"]
+
+    # 校验关键字段
+    for k in ("open", "high", "low", "close", "volume"):
+        if k not in bar or bar[k] in (None, "", "--"):
+            raise RuntimeError("API_MISSING")
+
+    open_p = float(bar["open"])
+    close_p = float(bar["close"])
+
+    # 返回结构化日线数据
+    return {
+        "symbol": symbol,
+        "trade_date": day,
+        "open": open_p,
+        "high": float(bar["high"]),
+        "low": float(bar["low"]),
+        "close": close_p,
+        "volume": int(float(bar["volume"])),
+        "amount": safe_float(bar.get("amount")),
+        "pre_close": safe_float(bar.get("preclose")),
+        "change": close_p - open_p,
+        "change_pct": (close_p - open_p) / open_p * 100 if open_p else 0.0,
+        "source": source,
+    }
+
+
+# 清洗文本中的特殊字符
+def clean_text(text: str) -> str:
+    return (
+        text.replace("\xa0", "")
+        .replace("：", "")
+        .replace(":", "")
+        .strip()
+    )
+
+
+# 解析字符串数值（包含中文单位）
+def parse_num(text: str) -> float:
+    if not text:
+        return 0.0
+
+    t = text.strip()
+
+    # 处理“万手”单位
+    if "万手" in t:
+        num = float(re.findall(r"[\d.]+", t)[0])
+        return num * 10000 * 100
+
+    # 处理“手”单位
+    if t.endswith("手"):
+        num = float(re.findall(r"[\d.]+", t)[0])
+        return num * 100
+
+    # 处理百分比
+    if "%" in t:
+        return float(t.replace("%", ""))
+
+    # 处理普通数值
+    return float(re.findall(r"[-\d.]+", t)[0])
+
+
+# 解析行情页提取结果为日线字典（提取结果见 SinaQuotePage.extract）
+def parse_quote_extract(extract: dict[str, Any], symbol: str) -> dict:
+    # 停牌直接抛错
+    if extract.get("suspended"):
+        raise RuntimeError("STOCK_SUSPENDED")
+
+    kv = extract.get("details", {})
+    close_p = float(clean_text(extract["price"]))
+    change = parse_num(extract["change"])
+    return {
+        "symbol": symbol,
+        "trade_date": extract["trade_date"],
+        "open": parse_num(kv.get("开", "0")),
+        "high": parse_num(kv.get("高", "0")),
+        "low": parse_num(kv.get("低", "0")),
+        "close": close_p,
+        # 行情页涨跌额以昨收为基准，反推昨收
+        "pre_close": round(close_p - change, 3),
+        "change": change,
+        "change_pct": parse_num(extract["change_pct"]),
+        "volume": int(parse_num(kv.get("成交量", "0"))),
+        "amplitude_pct": parse_num(kv.get("振幅", "0")),
+        "turnover_pct": parse_num(kv.get("换手率", "0")),
+        "source": "sina_dom",
+    }
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, fields
+from threading import Lock
+from typing import Any
+
+from stock_collector.scraper.latency import LatencyWindow
+
+
+# 重试与超时配置
+@dataclass
+class RetryConfig:
+    # 单次请求最多尝试次数（含首次）
+    max_attempts: int = 3
+    # 退避基数（毫秒）
+    backoff_base_ms: float = 200.0
+    # 退避上限（毫秒）
+    backoff_cap_ms: float = 3000.0
+    # 全程重试次数占请求数的上限（百分比）
+    budget_pct: float = 10.0
+    # 预算之外保底允许的重试次数（运行初期请求数少时使用）
+    min_retries: int = 20
+    # 连续失败达到该次数的域名不再重试
+    hopeless_after: int = 20
+    # 连接超时 = 新建连接（TCP + TLS 握手）中位耗时 × 倍数，限定在上下限之间（秒）
+    connect_multiplier: float = 3.0
+    connect_timeout_min: float = 1.0
+    connect_timeout_max: float = 5.0
+    # 计算连接超时所需的最少建连样本数（连接池复用连接，新建连接远少于请求数）
+    connect_min_samples: int = 5
+    # 读取超时 = p99 响应耗时 × 倍数，限定在上下限之间（秒）
+    read_multiplier: float = 2.0
+    read_timeout_min: float = 2.0
+    read_timeout_max: float = 10.0
+
+    # 从爬虫配置构建
+    @classmethod
+    def from_config(cls, scraper_config: dict[str, Any]) -> RetryConfig:
+        known = {item.name for item in fields(cls)}
+        return cls(**{k: v for k, v in scraper_config.get("retry", {}).items() if k in known})
+
+
+# 限定取值范围
+def _clamp(value: float, lower: float, upper: float) -> float:
+    return min(upper, max(lower, value))
+
+
+# 按域名的建连耗时与响应耗时分布分别计算 (连接超时, 读取超时)，各自样本不足时使用对应上限
+def adaptive_timeouts(window: LatencyWindow, connect_window: LatencyWindow, config: RetryConfig) -> tuple[float, float]:
+    connect_ms = connect_window.quantile(0.5)
+    p99_ms = window.quantile(0.99)
+    connect = config.connect_timeout_max
+    if connect_ms is not None:
+        connect = _clamp(connect_ms * config.connect_multiplier / 1000, config.connect_timeout_min, config.connect_timeout_max)
+    read = config.read_timeout_max
+    if p99_ms is not None:
+        read = _clamp(p99_ms * config.read_multiplier / 1000, config.read_timeout_min, config.read_timeout_max)
+    return connect, read
+
+
+# 指数退避（全抖动），attempt 从 1 开始，返回秒
+def backoff_delay(attempt: int, config: RetryConfig) -> float:
+    ceiling = min(config.backoff_cap_ms, config.backoff_base_ms * 2 ** (attempt - 1))
+    return random.uniform(0, ceiling) / 1000
+
+
+# 全程重试预算与域名健康度（线程安全）
+class RetryBudget:
+    # 初始化预算
+    def __init__(self, config: RetryConfig) -> None:
+        self.config = config
+        self._lock = Lock()
+        self._failures: dict[str, int] = {}
+        self._hopeless: set[str] = set()
+        self.stats = {
+            "requests": 0,
+            "retries": 0,
+            "retry_denied": 0,
+            "connect_errors": 0,
+            "read_timeouts": 0,
+            "http_errors": 0,
+        }
+
+    # 记录一次新请求（扩大预算）
+    def record_request(self) -> None:
+        with self._lock:
+            self.stats["requests"] += 1
+
+    # 记录一次失败
+    def record_failure(self, host: str, kind: str) -> None:
+        with self._lock:
+            self.stats[kind] += 1
+            self._failures[host] = self._failures.get(host, 0) + 1
+            if self._failures[host] >= self.config.hopeless_after:
+                self._hopeless.add(host)
+
+    # 记录一次成功（域名恢复）
+    def record_success(self, host: str) -> None:
+        with self._lock:
+            self._failures[host] = 0
+            self._hopeless.discard(host)
+
+    # 申请一次重试：域名已判定无望或预算耗尽时拒绝
+    def try_acquire(self, host: str) -> bool:
+        with self._lock:
+            allowed = self.stats["requests"] * self.config.budget_pct / 100 + self.config.min_retries
+            if host in self._hopeless or self.stats["retries"] >= allowed:
+                self.stats["retry_denied"] += 1
+                return False
+            self.stats["retries"] += 1
+            return True
+
+    # 汇总统计
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            payload: dict[str, Any] = dict(self.stats)
+            payload["hopeless_hosts"] = sorted(self._hopeless)
+        return payload
@@ -1,16 +1,117 @@
+from __future__ import annotations
+
 import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 from threading import Lock
+from typing import Any, Callable
+from urllib.parse import urlsplit
 
 import requests
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 
 from stock_collector.config.settings import get_url
-from stock_collector.ops.debug_bundle import DEBUG_DIR
+from stock_collector.ops import metrics
+from stock_collector.ops.debug_bundle import debug_dir
+from stock_collector.scraper.latency import HostLatency, LatencyWindow
+from stock_collector.scraper.parsers import parse_kline_json
+from stock_collector.scraper.retry import RetryBudget, RetryConfig, adaptive_timeouts, backoff_delay
+from stock_collector.storage import raw_archive
 
 # 全局 Session 缓存
 _SESSION = None
 _SESSION_LOCK = Lock()
 
 
+# 对冲请求配置
+@dataclass
+class HedgeConfig:
+    # 是否启用对冲
+    enabled: bool = False
+    # 触发对冲的耗时分位数
+    quantile: float = 0.95
+    # 对冲延迟下限（毫秒），避免分位数过低时大量重复请求
+    min_delay_ms: float = 200.0
+    # 对冲请求占总请求数的上限（百分比）
+    budget_pct: float = 5.0
+    # 对冲请求是否发往备用域名
+    use_alt_host: bool = False
+    # 计算分位数所需的最少样本数
+    min_samples: int = 20
+    # 对冲线程数
+    workers: int = 32
+
+    # 从爬虫配置构建
+    @classmethod
+    def from_config(cls, scraper_config: dict[str, Any]) -> HedgeConfig:
+        section = scraper_config.get("hedge", {})
+        return cls(
+            enabled=bool(section.get("enabled", cls.enabled)),
+            quantile=float(section.get("quantile", cls.quantile)),
+            min_delay_ms=float(section.get("min_delay_ms", cls.min_delay_ms)),
+            budget_pct=float(section.get("budget_pct", cls.budget_pct)),
+            use_alt_host=bool(section.get("use_alt_host", cls.use_alt_host)),
+            min_samples=int(section.get("min_samples", cls.min_samples)),
+            workers=int(section.get("workers", cls.workers)),
+        )
+
+
+# 对冲状态（每次采集前由 configure_hedging 重置）
+_HEDGE = HedgeConfig()
+_LATENCY = LatencyWindow()
+_HEDGE_LOCK = Lock()
+_HEDGE_STATS = {"requests": 0, "hedged": 0, "hedge_wins": 0, "budget_denied": 0}
+_HEDGE_EXECUTOR: ThreadPoolExecutor | None = None
+
+# 重试状态（每次采集前由 configure_retries 重置）
+_RETRY = RetryConfig()
+_RETRY_BUDGET = RetryBudget(_RETRY)
+_HOST_LATENCY = HostLatency()
+_HOST_CONNECT = HostLatency(min_samples=_RETRY.connect_min_samples)
+# 可重试的 HTTP 状态码
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+# 记录新建连接耗时（TCP 连接与 TLS 握手），以 URL 中的域名[:端口] 为键
+def _record_connect(connection: HTTPConnection, started: float) -> None:
+    host = connection.host if connection.port in (None, connection.default_port) else f"{connection.host}:{connection.port}"
+    _HOST_CONNECT.record(host, (time.perf_counter() - started) * 1000)
+
+
+# 计时建连的 HTTP 连接
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self) -> None:
+        started = time.perf_counter()
+        super().connect()
+        _record_connect(self, started)
+
+
+# 计时建连的 HTTPS 连接
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self) -> None:
+        started = time.perf_counter()
+        super().connect()
+        _record_connect(self, started)
+
+
+# 使用计时连接的连接池
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+# 连接池使用计时连接的适配器（连接超时按实测建连耗时计算）
+class _TimedAdapter(requests.adapters.HTTPAdapter):
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _TimedHTTPConnectionPool, "https": _TimedHTTPSConnectionPool}
+
+
 # 获取可复用的 Session
 def _session() -> requests.Session:
     global _SESSION
@@ -22,10 +123,11 @@ def _session() -> requests.Session:
             return _SESSION
         # 初始化 Session 并配置连接池
         s = requests.Session()
-        adapter = requests.adapters.HTTPAdapter(
+        adapter = _TimedAdapter(
             pool_connections=50,
             pool_maxsize=50,
-            max_retries=3,
+            # 重试由 _get_with_retries 统一控制（带退避与全程预算）
+            max_retries=0,
         )
         s.mount("https://", adapter)
         s.mount("http://", adapter)
@@ -33,16 +135,6 @@ def _session() -> requests.Session:
         return _SESSION
 
 
-# 安全转换为 float
-def _safe_float(v) -> float:
-    try:
-        if v is None:
-            return 0.0
-        return float(v)
-    except Exception:
-        return 0.0
-
-
 # 仅记录第一次原始错误响应，便于排查
 def _maybe_write_raw_first_error(
     symbol: str,
@@ -52,11 +144,12 @@ def _maybe_write_raw_first_error(
     exc: Exception,
 ) -> None:
     # 若已存在错误文件则跳过
-    path = DEBUG_DIR / "raw_first_error.json"
+    directory = debug_dir()
+    path = directory / "raw_first_error.json"
     if path.exists():
         return
     # 确保目录存在
-    DEBUG_DIR.mkdir(parents=True, exist_ok=True)
+    directory.mkdir(parents=True, exist_ok=True)
     payload = {
         "symbol": symbol,
         "url": url,
@@ -69,53 +162,216 @@ def _maybe_write_raw_first_error(
     path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
 
 
+# 配置对冲请求并清零统计
+def configure_hedging(config: HedgeConfig) -> None:
+    global _HEDGE, _LATENCY, _HEDGE_EXECUTOR
+    with _HEDGE_LOCK:
+        _HEDGE = config
+        _LATENCY = LatencyWindow(min_samples=config.min_samples)
+        for key in _HEDGE_STATS:
+            _HEDGE_STATS[key] = 0
+        if _HEDGE_EXECUTOR is None and config.enabled:
+            _HEDGE_EXECUTOR = ThreadPoolExecutor(max_workers=config.workers, thread_name_prefix="hedge")
+
+
+# 读取对冲统计
+def hedge_stats() -> dict[str, Any]:
+    with _HEDGE_LOCK:
+        stats: dict[str, Any] = dict(_HEDGE_STATS)
+    stats["p95_ms"] = _LATENCY.quantile(0.95)
+    return stats
+
+
+# 配置重试与超时并清零统计
+def configure_retries(config: RetryConfig) -> None:
+    global _RETRY, _RETRY_BUDGET, _HOST_LATENCY, _HOST_CONNECT
+    _RETRY = config
+    _RETRY_BUDGET = RetryBudget(config)
+    _HOST_LATENCY = HostLatency()
+    _HOST_CONNECT = HostLatency(min_samples=config.connect_min_samples)
+
+
+# 读取重试统计（含各域名当前超时）
+def retry_stats() -> dict[str, Any]:
+    stats = _RETRY_BUDGET.snapshot()
+    stats["timeouts"] = {}
+    for host in (urlsplit(get_url(key)).netloc for key in ("sina_kline_api", "sina_kline_api_alt")):
+        connect, read = adaptive_timeouts(_HOST_LATENCY.window(host), _HOST_CONNECT.window(host), _RETRY)
+        stats["timeouts"][host] = {
+            "connect": round(connect, 3),
+            "read": round(read, 3),
+            "connects": len(_HOST_CONNECT.window(host)),
+        }
+    return stats
+
+
+# 发起 GET 请求：按域名自适应超时，连接与读取失败分别计数，指数退避重试并受全程预算约束
+# 返回 (响应, 指标来源, 最后一次请求耗时毫秒)；失败的尝试交给 record 计入指标
+def _get_with_retries(
+    s: requests.Session,
+    url: str,
+    params: dict,
+    record: Callable[[str, float, str], None] = metrics.record,
+) -> tuple[requests.Response, str, float]:
+    host = urlsplit(url).netloc
+    budget = _RETRY_BUDGET
+    budget.record_request()
+    attempt = 1
+    while True:
+        timeout = adaptive_timeouts(_HOST_LATENCY.window(host), _HOST_CONNECT.window(host), _RETRY)
+        source = "api" if attempt == 1 else "retry"
+        started = time.perf_counter()
+        try:
+            response = s.get(url, params=params, timeout=timeout)
+            if response.status_code in RETRY_STATUS:
+                response.raise_for_status()
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as exc:
+            record(source, (time.perf_counter() - started) * 1000, metrics.classify_exception(exc))
+            if isinstance(exc, requests.HTTPError):
+                kind = "http_errors"
+            elif isinstance(exc, (requests.ConnectTimeout, requests.ConnectionError)):
+                kind = "connect_errors"
+            else:
+                kind = "read_timeouts"
+            budget.record_failure(host, kind)
+            if attempt >= _RETRY.max_attempts or not budget.try_acquire(host):
+                raise
+            time.sleep(backoff_delay(attempt, _RETRY))
+            attempt += 1
+            continue
+        # 以响应头到达耗时更新域名耗时分布（建连耗时由连接池中的计时连接单独记录）
+        _HOST_LATENCY.record(host, response.elapsed.total_seconds() * 1000)
+        budget.record_success(host)
+        return response, source, (time.perf_counter() - started) * 1000
+
+
+# 单次 K 线请求的结果：归档、指标与首次错误响应延后到 commit 写入（对冲时只提交被采用的一次）
+@dataclass
+class _KlineAttempt:
+    symbol: str
+    url: str
+    params: dict
+    # 指标来源与最后一次请求耗时
+    source: str = "api"
+    latency_ms: float = 0.0
+    response: requests.Response | None = None
+    result: Any = None
+    error: Exception | None = None
+    # 失败重试的指标记录 (来源, 耗时, 结果)
+    records: list[tuple[str, float, str]] = field(default_factory=list)
+
+    # 写入归档与指标，返回解析结果或抛出原异常
+    def commit(self) -> Any:
+        for source, latency_ms, outcome in self.records:
+            metrics.record(source, latency_ms, outcome)
+        if self.response is not None:
+            raw_archive.append("api", self.symbol, self.response.text, self.response.status_code)
+            # 传输成功但响应不可用（缺失、解析错误、非重试状态码）同样计入
+            metrics.record(self.source, self.latency_ms, "ok" if self.error is None else metrics.classify_exception(self.error))
+        if self.error is None:
+            return self.result
+        # 记录首次错误响应（重试耗尽时响应挂在异常上）
+        response = self.response if self.response is not None else getattr(self.error, "response", None)
+        _maybe_write_raw_first_error(self.symbol, self.url, self.params, response, self.error)
+        raise self.error
+
+
+# 请求单只股票最近 datalen 根日 K 线并以 parse 解析（不抛出异常，结果待提交）
+def _attempt_kline(url: str, symbol: str, datalen: int, parse: Callable[[str], Any]) -> _KlineAttempt:
+    # 生成请求参数
+    attempt = _KlineAttempt(symbol, url, {"symbol": symbol, "scale": 240, "ma": "no", "datalen": datalen})
+    try:
+        # 发起请求后校验状态码并解析响应
+        attempt.response, attempt.source, attempt.latency_ms = _get_with_retries(
+            _session(), url, attempt.params, lambda *record: attempt.records.append(record)
+        )
+        attempt.response.raise_for_status()
+        attempt.result = parse(attempt.response.text)
+    except Exception as exc:
+        attempt.error = exc
+    return attempt
+
+
+# 请求单只股票最近 datalen 根日 K 线并以 parse 解析
+def _request_kline(url: str, symbol: str, datalen: int, parse: Callable[[str], Any]) -> Any:
+    return _attempt_kline(url, symbol, datalen, parse).commit()
+
+
+# 请求单只股票的日线（结果待提交）
+def _attempt_bar(url: str, symbol: str, trade_date: str) -> _KlineAttempt:
+    return _attempt_kline(url, symbol, 1, lambda text: parse_kline_json(text, symbol, trade_date))
+
+
+# 请求并解析单只股票的日线
+def _request_bar(url: str, symbol: str, trade_date: str) -> dict:
+    return _attempt_bar(url, symbol, trade_date).commit()
+
+
+# 计时执行请求，完成后计入耗时窗口
+def _timed_request(url: str, symbol: str, trade_date: str) -> _KlineAttempt:
+    start = time.perf_counter()
+    try:
+        return _attempt_bar(url, symbol, trade_date)
+    finally:
+        _LATENCY.record((time.perf_counter() - start) * 1000)
+
+
+# 判断响应是否可直接采用（API_MISSING 为确定结果，无需等待对冲请求）
+def _is_valid(future) -> bool:
+    exc = future.result().error
+    return exc is None or (isinstance(exc, RuntimeError) and str(exc) == "API_MISSING")
+
+
+# 在预算内占用一次对冲名额
+def _acquire_hedge() -> bool:
+    with _HEDGE_LOCK:
+        if _HEDGE_STATS["hedged"] + 1 > _HEDGE_STATS["requests"] * _HEDGE.budget_pct / 100:
+            _HEDGE_STATS["budget_denied"] += 1
+            return False
+        _HEDGE_STATS["hedged"] += 1
+        return True
+
+
+# 超过分位耗时仍未返回时发出对冲请求，先得到有效响应者胜出（只有胜出的一次写入归档与指标）
+def _hedged_request(url: str, symbol: str, trade_date: str) -> dict:
+    config = _HEDGE
+    executor = _HEDGE_EXECUTOR
+    with _HEDGE_LOCK:
+        _HEDGE_STATS["requests"] += 1
+    threshold = _LATENCY.quantile(config.quantile)
+    if executor is None or threshold is None:
+        # 样本不足时不对冲
+        return _timed_request(url, symbol, trade_date).commit()
+
+    primary = executor.submit(_timed_request, url, symbol, trade_date)
+    done, _ = wait([primary], timeout=max(threshold, config.min_delay_ms) / 1000)
+    if done or not _acquire_hedge():
+        return primary.result().commit()
+
+    hedge_url = get_url("sina_kline_api_alt") if config.use_alt_host else url
+    hedge = executor.submit(_timed_request, hedge_url, symbol, trade_date)
+    pending = {primary, hedge}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if _is_valid(future):
+                if future is hedge:
+                    with _HEDGE_LOCK:
+                        _HEDGE_STATS["hedge_wins"] += 1
+                # 落后的请求无法中断，完成后结果直接丢弃（不归档、不计入指标）
+                return future.result().commit()
+    # 两次请求均失败时提交主请求并抛出其异常
+    return primary.result().commit()
+
+
 # 通过新浪 API 抓取日线数据
 def fetch_daily_bar_from_sina_api(symbol: str, trade_date: str) -> dict:
-    # 生成请求参数
     url = get_url("sina_kline_api")
-    params = {"symbol": symbol, "scale": 240, "ma": "no", "datalen": 1}
+    if _HEDGE.enabled:
+        return _hedged_request(url, symbol, trade_date)
+    return _request_bar(url, symbol, trade_date)
 
-    s = _session()
-    response = None
-    try:
-        # 发起请求并校验状态码
-        response = s.get(url, params=params, timeout=10)
-        response.raise_for_status()
-
-        # 解析 JSON 响应
-        data = response.json()
-        if not data:
-            raise RuntimeError("API_MISSING")
-
-        bar = data[0]
-        day = bar.get("day")
-        if day != trade_date:
-            raise RuntimeError("API_MISSING")
-
-        # 校验关键字段
-        for k in ("open", "high", "low", "close", "volume"):
-            if k not in bar or bar[k] in (None, "", "--"):
-                raise RuntimeError("API_MISSING")
-
-        open_p = float(bar["open"])
-        close_p = float(bar["close"])
-
-        # 返回结构化日线数据
-        return {
-            "symbol": symbol,
-            "trade_date": day,
-            "open": open_p,
-            "high": float(bar["high"]),
-            "low": float(bar["low"]),
-            "close": close_p,
-            "volume": int(float(bar["volume"])),
-            "amount": _safe_float(bar.get("amount")),
-            "pre_close": _safe_float(bar.get("preclose")),
-            "change": close_p - open_p,
-            "change_pct": (close_p - open_p) / open_p * 100 if open_p else 0.0,
-            "source": "sina_api",
-        }
-    except Exception as exc:
-        # 记录首次错误响应
-        _maybe_write_raw_first_error(symbol, url, params, response, exc)
-        raise
+
+# 一次请求单只股票最近 datalen 根日 K 线，返回原始响应文本（多日补采按股票合并请求，由调用方逐日解析）
+def fetch_kline_text(symbol: str, datalen: int) -> str:
+    return _request_kline(get_url("sina_kline_api"), symbol, datalen, lambda text: text)
@@ -1,4 +1,3 @@
-import json
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Any
@@ -6,6 +5,8 @@ from typing import Any
 from playwright.sync_api import Page
 
 from stock_collector.config.settings import get_url
+from stock_collector.scraper.parsers import parse_jsonp
+from stock_collector.storage import raw_archive
 from stock_collector.storage.schema import DailyBar
 
 
@@ -43,17 +44,6 @@ class SinaMissingError(Exception):
         return f"{self.message} (symbol={self.symbol}, date={self.trade_date}, source={self.source})"
 
 
-# 解析 JSONP 文本为结构化数据
-def _parse_jsonp(text: str) -> Any:
-    # 寻找 JSON 数组边界
-    start = text.find("[")
-    end = text.rfind("]")
-    if start == -1 or end == -1:
-        raise ValueError("无法解析 JSONP 响应")
-    payload = text[start : end + 1]
-    return json.loads(payload)
-
-
 # 转换为 float，失败返回 0
 def _to_float(value: Any) -> float:
     try:
@@ -72,11 +62,9 @@ def _to_int(value: Any) -> int:
 
 # 抓取指定交易日的日线数据
 def fetch_daily_bar(page: Page, symbol: str, trade_date: str) -> DailyBar:
-    # 标准化股票代码
-    symbol_lower = symbol.lower()
     source = "sina"
     # 生成页面 URL
-    url = get_url("sina_quote_page").format(symbol=symbol_lower)
+    url = get_url("sina_quote_page").format(symbol=symbol)
 
     # 加载页面
     try:
@@ -87,7 +75,7 @@ def fetch_daily_bar(page: Page, symbol: str, trade_date: str) -> DailyBar:
     # 拼接 JSONP 接口 URL
     api_url = (
         f"{get_url('sina_kline_jsonp')}"
-        f"/CN_MarketData.getKLineData?symbol={symbol_lower}&scale=240&ma=no&datalen=1"
+        f"/CN_MarketData.getKLineData?symbol={symbol}&scale=240&ma=no&datalen=1"
     )
 
     # 通过接口获取最新日线数据
@@ -101,7 +89,8 @@ def fetch_daily_bar(page: Page, symbol: str, trade_date: str) -> DailyBar:
             """,
             api_url,
         )
-        payload = _parse_jsonp(raw_text)
+        raw_archive.append("jsonp", symbol, raw_text)
+        payload = parse_jsonp(raw_text)
         if not payload:
             raise ValueError("行情数据为空")
         latest = payload[0]
@@ -1,3 +1,6 @@
+import time
+
+from stock_collector.ops import metrics
 from stock_collector.scraper.pages.sina_quote_page import SinaQuotePage
 
 
@@ -5,7 +8,14 @@ from stock_collector.scraper.pages.sina_quote_page import SinaQuotePage
 async def fetch_daily_bar_from_sina_dom(page, symbol: str) -> dict:
     # 初始化页面对象
     po = SinaQuotePage(page)
-    # 打开目标股票页面
+    # 打开目标股票页面（页面加载耗时单独计入 http_page）
     await po.open(symbol)
     # 解析为日线数据
-    return await po.to_daily_bar(symbol)
+    started = time.perf_counter()
+    try:
+        bar = await po.to_daily_bar(symbol)
+    except Exception as exc:
+        metrics.record("dom", (time.perf_counter() - started) * 1000, metrics.classify_exception(exc))
+        raise
+    metrics.record("dom", (time.perf_counter() - started) * 1000, "ok")
+    return bar
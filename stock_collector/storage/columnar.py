@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Iterator
+
+import numpy as np
+
+from stock_collector.storage.schema import DailyBar
+from stock_collector.storage.sqlite_store import FEATURE_COLUMNS
+
+# 列式读取的字段顺序
+BAR_COLUMNS_SQL = "symbol, trade_date, open, high, low, close, volume, amount"
+
+
+# 日线列式数据（每个字段一个 NumPy 数组）
+@dataclass
+class BarColumns:
+    # 股票代码
+    symbol: np.ndarray
+    # 交易日期
+    trade_date: np.ndarray
+    # 开盘价
+    open: np.ndarray
+    # 最高价
+    high: np.ndarray
+    # 最低价
+    low: np.ndarray
+    # 收盘价
+    close: np.ndarray
+    # 成交量
+    volume: np.ndarray
+    # 成交额（缺失为 NaN）
+    amount: np.ndarray
+
+    # 行数
+    def __len__(self) -> int:
+        return len(self.symbol)
+
+    # 由数据库行构建（字段顺序同 BAR_COLUMNS_SQL）
+    @classmethod
+    def from_rows(cls, rows: list[tuple]) -> BarColumns:
+        if not rows:
+            empty = np.empty(0, dtype=np.float64)
+            return cls(
+                symbol=np.empty(0, dtype=str),
+                trade_date=np.empty(0, dtype=str),
+                open=empty,
+                high=empty,
+                low=empty,
+                close=empty,
+                volume=np.empty(0, dtype=np.int64),
+                amount=empty,
+            )
+        symbol, trade_date, open_p, high, low, close, volume, amount = zip(*rows)
+        return cls(
+            symbol=np.array(symbol, dtype=str),
+            trade_date=np.array(trade_date, dtype=str),
+            open=np.array(open_p, dtype=np.float64),
+            high=np.array(high, dtype=np.float64),
+            low=np.array(low, dtype=np.float64),
+            close=np.array(close, dtype=np.float64),
+            volume=np.array(volume, dtype=np.int64),
+            amount=np.array([np.nan if value is None else value for value in amount], dtype=np.float64),
+        )
+
+    # 由 DailyBar 列表构建
+    @classmethod
+    def from_bars(cls, bars: list[DailyBar]) -> BarColumns:
+        return cls.from_rows([
+            (bar.symbol, bar.trade_date, bar.open, bar.high, bar.low, bar.close, bar.volume, bar.amount)
+            for bar in bars
+        ])
+
+
+# 读取指定交易日的全部日线（按股票代码排序）
+def fetch_day_columns(conn: sqlite3.Connection, trade_date: str) -> BarColumns:
+    cursor = conn.execute(
+        f"SELECT {BAR_COLUMNS_SQL} FROM daily_bar WHERE trade_date = ? ORDER BY symbol",
+        (trade_date,),
+    )
+    return BarColumns.from_rows(cursor.fetchall())
+
+
+# 单日派生字段（接口昨收、涨跌额、涨跌幅、振幅、换手率），与 fetch_day_columns 同序
+@dataclass
+class DerivedColumns:
+    # 接口昨收（缺失为 NaN）
+    pre_close: np.ndarray
+    # 涨跌额
+    change: np.ndarray
+    # 涨跌幅
+    change_pct: np.ndarray
+    # 振幅
+    amplitude_pct: np.ndarray
+    # 换手率
+    turnover_pct: np.ndarray
+
+
+# 读取指定交易日的日线及其派生字段（按股票代码排序，symbols 非空时仅读取这些股票）
+def fetch_day_derived(
+    conn: sqlite3.Connection,
+    trade_date: str,
+    symbols: list[str] | None = None,
+) -> tuple[BarColumns, DerivedColumns]:
+    sql = f"SELECT {BAR_COLUMNS_SQL}, pre_close, change, change_pct, amplitude_pct, turnover_pct FROM daily_bar WHERE trade_date = ?"
+    params: list = [trade_date]
+    if symbols:
+        sql += f" AND symbol IN ({', '.join('?' for _ in symbols)})"
+        params.extend(symbols)
+    rows = conn.execute(sql + " ORDER BY symbol", params).fetchall()
+    derived = [
+        np.array([np.nan if row[index] is None else row[index] for row in rows], dtype=np.float64)
+        for index in range(8, 13)
+    ]
+    return BarColumns.from_rows([row[:8] for row in rows]), DerivedColumns(*derived)
+
+
+# 全量历史分块：列式日线与对应的涨跌额、涨跌幅、昨收
+@dataclass
+class HistoryChunk:
+    # 日线列
+    columns: BarColumns
+    # 涨跌额
+    change: np.ndarray
+    # 涨跌幅
+    change_pct: np.ndarray
+    # 数据源昨收（缺失为 NaN）
+    pre_close: np.ndarray
+
+
+# 由数据库行构建历史分块（字段顺序同 BAR_COLUMNS_SQL，末尾为涨跌额、涨跌幅与昨收）
+def _history_chunk(rows: list[tuple]) -> HistoryChunk:
+    return HistoryChunk(
+        columns=BarColumns.from_rows([row[:8] for row in rows]),
+        change=np.array([row[8] for row in rows], dtype=np.float64),
+        change_pct=np.array([row[9] for row in rows], dtype=np.float64),
+        pre_close=np.array([np.nan if row[10] is None else row[10] for row in rows], dtype=np.float64),
+    )
+
+
+# 按 (股票, 交易日) 顺序流式读取全部日线，每块约 chunk_rows 行且同一股票不跨块，内存只与块大小相关
+def iter_history_chunks(conn: sqlite3.Connection, chunk_rows: int) -> Iterator[HistoryChunk]:
+    cursor = conn.execute(f"SELECT {BAR_COLUMNS_SQL}, change, change_pct, pre_close FROM daily_bar ORDER BY symbol, trade_date")
+    carry: list[tuple] = []
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            break
+        rows = carry + rows
+        # 最后一只股票可能尚未读完，留到下一块
+        cut = len(rows)
+        while cut > 0 and rows[cut - 1][0] == rows[-1][0]:
+            cut -= 1
+        carry = rows[cut:]
+        if cut:
+            yield _history_chunk(rows[:cut])
+    if carry:
+        yield _history_chunk(carry)
+
+
+# 按 (股票, 交易日) 排序的日线中每行的前收盘（取同一股票上一行的收盘价，每只股票首行为 NaN）
+def previous_close(columns: BarColumns) -> np.ndarray:
+    prev_close = np.r_[np.nan, columns.close[:-1]]
+    if len(columns):
+        prev_close[group_bounds(columns.symbol)[0]] = np.nan
+    return prev_close
+
+
+# 日期字符串数组转 YYYYMMDD 整数数组
+def date_ints(trade_dates: np.ndarray) -> np.ndarray:
+    return np.char.replace(trade_dates.astype(str), "-", "").astype(np.int32)
+
+
+# 按 (股票, 交易日) 排序的日线中每行上一行的交易日（YYYYMMDD 整数，每只股票首行为 0）
+def previous_trade_day(columns: BarColumns) -> np.ndarray:
+    days = np.r_[0, date_ints(columns.trade_date)[:-1]].astype(np.int32)
+    if len(columns):
+        days[group_bounds(columns.symbol)[0]] = 0
+    return days
+
+
+# 读取单只股票的日线（按交易日升序，可限定闭区间 [start, end]，走主键范围查询）
+def fetch_symbol_columns(
+    conn: sqlite3.Connection,
+    symbol: str,
+    start: str | None = None,
+    end: str | None = None,
+) -> BarColumns:
+    cursor = conn.execute(
+        f"""
+        SELECT {BAR_COLUMNS_SQL} FROM daily_bar
+        WHERE symbol = ? AND trade_date >= ? AND trade_date <= ?
+        ORDER BY trade_date
+        """,
+        (symbol, start or "0000-00-00", end or "9999-99-99"),
+    )
+    return BarColumns.from_rows(cursor.fetchall())
+
+
+# 读取日期闭区间 [start, end] 内部分股票的日线（按股票、交易日排序）
+def fetch_range_columns(conn: sqlite3.Connection, start: str, end: str, symbols: list[str]) -> BarColumns:
+    if not symbols:
+        return BarColumns.from_rows([])
+    cursor = conn.execute(
+        f"""
+        SELECT {BAR_COLUMNS_SQL} FROM daily_bar
+        WHERE symbol IN ({', '.join('?' for _ in symbols)}) AND trade_date >= ? AND trade_date <= ?
+        ORDER BY symbol, trade_date
+        """,
+        (*symbols, start, end),
+    )
+    return BarColumns.from_rows(cursor.fetchall())
+
+
+# 读取单只股票的周线 / 月线（trade_date 为周期内末个交易日，可按其限定闭区间 [start, end]）
+def fetch_period_columns(
+    conn: sqlite3.Connection,
+    table: str,
+    symbol: str,
+    start: str | None = None,
+    end: str | None = None,
+) -> BarColumns:
+    cursor = conn.execute(
+        f"""
+        SELECT symbol, end_date, open, high, low, close, volume, amount FROM {table}
+        WHERE symbol = ? AND end_date >= ? AND end_date <= ?
+        ORDER BY period_start
+        """,
+        (symbol, start or "0000-00-00", end or "9999-99-99"),
+    )
+    return BarColumns.from_rows(cursor.fetchall())
+
+
+# 读取指定交易日的技术特征（按股票代码排序），返回股票数组与特征名到数组的映射（缺失为 NaN）
+def fetch_day_features(
+    conn: sqlite3.Connection,
+    trade_date: str,
+    symbols: list[str] | None = None,
+) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    sql = f"SELECT symbol, {', '.join(FEATURE_COLUMNS)} FROM daily_features WHERE trade_date = ?"
+    params: list = [trade_date]
+    if symbols:
+        sql += f" AND symbol IN ({', '.join('?' for _ in symbols)})"
+        params.extend(symbols)
+    rows = conn.execute(sql + " ORDER BY symbol", params).fetchall()
+    values = np.array([row[1:] for row in rows], dtype=np.float64).reshape(len(rows), len(FEATURE_COLUMNS))
+    return (
+        np.array([row[0] for row in rows], dtype=str),
+        {name: values[:, index] for index, name in enumerate(FEATURE_COLUMNS)},
+    )
+
+
+# 计算有序代码数组中每组的起止下标
+def group_bounds(sorted_keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    if len(sorted_keys) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    ends = np.r_[starts[1:], len(sorted_keys)]
+    return starts, ends
+
+
+# 将按 keys 排列的数值对齐到 symbols，未命中填 NaN
+def align_to(keys: np.ndarray, values: np.ndarray, symbols: np.ndarray) -> np.ndarray:
+    result = np.full(len(symbols), np.nan, dtype=np.float64)
+    if len(keys) == 0 or len(symbols) == 0:
+        return result
+    idx = np.searchsorted(keys, symbols)
+    idx_clipped = np.minimum(idx, len(keys) - 1)
+    hit = keys[idx_clipped] == symbols
+    result[hit] = values[idx_clipped[hit]]
+    return result
+
+
+# 读取各股票在指定日期之前的昨收与近 window 日平均成交量
+def fetch_prev_stats(
+    conn: sqlite3.Connection,
+    trade_date: str,
+    symbols: np.ndarray,
+    window: int = 20,
+    lookback_days: int = 45,
+) -> tuple[np.ndarray, np.ndarray]:
+    # 仅扫描最近 lookback_days 天，走 trade_date 索引
+    lower = (date.fromisoformat(trade_date) - timedelta(days=lookback_days)).isoformat()
+    rows = conn.execute(
+        """
+        SELECT symbol, close, volume FROM daily_bar
+        WHERE trade_date >= ? AND trade_date < ?
+        ORDER BY symbol, trade_date
+        """,
+        (lower, trade_date),
+    ).fetchall()
+    if not rows:
+        missing = np.full(len(symbols), np.nan, dtype=np.float64)
+        return missing, missing.copy()
+
+    hist_symbol = np.array([row[0] for row in rows], dtype=str)
+    hist_close = np.array([row[1] for row in rows], dtype=np.float64)
+    hist_volume = np.array([row[2] for row in rows], dtype=np.float64)
+    starts, ends = group_bounds(hist_symbol)
+
+    # 每组最后一行即昨收，成交量用前缀和求窗口均值
+    last_close = hist_close[ends - 1]
+    cumsum = np.concatenate([[0.0], np.cumsum(hist_volume)])
+    window_start = np.maximum(starts, ends - window)
+    avg_volume = (cumsum[ends] - cumsum[window_start]) / (ends - window_start)
+
+    keys = hist_symbol[starts]
+    return align_to(keys, last_close, symbols), align_to(keys, avg_volume, symbols)
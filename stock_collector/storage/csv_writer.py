@@ -1,8 +1,6 @@
 from pathlib import Path
 from typing import Dict, List
 
-import pandas as pd
-
 
 # CSV 输出列定义
 CSV_COLUMNS = [
@@ -31,6 +29,9 @@ def write_symbol_csv(
     symbol: str,
     rows: List[Dict],
 ):
+    # 延迟导入 pandas，仅在写 CSV 时加载
+    import pandas as pd
+
     # 生成当日目录
     day_dir = base_dir / trade_date
     day_dir.mkdir(parents=True, exist_ok=True)
@@ -69,6 +70,8 @@ def write_summary_csv(
         return
 
     # 构建 DataFrame 并转换文本列
+    import pandas as pd
+
     df = pd.DataFrame(summary_rows)
     for col in TEXT_COLUMNS:
         if col in df.columns:
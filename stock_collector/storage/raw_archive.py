@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import json
+import struct
+import time
+import zlib
+from dataclasses import dataclass, fields
+from pathlib import Path
+from threading import Lock
+from typing import Any, Iterator
+
+from stock_collector.config.settings import get_path
+
+# 帧头：压缩块长度与 CRC32（小端）
+FRAME_HEADER = struct.Struct("<II")
+# 归档文件扩展名
+ARCHIVE_SUFFIX = ".rawz"
+# 原始 deflate 流（无 zlib 头），每条记录后同步刷新，流内共享压缩窗口
+WBITS = -15
+
+
+# 原始响应归档配置
+@dataclass
+class ArchiveConfig:
+    # 是否启用归档
+    enabled: bool = True
+    # 压缩级别（1-9）
+    level: int = 6
+
+    # 从爬虫配置构建
+    @classmethod
+    def from_config(cls, scraper_config: dict[str, Any]) -> ArchiveConfig:
+        known = {item.name for item in fields(cls)}
+        return cls(**{k: v for k, v in scraper_config.get("raw_archive", {}).items() if k in known})
+
+
+# 归档目录
+def _archive_dir() -> Path:
+    return get_path("raw_dir")
+
+
+# 指定交易日的归档文件（含各分片，按名称排序）
+def archive_paths(trade_date: str) -> list[Path]:
+    directory = _archive_dir()
+    if not directory.exists():
+        return []
+    return sorted(directory.glob(f"{trade_date}*{ARCHIVE_SUFFIX}"))
+
+
+# 打包一帧
+def _frame(chunk: bytes) -> bytes:
+    return FRAME_HEADER.pack(len(chunk), zlib.crc32(chunk)) + chunk
+
+
+# 追加写入器：每次打开写入空帧作为新压缩段的起点，记录逐条压缩成帧
+class ArchiveWriter:
+    # 打开归档文件（追加模式，先截掉上次中断留下的不完整帧）
+    def __init__(self, path: Path, level: int) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = Lock()
+        if path.exists():
+            valid = max((end for end, _ in _frames(path.read_bytes())), default=0)
+            if valid < path.stat().st_size:
+                with path.open("r+b") as file_handle:
+                    file_handle.truncate(valid)
+        self._file = path.open("ab")
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS)
+        self._file.write(_frame(b""))
+        self.records = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+
+    # 追加一条记录
+    def append(self, record: dict[str, Any]) -> None:
+        data = json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+        with self._lock:
+            chunk = self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._file.write(_frame(chunk))
+            self.records += 1
+            self.raw_bytes += len(data)
+            self.compressed_bytes += FRAME_HEADER.size + len(chunk)
+
+    # 关闭文件并返回统计
+    def close(self) -> dict[str, Any]:
+        with self._lock:
+            self._file.close()
+        return {
+            "path": str(self.path),
+            "records": self.records,
+            "raw_bytes": self.raw_bytes,
+            "compressed_bytes": self.compressed_bytes,
+        }
+
+
+# 逐帧扫描，返回 (帧结束位置, 压缩块)；末尾不完整或校验失败的帧视为中断写入，停止扫描
+def _frames(data: bytes) -> Iterator[tuple[int, bytes]]:
+    offset = 0
+    while offset + FRAME_HEADER.size <= len(data):
+        length, crc = FRAME_HEADER.unpack_from(data, offset)
+        start = offset + FRAME_HEADER.size
+        end = start + length
+        if end > len(data) or zlib.crc32(data[start:end]) != crc:
+            return
+        offset = end
+        yield end, data[start:end]
+
+
+# 逐条读取单个归档文件（空帧表示新压缩段开始）
+def _read_file(path: Path) -> Iterator[dict[str, Any]]:
+    decompressor = None
+    for _, chunk in _frames(path.read_bytes()):
+        if not chunk:
+            decompressor = zlib.decompressobj(WBITS)
+            continue
+        if decompressor is None:
+            return
+        for line in decompressor.decompress(chunk).splitlines():
+            yield json.loads(line)
+
+
+# 读取指定交易日的全部归档记录
+def iter_records(trade_date: str) -> Iterator[dict[str, Any]]:
+    for path in archive_paths(trade_date):
+        yield from _read_file(path)
+
+
+# 当前运行的写入器（未开启归档时 append 为空操作）
+_WRITER: ArchiveWriter | None = None
+
+
+# 开始归档（分片写入各自的文件，避免多进程交错写入）
+def start(trade_date: str, config: ArchiveConfig, tag: str = "") -> None:
+    global _WRITER
+    stop()
+    if not config.enabled:
+        return
+    name = f"{trade_date}.{tag}{ARCHIVE_SUFFIX}" if tag else f"{trade_date}{ARCHIVE_SUFFIX}"
+    _WRITER = ArchiveWriter(_archive_dir() / name, config.level)
+
+
+# 结束归档，返回统计（未开启时为空）
+def stop() -> dict[str, Any]:
+    global _WRITER
+    writer, _WRITER = _WRITER, None
+    return writer.close() if writer is not None else {}
+
+
+# 追加一条原始响应（kind 为 api / jsonp / dom）
+def append(kind: str, symbol: str, body: str, status: int | None = None) -> None:
+    writer = _WRITER
+    if writer is None:
+        return
+    writer.append({"kind": kind, "symbol": symbol, "status": status, "fetched_at": round(time.time(), 3), "body": body})
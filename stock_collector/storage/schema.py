@@ -29,6 +29,8 @@ class DailyBar:
     turnover_pct: float
     # 成交额（可选）
     amount: float | None = None
+    # 昨收（接口提供时记录，派生字段以此为基准）
+    pre_close: float | None = None
     # 价格类型标识
     price_type: str = "raw"
     # 数据来源
@@ -52,3 +54,74 @@ class CollectStatus:
     last_error: str
     # 更新时间（UTC）
     updated_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+
+
+# 单次抓取耗时数据模型
+@dataclass
+class FetchTiming:
+    # 交易日期
+    trade_date: str
+    # 股票代码
+    symbol: str
+    # 抓取来源（api / dom）
+    source: str
+    # 耗时（毫秒）
+    latency_ms: float
+    # 结果（success / missing / api_failed / failed / skipped）
+    outcome: str
+    # 更新时间（UTC）
+    updated_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+
+
+# 单次运行记录数据模型（每次写出主汇总时追加一行）
+@dataclass
+class RunRecord:
+    # 交易日期
+    trade_date: str
+    # 告警等级
+    level: str
+    # 应采集数量
+    expected: int
+    # 成功数量
+    success: int
+    # 失败数量
+    failed: int
+    # 缺失数量
+    missing: int
+    # 跳过数量
+    skipped: int
+    # DOM 兜底成功数量
+    retry_success: int
+    # 运行耗时（秒）
+    duration_seconds: float
+    # 跳过原因（非交易日等）
+    skip_reason: str = ""
+    # 运行环境
+    runner: str = ""
+    # 各阶段耗时（JSON 文本）
+    stages: str = "{}"
+    # 按来源的请求耗时分位数与结果计数（JSON 文本）
+    metrics: str = "{}"
+    # 汇总生成时间（UTC）
+    generated_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+
+
+# 数据质量审计发现（同一股票同一规则连续命中的交易日合并为一条）
+@dataclass
+class AuditFinding:
+    # 股票代码
+    symbol: str
+    # 规则名称
+    rule: str
+    # 首个命中的交易日
+    start_date: str
+    # 末个命中的交易日
+    end_date: str
+    # 区间内命中的日线数
+    rows: int
+    # 严重程度（error / warning）
+    severity: str
+    # 首个命中日的行情明细
+    detail: str
+    # 审计时间（UTC）
+    audited_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
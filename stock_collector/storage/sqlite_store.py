@@ -3,10 +3,37 @@ from datetime import datetime
 from pathlib import Path
 
 from stock_collector.config.settings import get_path
-from stock_collector.storage.schema import CollectStatus, DailyBar
+from stock_collector.storage.schema import AuditFinding, CollectStatus, DailyBar, FetchTiming, RunRecord
 
-# 默认数据库路径
-DEFAULT_DB_PATH = str(get_path("db_path"))
+# run_history 的字段顺序（不含自增主键）
+RUN_HISTORY_COLUMNS = (
+    "trade_date", "level", "expected", "success", "failed", "missing", "skipped",
+    "retry_success", "duration_seconds", "skip_reason", "runner", "stages", "metrics", "generated_at",
+)
+
+# 周线 / 月线物化表
+PERIOD_BAR_TABLES = ("weekly_bar", "monthly_bar")
+
+
+# daily_features 的特征字段顺序
+FEATURE_COLUMNS = (
+    "ma_5",
+    "ma_10",
+    "ma_20",
+    "ma_60",
+    "ret_1",
+    "ret_5",
+    "ret_20",
+    "ret_60",
+    "volatility_20",
+    "volume_ratio_5",
+    "volume_ratio_20",
+)
+
+
+# 默认数据库路径（按需读取配置）
+def default_db_path() -> str:
+    return str(get_path("db_path"))
 
 
 # 确保 daily_bar 表包含新增字段
@@ -20,6 +47,7 @@ def _ensure_daily_bar_columns(conn: sqlite3.Connection) -> None:
         "change_pct": "REAL NOT NULL DEFAULT 0",
         "amplitude_pct": "REAL NOT NULL DEFAULT 0",
         "turnover_pct": "REAL NOT NULL DEFAULT 0",
+        "pre_close": "REAL",
     }
     # 添加缺失字段
     for column, definition in additions.items():
@@ -29,10 +57,41 @@ def _ensure_daily_bar_columns(conn: sqlite3.Connection) -> None:
     conn.commit()
 
 
+# 将 tushare 格式代码（600000.SH）迁移为新浪格式（sh600000），新旧并存时保留新格式
+def _migrate_ts_code_symbols(conn: sqlite3.Connection) -> None:
+    for table in ("daily_bar", "daily_collect_status"):
+        conn.execute(
+            f"""
+            UPDATE OR IGNORE {table}
+            SET symbol = lower(substr(symbol, 8, 2)) || substr(symbol, 1, 6)
+            WHERE symbol GLOB '[0-9][0-9][0-9][0-9][0-9][0-9].[A-Z][A-Z]'
+            """
+        )
+        conn.execute(f"DELETE FROM {table} WHERE symbol GLOB '[0-9][0-9][0-9][0-9][0-9][0-9].[A-Z][A-Z]'")
+
+
+# 为早期创建的 run_history 补充 metrics 字段
+def _add_run_history_metrics(conn: sqlite3.Connection) -> None:
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(run_history)").fetchall()}
+    if "metrics" not in columns:
+        conn.execute("ALTER TABLE run_history ADD COLUMN metrics TEXT")
+
+
+# 按 user_version 依次执行一次性迁移
+def _apply_migrations(conn: sqlite3.Connection) -> None:
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    migrations = [_migrate_ts_code_symbols, _add_run_history_metrics]
+    for target, migration in enumerate(migrations, start=1):
+        if version < target:
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {target}")
+            conn.commit()
+
+
 # 初始化数据库和表结构
-def init_db(db_path: str = DEFAULT_DB_PATH) -> None:
+def init_db(db_path: str | None = None) -> None:
     # 解析路径并确保目录存在
-    path = Path(db_path)
+    path = Path(db_path or default_db_path())
     path.parent.mkdir(parents=True, exist_ok=True)
     # 连接数据库并创建表结构
     with sqlite3.connect(path) as conn:
@@ -53,6 +112,7 @@ def init_db(db_path: str = DEFAULT_DB_PATH) -> None:
                 amplitude_pct REAL NOT NULL,
                 turnover_pct REAL NOT NULL,
                 amount REAL,
+                pre_close REAL,
                 price_type TEXT NOT NULL,
                 source TEXT NOT NULL,
                 updated_at TEXT NOT NULL,
@@ -74,6 +134,152 @@ def init_db(db_path: str = DEFAULT_DB_PATH) -> None:
             )
             """
         )
+        # 创建抓取耗时表（供调度与排查使用）
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS fetch_timing (
+                symbol TEXT NOT NULL,
+                trade_date TEXT NOT NULL,
+                source TEXT NOT NULL,
+                latency_ms REAL NOT NULL,
+                outcome TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (symbol, trade_date, source)
+            )
+            """
+        )
+        # 创建运行历史表（只追加，同一日期以最新一行为准）
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS run_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                trade_date TEXT NOT NULL,
+                level TEXT NOT NULL,
+                expected INTEGER NOT NULL,
+                success INTEGER NOT NULL,
+                failed INTEGER NOT NULL,
+                missing INTEGER NOT NULL,
+                skipped INTEGER NOT NULL,
+                retry_success INTEGER NOT NULL,
+                duration_seconds REAL NOT NULL,
+                skip_reason TEXT,
+                runner TEXT,
+                stages TEXT,
+                metrics TEXT,
+                generated_at TEXT NOT NULL
+            )
+            """
+        )
+        # 创建股本参考表（计算换手率，按需从数据源刷新）
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS share_capital (
+                symbol TEXT PRIMARY KEY,
+                float_shares REAL NOT NULL,
+                total_shares REAL NOT NULL,
+                as_of TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+            """
+        )
+        # 创建证券简称表（识别 ST 股票的涨跌幅限制，按需从数据源刷新）
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS stock_name (
+                symbol TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                as_of TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+            """
+        )
+        # 创建除权除息事件表（复权因子由事件比例累乘得到）
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS adj_event (
+                symbol TEXT NOT NULL,
+                ex_date TEXT NOT NULL,
+                ratio REAL NOT NULL,
+                source TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (symbol, ex_date)
+            )
+            """
+        )
+        # 创建数据质量审计表（每次全量审计整体重写）
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS bar_audit (
+                symbol TEXT NOT NULL,
+                rule TEXT NOT NULL,
+                start_date TEXT NOT NULL,
+                end_date TEXT NOT NULL,
+                rows INTEGER NOT NULL,
+                severity TEXT NOT NULL,
+                detail TEXT,
+                audited_at TEXT NOT NULL,
+                PRIMARY KEY (symbol, rule, start_date)
+            )
+            """
+        )
+        # 创建周线 / 月线物化表（由日线聚合，period_start 为周一 / 月初）
+        for table in PERIOD_BAR_TABLES:
+            cursor.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    symbol TEXT NOT NULL,
+                    period_start TEXT NOT NULL,
+                    start_date TEXT NOT NULL,
+                    end_date TEXT NOT NULL,
+                    open REAL NOT NULL,
+                    high REAL NOT NULL,
+                    low REAL NOT NULL,
+                    close REAL NOT NULL,
+                    volume INTEGER NOT NULL,
+                    amount REAL,
+                    days INTEGER NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (symbol, period_start)
+                )
+                """
+            )
+        # 创建技术特征表（按后复权价格计算，均线换算为当日价格口径）
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS daily_features (
+                symbol TEXT NOT NULL,
+                trade_date TEXT NOT NULL,
+                ma_5 REAL,
+                ma_10 REAL,
+                ma_20 REAL,
+                ma_60 REAL,
+                ret_1 REAL,
+                ret_5 REAL,
+                ret_20 REAL,
+                ret_60 REAL,
+                volatility_20 REAL,
+                volume_ratio_5 REAL,
+                volume_ratio_20 REAL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (symbol, trade_date)
+            )
+            """
+        )
+        # 创建特征滚动窗口状态表（每只股票最近一个窗口的收盘价与成交量，增量计算时使用）
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS feature_state (
+                symbol TEXT PRIMARY KEY,
+                last_date TEXT NOT NULL,
+                history INTEGER NOT NULL,
+                factor REAL NOT NULL,
+                prev_factor REAL NOT NULL,
+                closes BLOB NOT NULL,
+                volumes BLOB NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+            """
+        )
         # 创建索引以加速查询
         cursor.execute(
             """
@@ -87,82 +293,182 @@ def init_db(db_path: str = DEFAULT_DB_PATH) -> None:
             ON daily_collect_status (trade_date)
             """
         )
+        cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_fetch_timing_trade_date
+            ON fetch_timing (trade_date)
+            """
+        )
+        cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_daily_features_trade_date
+            ON daily_features (trade_date)
+            """
+        )
+        cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_run_history_trade_date
+            ON run_history (trade_date, id)
+            """
+        )
         # 提交初始变更
         conn.commit()
         # 确保字段齐全
         _ensure_daily_bar_columns(conn)
+        # 执行一次性数据迁移
+        _apply_migrations(conn)
+
+
+# 日线 upsert 语句（幂等）
+_UPSERT_DAILY_BAR_SQL = """
+    INSERT INTO daily_bar (
+        symbol, trade_date, open, high, low, close,
+        change, change_pct, volume, amplitude_pct, turnover_pct,
+        amount, pre_close, price_type, source, updated_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(symbol, trade_date) DO UPDATE SET
+        open=excluded.open,
+        high=excluded.high,
+        low=excluded.low,
+        close=excluded.close,
+        change=excluded.change,
+        change_pct=excluded.change_pct,
+        volume=excluded.volume,
+        amplitude_pct=excluded.amplitude_pct,
+        turnover_pct=excluded.turnover_pct,
+        amount=excluded.amount,
+        pre_close=excluded.pre_close,
+        price_type=excluded.price_type,
+        source=excluded.source,
+        updated_at=excluded.updated_at
+"""
+
+# 采集状态 upsert 语句（幂等）
+_UPSERT_COLLECT_STATUS_SQL = """
+    INSERT INTO daily_collect_status (
+        symbol, trade_date, status, retry_count, last_error, updated_at
+    ) VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(symbol, trade_date) DO UPDATE SET
+        status=excluded.status,
+        retry_count=excluded.retry_count,
+        last_error=excluded.last_error,
+        updated_at=excluded.updated_at
+"""
+
+
+# 日线转为 upsert 参数
+def _daily_bar_params(bar: DailyBar) -> tuple:
+    return (
+        bar.symbol,
+        bar.trade_date,
+        bar.open,
+        bar.high,
+        bar.low,
+        bar.close,
+        bar.change,
+        bar.change_pct,
+        bar.volume,
+        bar.amplitude_pct,
+        bar.turnover_pct,
+        bar.amount,
+        bar.pre_close,
+        bar.price_type,
+        bar.source,
+        bar.updated_at,
+    )
+
+
+# 采集状态转为 upsert 参数
+def _collect_status_params(status: CollectStatus) -> tuple:
+    return (
+        status.symbol,
+        status.trade_date,
+        status.status,
+        status.retry_count,
+        status.last_error,
+        status.updated_at,
+    )
 
 
 # 写入或更新日线行情
 def upsert_daily_bar(conn: sqlite3.Connection, bar: DailyBar) -> None:
     # 使用 upsert 语句保证幂等
-    conn.execute(
-        """
-        INSERT INTO daily_bar (
-            symbol, trade_date, open, high, low, close,
-            change, change_pct, volume, amplitude_pct, turnover_pct,
-            amount, price_type, source, updated_at
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ON CONFLICT(symbol, trade_date) DO UPDATE SET
-            open=excluded.open,
-            high=excluded.high,
-            low=excluded.low,
-            close=excluded.close,
-            change=excluded.change,
-            change_pct=excluded.change_pct,
-            volume=excluded.volume,
-            amplitude_pct=excluded.amplitude_pct,
-            turnover_pct=excluded.turnover_pct,
-            amount=excluded.amount,
-            price_type=excluded.price_type,
-            source=excluded.source,
-            updated_at=excluded.updated_at
-        """,
-        (
-            bar.symbol,
-            bar.trade_date,
-            bar.open,
-            bar.high,
-            bar.low,
-            bar.close,
-            bar.change,
-            bar.change_pct,
-            bar.volume,
-            bar.amplitude_pct,
-            bar.turnover_pct,
-            bar.amount,
-            bar.price_type,
-            bar.source,
-            bar.updated_at,
-        ),
-    )
+    conn.execute(_UPSERT_DAILY_BAR_SQL, _daily_bar_params(bar))
+
+
+# 批量写入或更新日线行情
+def upsert_daily_bars(conn: sqlite3.Connection, bars: list[DailyBar]) -> None:
+    conn.executemany(_UPSERT_DAILY_BAR_SQL, [_daily_bar_params(bar) for bar in bars])
 
 
 # 写入或更新采集状态
 def upsert_collect_status(conn: sqlite3.Connection, status: CollectStatus) -> None:
     # 使用 upsert 语句保证幂等
+    conn.execute(_UPSERT_COLLECT_STATUS_SQL, _collect_status_params(status))
+
+
+# 批量写入或更新采集状态
+def upsert_collect_statuses(conn: sqlite3.Connection, statuses: list[CollectStatus]) -> None:
+    conn.executemany(_UPSERT_COLLECT_STATUS_SQL, [_collect_status_params(status) for status in statuses])
+
+
+# 写入或更新抓取耗时
+def upsert_fetch_timing(conn: sqlite3.Connection, timing: FetchTiming) -> None:
     conn.execute(
         """
-        INSERT INTO daily_collect_status (
-            symbol, trade_date, status, retry_count, last_error, updated_at
+        INSERT INTO fetch_timing (
+            symbol, trade_date, source, latency_ms, outcome, updated_at
         ) VALUES (?, ?, ?, ?, ?, ?)
-        ON CONFLICT(symbol, trade_date) DO UPDATE SET
-            status=excluded.status,
-            retry_count=excluded.retry_count,
-            last_error=excluded.last_error,
+        ON CONFLICT(symbol, trade_date, source) DO UPDATE SET
+            latency_ms=excluded.latency_ms,
+            outcome=excluded.outcome,
             updated_at=excluded.updated_at
         """,
         (
-            status.symbol,
-            status.trade_date,
-            status.status,
-            status.retry_count,
-            status.last_error,
-            status.updated_at,
+            timing.symbol,
+            timing.trade_date,
+            timing.source,
+            timing.latency_ms,
+            timing.outcome,
+            timing.updated_at,
         ),
     )
 
 
+# 追加一条运行记录
+def insert_run_record(conn: sqlite3.Connection, record: RunRecord) -> None:
+    placeholders = ", ".join("?" for _ in RUN_HISTORY_COLUMNS)
+    conn.execute(
+        f"INSERT INTO run_history ({', '.join(RUN_HISTORY_COLUMNS)}) VALUES ({placeholders})",
+        tuple(getattr(record, column) for column in RUN_HISTORY_COLUMNS),
+    )
+
+
+# 每个日期最新一条运行记录，按日期倒序（可限定日期范围，按需迭代）
+def iter_latest_runs(
+    conn: sqlite3.Connection,
+    start_date: str | None = None,
+    end_date: str | None = None,
+):
+    cursor = conn.execute(
+        f"""
+        SELECT {', '.join(RUN_HISTORY_COLUMNS)}
+        FROM run_history AS r
+        WHERE id = (SELECT MAX(id) FROM run_history WHERE trade_date = r.trade_date)
+          AND trade_date >= ? AND trade_date <= ?
+        ORDER BY trade_date DESC
+        """,
+        (start_date or "", end_date or "9999-12-31"),
+    )
+    for row in cursor:
+        yield RunRecord(*row)
+
+
+# 获取指定日期最新一条运行记录
+def fetch_latest_run(conn: sqlite3.Connection, trade_date: str) -> RunRecord | None:
+    return next(iter_latest_runs(conn, trade_date, trade_date), None)
+
+
 # 获取指定交易日的采集状态
 def fetch_statuses(conn: sqlite3.Connection, trade_date: str) -> dict[str, CollectStatus]:
     # 查询数据库
@@ -189,6 +495,353 @@ def fetch_statuses(conn: sqlite3.Connection, trade_date: str) -> dict[str, Colle
     return result
 
 
+# 获取日期区间内指定状态的采集记录（按日期、股票排序）
+def fetch_statuses_between(
+    conn: sqlite3.Connection,
+    start_date: str,
+    end_date: str,
+    statuses: tuple[str, ...],
+) -> list[CollectStatus]:
+    placeholders = ", ".join("?" for _ in statuses)
+    cursor = conn.execute(
+        f"""
+        SELECT symbol, trade_date, status, retry_count, last_error, updated_at
+        FROM daily_collect_status
+        WHERE trade_date >= ? AND trade_date <= ? AND status IN ({placeholders})
+        ORDER BY trade_date, symbol
+        """,
+        (start_date, end_date, *statuses),
+    )
+    return [
+        CollectStatus(
+            trade_date=date_value,
+            symbol=symbol,
+            status=status,
+            retry_count=retry_count,
+            last_error=last_error or "",
+            updated_at=updated_at,
+        )
+        for symbol, date_value, status, retry_count, last_error, updated_at in cursor
+    ]
+
+
+# 按股票读取日期区间内的全部采集状态（逐股票走主键范围查询）
+def fetch_symbol_statuses(
+    conn: sqlite3.Connection,
+    symbols: list[str],
+    start_date: str,
+    end_date: str,
+) -> dict[tuple[str, str], CollectStatus]:
+    result: dict[tuple[str, str], CollectStatus] = {}
+    for symbol in symbols:
+        cursor = conn.execute(
+            """
+            SELECT trade_date, status, retry_count, last_error, updated_at
+            FROM daily_collect_status
+            WHERE symbol = ? AND trade_date >= ? AND trade_date <= ?
+            """,
+            (symbol, start_date, end_date),
+        )
+        for date_value, status, retry_count, last_error, updated_at in cursor:
+            result[(symbol, date_value)] = CollectStatus(
+                trade_date=date_value,
+                symbol=symbol,
+                status=status,
+                retry_count=retry_count,
+                last_error=last_error or "",
+                updated_at=updated_at,
+            )
+    return result
+
+
+# 按股票汇总日期区间内已入库的交易日（逗号分隔；日期条件不走 trade_date 索引，顺序扫描覆盖主键索引）
+def iter_symbol_dates(conn: sqlite3.Connection, start_date: str, end_date: str):
+    return conn.execute(
+        """
+        SELECT symbol, group_concat(trade_date)
+        FROM daily_bar
+        WHERE +trade_date >= ? AND +trade_date <= ?
+        GROUP BY symbol
+        """,
+        (start_date, end_date),
+    )
+
+
+# 按日期统计各采集状态的数量
+def count_statuses(conn: sqlite3.Connection, trade_dates: list[str]) -> dict[str, dict[str, int]]:
+    placeholders = ", ".join("?" for _ in trade_dates)
+    cursor = conn.execute(
+        f"""
+        SELECT trade_date, status, COUNT(*)
+        FROM daily_collect_status
+        WHERE trade_date IN ({placeholders})
+        GROUP BY trade_date, status
+        """,
+        tuple(trade_dates),
+    )
+    counts: dict[str, dict[str, int]] = {date_value: {} for date_value in trade_dates}
+    for date_value, status, count in cursor:
+        counts[date_value][status] = count
+    return counts
+
+
+# 批量回写派生字段（rows 为 (涨跌额, 涨跌幅, 振幅, 换手率, 股票, 交易日)）
+def update_derived_fields(conn: sqlite3.Connection, rows: list[tuple]) -> None:
+    conn.executemany(
+        """
+        UPDATE daily_bar
+        SET change = ?, change_pct = ?, amplitude_pct = ?, turnover_pct = ?
+        WHERE symbol = ? AND trade_date = ?
+        """,
+        rows,
+    )
+
+
+# 写入股本参考数据（rows 为 (股票, 流通股本, 总股本)，单位为股）
+def upsert_share_capital(conn: sqlite3.Connection, rows: list[tuple[str, float, float]], as_of: str) -> None:
+    updated_at = now_iso()
+    conn.executemany(
+        """
+        INSERT INTO share_capital (symbol, float_shares, total_shares, as_of, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(symbol) DO UPDATE SET
+            float_shares=excluded.float_shares,
+            total_shares=excluded.total_shares,
+            as_of=excluded.as_of,
+            updated_at=excluded.updated_at
+        """,
+        [(symbol, float_shares, total_shares, as_of, updated_at) for symbol, float_shares, total_shares in rows],
+    )
+
+
+# 股本参考数据的最新日期（无数据时为 None）
+def share_capital_as_of(conn: sqlite3.Connection) -> str | None:
+    return conn.execute("SELECT MAX(as_of) FROM share_capital").fetchone()[0]
+
+
+# 读取各股票流通股本
+def fetch_float_shares(conn: sqlite3.Connection) -> dict[str, float]:
+    return dict(conn.execute("SELECT symbol, float_shares FROM share_capital").fetchall())
+
+
+# 整体替换证券简称（rows 为 (股票, 简称)）
+def replace_stock_names(conn: sqlite3.Connection, rows: list[tuple[str, str]], as_of: str) -> None:
+    updated_at = now_iso()
+    conn.execute("DELETE FROM stock_name")
+    conn.executemany(
+        "INSERT OR REPLACE INTO stock_name (symbol, name, as_of, updated_at) VALUES (?, ?, ?, ?)",
+        [(symbol, name, as_of, updated_at) for symbol, name in rows],
+    )
+
+
+# 证券简称的最新日期（无数据时为 None）
+def stock_names_as_of(conn: sqlite3.Connection) -> str | None:
+    return conn.execute("SELECT MAX(as_of) FROM stock_name").fetchone()[0]
+
+
+# 简称含 ST 的股票（ST、*ST、SST 等）
+def fetch_st_symbols(conn: sqlite3.Connection) -> set[str]:
+    return {row[0] for row in conn.execute("SELECT symbol FROM stock_name WHERE name LIKE '%ST%'")}
+
+
+# 重写指定除权日的事件（symbols 非空时只替换这些股票；events 为 (股票, 比例, 来源)）
+def replace_adj_events(
+    conn: sqlite3.Connection,
+    ex_date: str,
+    symbols: list[str] | None,
+    events: list[tuple[str, float, str]],
+) -> None:
+    if symbols is None:
+        conn.execute("DELETE FROM adj_event WHERE ex_date = ?", (ex_date,))
+    else:
+        conn.executemany("DELETE FROM adj_event WHERE symbol = ? AND ex_date = ?", [(symbol, ex_date) for symbol in symbols])
+    insert_adj_events(conn, [(symbol, ex_date, ratio, source) for symbol, ratio, source in events])
+
+
+# 批量写入除权除息事件（rows 为 (股票, 除权日, 比例, 来源)）
+def insert_adj_events(conn: sqlite3.Connection, rows: list[tuple[str, str, float, str]]) -> None:
+    updated_at = now_iso()
+    conn.executemany(
+        """
+        INSERT OR REPLACE INTO adj_event (symbol, ex_date, ratio, source, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        [(symbol, ex_date, ratio, source, updated_at) for symbol, ex_date, ratio, source in rows],
+    )
+
+
+# 清空除权除息事件（全量重建前调用）
+def clear_adj_events(conn: sqlite3.Connection) -> None:
+    conn.execute("DELETE FROM adj_event")
+
+
+# 读取单只股票的除权除息事件 (除权日, 比例)，按日期升序
+def fetch_adj_events(conn: sqlite3.Connection, symbol: str) -> list[tuple[str, float]]:
+    return conn.execute(
+        "SELECT ex_date, ratio FROM adj_event WHERE symbol = ? ORDER BY ex_date",
+        (symbol,),
+    ).fetchall()
+
+
+# 单只股票事件的版本标记（条数与最近更新时间，用于判断缓存是否失效）
+def adj_event_stamp(conn: sqlite3.Connection, symbol: str) -> tuple[int, str | None]:
+    return tuple(conn.execute(
+        "SELECT COUNT(*), MAX(updated_at) FROM adj_event WHERE symbol = ?",
+        (symbol,),
+    ).fetchone())
+
+
+# 重写指定周期的聚合线（symbols 非空时只替换这些股票；rows 为
+# (股票, 周期起始日, 首个交易日, 末个交易日, 开, 高, 低, 收, 成交量, 成交额, 交易日数)）
+def replace_period_bars(
+    conn: sqlite3.Connection,
+    table: str,
+    period_start: str,
+    symbols: list[str] | None,
+    rows: list[tuple],
+) -> None:
+    if symbols is None:
+        conn.execute(f"DELETE FROM {table} WHERE period_start = ?", (period_start,))
+    else:
+        conn.executemany(f"DELETE FROM {table} WHERE symbol = ? AND period_start = ?", [(symbol, period_start) for symbol in symbols])
+    insert_period_bars(conn, table, rows)
+
+
+# 批量写入聚合线（字段顺序同 replace_period_bars）
+def insert_period_bars(conn: sqlite3.Connection, table: str, rows: list[tuple]) -> None:
+    updated_at = now_iso()
+    conn.executemany(
+        f"""
+        INSERT OR REPLACE INTO {table} (
+            symbol, period_start, start_date, end_date, open, high, low, close, volume, amount, days, updated_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [(*row, updated_at) for row in rows],
+    )
+
+
+# 清空聚合线（全量重建前调用）
+def clear_period_bars(conn: sqlite3.Connection, table: str) -> None:
+    conn.execute(f"DELETE FROM {table}")
+
+
+# 聚合线表是否已有数据（用于首次运行时触发全量构建）
+def has_period_bars(conn: sqlite3.Connection, table: str) -> bool:
+    return conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() is not None
+
+
+# 指定交易日已入库的股票（按代码排序）
+def fetch_day_symbols(conn: sqlite3.Connection, trade_date: str) -> list[str]:
+    rows = conn.execute("SELECT symbol FROM daily_bar WHERE trade_date = ? ORDER BY symbol", (trade_date,))
+    return [row[0] for row in rows]
+
+
+# 读取指定交易日部分股票的日线（列顺序同 upsert 参数）
+def fetch_day_bars(conn: sqlite3.Connection, trade_date: str, symbols: list[str]) -> list[DailyBar]:
+    bars: list[DailyBar] = []
+    for symbol in symbols:
+        row = conn.execute(
+            """
+            SELECT symbol, trade_date, open, high, low, close, change, change_pct, volume,
+                   amplitude_pct, turnover_pct, amount, pre_close, price_type, source, updated_at
+            FROM daily_bar
+            WHERE symbol = ? AND trade_date = ?
+            """,
+            (symbol, trade_date),
+        ).fetchone()
+        if row is not None:
+            bars.append(DailyBar(*row))
+    return bars
+
+
+# 指定除权日各股票的事件比例
+def fetch_adj_ratios_on(conn: sqlite3.Connection, ex_date: str) -> dict[str, float]:
+    return dict(conn.execute("SELECT symbol, ratio FROM adj_event WHERE ex_date = ?", (ex_date,)).fetchall())
+
+
+# 批量写入技术特征（rows 为 (股票, 交易日, *FEATURE_COLUMNS)，NaN 存为 NULL）
+def insert_features(conn: sqlite3.Connection, rows: list[tuple]) -> None:
+    updated_at = now_iso()
+    conn.executemany(
+        f"""
+        INSERT OR REPLACE INTO daily_features (symbol, trade_date, {', '.join(FEATURE_COLUMNS)}, updated_at)
+        VALUES ({', '.join('?' for _ in range(len(FEATURE_COLUMNS) + 3))})
+        """,
+        [(*row, updated_at) for row in rows],
+    )
+
+
+# 删除部分股票的全部技术特征（单只股票重算前调用）
+def delete_symbol_features(conn: sqlite3.Connection, symbols: list[str]) -> None:
+    conn.executemany("DELETE FROM daily_features WHERE symbol = ?", [(symbol,) for symbol in symbols])
+
+
+# 清空技术特征与滚动状态（全量重建前调用）
+def clear_features(conn: sqlite3.Connection) -> None:
+    conn.execute("DELETE FROM daily_features")
+    conn.execute("DELETE FROM feature_state")
+
+
+# 特征状态表是否已有数据（用于首次运行时触发全量构建）
+def has_feature_states(conn: sqlite3.Connection) -> bool:
+    return conn.execute("SELECT 1 FROM feature_state LIMIT 1").fetchone() is not None
+
+
+# 读取部分股票的滚动状态 (股票, 最近交易日, 累计行数, 复权因子, 前一行复权因子, 收盘价窗口, 成交量窗口)
+def fetch_feature_states(conn: sqlite3.Connection, symbols: list[str]) -> list[tuple]:
+    if not symbols:
+        return []
+    return conn.execute(
+        f"""
+        SELECT symbol, last_date, history, factor, prev_factor, closes, volumes FROM feature_state
+        WHERE symbol IN ({', '.join('?' for _ in symbols)})
+        """,
+        symbols,
+    ).fetchall()
+
+
+# 批量写入滚动状态（字段顺序同 fetch_feature_states）
+def upsert_feature_states(conn: sqlite3.Connection, rows: list[tuple]) -> None:
+    updated_at = now_iso()
+    conn.executemany(
+        """
+        INSERT OR REPLACE INTO feature_state (
+            symbol, last_date, history, factor, prev_factor, closes, volumes, updated_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [(*row, updated_at) for row in rows],
+    )
+
+
+# 清空审计结果（全量审计开始前调用，与写入同一事务）
+def clear_audit_findings(conn: sqlite3.Connection) -> None:
+    conn.execute("DELETE FROM bar_audit")
+
+
+# 批量写入审计结果
+def insert_audit_findings(conn: sqlite3.Connection, findings: list[AuditFinding]) -> None:
+    conn.executemany(
+        """
+        INSERT OR REPLACE INTO bar_audit (
+            symbol, rule, start_date, end_date, rows, severity, detail, audited_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (
+                finding.symbol,
+                finding.rule,
+                finding.start_date,
+                finding.end_date,
+                finding.rows,
+                finding.severity,
+                finding.detail,
+                finding.audited_at,
+            )
+            for finding in findings
+        ],
+    )
+
+
 # 获取当前 UTC 时间的 ISO 字符串
 def now_iso() -> str:
     return datetime.utcnow().isoformat()
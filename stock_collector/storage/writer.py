@@ -2,19 +2,26 @@ import sqlite3
 from contextlib import contextmanager
 from pathlib import Path
 
-from stock_collector.storage.schema import CollectStatus, DailyBar
-from stock_collector.storage.sqlite_store import DEFAULT_DB_PATH, init_db, upsert_collect_status, upsert_daily_bar
+from stock_collector.storage.schema import CollectStatus, DailyBar, FetchTiming
+from stock_collector.storage.sqlite_store import (
+    default_db_path,
+    init_db,
+    upsert_collect_status,
+    upsert_daily_bar,
+    upsert_fetch_timing,
+)
 
 
 # 打开数据库连接的上下文管理器
 @contextmanager
-def open_db(db_path: str = DEFAULT_DB_PATH):
+def open_db(db_path: str | None = None, check_same_thread: bool = True):
+    db_path = db_path or default_db_path()
     # 初始化数据库结构
     init_db(db_path)
     # 确保数据库目录存在
     Path(db_path).parent.mkdir(parents=True, exist_ok=True)
     # 建立连接
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(db_path, check_same_thread=check_same_thread)
     try:
         # 将连接交给调用方
         yield conn
@@ -35,3 +42,9 @@ def write_daily_bar(conn: sqlite3.Connection, bar: DailyBar) -> None:
 def write_status(conn: sqlite3.Connection, status: CollectStatus) -> None:
     # 使用 upsert 方式写入
     upsert_collect_status(conn, status)
+
+
+# 写入或更新抓取耗时
+def write_fetch_timing(conn: sqlite3.Connection, timing: FetchTiming) -> None:
+    # 使用 upsert 方式写入
+    upsert_fetch_timing(conn, timing)